@@ -3,6 +3,11 @@ ASGI config for config project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Serve it with ``uvicorn config.asgi:application --workers 4``; the hot read
+endpoints are then handled by the async views in ``core.async_views``. Startup
+fails unless the cache is shared by the workers (``core.E001``), since the
+server-sent events stream depends on it.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
@@ -10,7 +15,11 @@ https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 import os
 
 from django.core.asgi import get_asgi_application
+from django.core.management import call_command
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+os.environ.setdefault("ASYNC_VIEWS", "1")
 
 application = get_asgi_application()
+# uvicorn doesn't run system checks; refuse to start with a per-process cache
+call_command("check", tags=["events"])
@@ -57,6 +57,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "core.metrics.MetricsMiddleware",
+    "core.replicas.ReplicaPinMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",
     "corsheaders.middleware.CorsMiddleware",
@@ -68,6 +70,11 @@ MIDDLEWARE = [
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
 
+# Prometheus scrapes /metrics (core.metrics) with "Authorization: Bearer <METRICS_TOKEN>"
+# or from one of METRICS_ALLOWED_IPS (comma separated); with neither set it is closed
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+METRICS_ALLOWED_IPS = list(filter(None, os.getenv("METRICS_ALLOWED_IPS", "").split(",")))
+
 ROOT_URLCONF = "config.urls"
 
 TEMPLATES = [
@@ -102,6 +109,66 @@ DATABASES = {
     }
 }
 
+# Read replicas (core.replicas): comma separated hosts, each added as a
+# "replica<N>" alias with the primary's credentials. The read-only endpoints
+# read from them; DATABASE_REPLICA_HOSTS=db tries it locally against the
+# primary itself (core.tests.test_replicas then also runs against the alias;
+# tests treat replicas as mirrors of "default").
+REPLICA_DATABASES = []
+for _number, _host in enumerate(filter(None, os.getenv("DATABASE_REPLICA_HOSTS", "").split(",")), start=1):
+    DATABASES[f"replica{_number}"] = {**DATABASES["default"], "HOST": _host.strip(), "TEST": {"MIRROR": "default"}}
+    REPLICA_DATABASES.append(f"replica{_number}")
+DATABASE_ROUTERS = ["core.replicas.ReplicaRouter"]
+# Reads of a user go to the primary for this long after they write
+REPLICA_STICKY_SECONDS = int(os.getenv("REPLICA_STICKY_SECONDS", "5"))
+# Seconds between connection checks of a replica
+REPLICA_HEALTH_INTERVAL = int(os.getenv("REPLICA_HEALTH_INTERVAL", "10"))
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Local memory by default; point CACHE_BACKEND/CACHE_LOCATION at a shared
+# cache (e.g. Redis) when running several workers.
+
+CACHES = {
+    "default": {
+        "BACKEND": os.getenv("CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"),
+        "LOCATION": os.getenv("CACHE_LOCATION", "edukacja"),
+    }
+}
+
+# Serve leaderboards from the boards kept sorted in the cache by core.leaderboard;
+# a board nothing updates is dropped after LEADERBOARD_CACHE_TIMEOUT seconds, and
+# the global board keeps the best LEADERBOARD_GLOBAL_SIZE students
+LEADERBOARD_CACHE = _get_bool_env("LEADERBOARD_CACHE", default=True)
+LEADERBOARD_CACHE_TIMEOUT = int(os.getenv("LEADERBOARD_CACHE_TIMEOUT", "86400"))
+LEADERBOARD_GLOBAL_SIZE = int(os.getenv("LEADERBOARD_GLOBAL_SIZE", "100"))
+# Parent dashboards (core.dashboard) are cached per parent for at most this long
+DASHBOARD_CACHE_TIMEOUT = int(os.getenv("DASHBOARD_CACHE_TIMEOUT", "300"))
+
+# Server-sent events (core.events): how many of a stream's latest events a
+# reconnecting reader can catch up on, how long events are kept, how often an
+# open stream checks for new events and how long before the browser reconnects.
+EVENTS_BACKLOG = 100
+EVENTS_TIMEOUT = 3600
+EVENTS_POLL_INTERVAL = float(os.getenv("EVENTS_POLL_INTERVAL", "1.0"))
+EVENTS_HEARTBEAT = 15
+EVENTS_STREAM_DURATION = 300
+# Seconds a stream ticket (core.events.ticket) may be used for connecting
+EVENTS_TICKET_MAX_AGE = int(os.getenv("EVENTS_TICKET_MAX_AGE", "60"))
+
+# Background jobs (core.jobs). JOBS_EAGER runs them inline when they're
+# queued; set JOBS_EAGER=0 and run "manage.py run_jobs" to move them off the
+# request path.
+JOBS_EAGER = _get_bool_env("JOBS_EAGER", default=True)
+JOBS_MAX_ATTEMPTS = 5
+# Retry after 10s, 20s, 40s, ... at most an hour
+JOBS_RETRY_DELAY = 10
+JOBS_RETRY_MAX_DELAY = 3600
+# A job running for longer than this is assumed lost and claimed again
+JOBS_LEASE = int(os.getenv("JOBS_LEASE", "300"))
+JOBS_POLL_INTERVAL = float(os.getenv("JOBS_POLL_INTERVAL", "1.0"))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -130,6 +197,34 @@ LANGUAGE_CODE = "en-us"
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Uploaded files are de-duplicated by content (core.storage); run
+# ``manage.py gc_blobs`` periodically to drop content nothing links to.
+STORAGES = {
+    "default": {"BACKEND": "core.storage.DeduplicatingStorage"},
+    "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+}
+
+# Media is served by core.views.MediaView after an access check. Set
+# MEDIA_SENDFILE to "x-accel-redirect" (nginx, with an ``internal`` location
+# at MEDIA_ACCEL_PREFIX aliased to MEDIA_ROOT) or "x-sendfile" to let the
+# front proxy send the bytes.
+MEDIA_SENDFILE = os.getenv("MEDIA_SENDFILE", "")
+MEDIA_ACCEL_PREFIX = os.getenv("MEDIA_ACCEL_PREFIX", "/protected-media/")
+MEDIA_CACHE_MAX_AGE = 3600
+# Seconds a ?token= in the file URLs rendered by the API stays valid
+MEDIA_TOKEN_MAX_AGE = int(os.getenv("MEDIA_TOKEN_MAX_AGE", "3600"))
+
+# Chunked, resumable submission uploads (core.uploads); part files live
+# outside MEDIA_ROOT so they are never served.
+CHUNKED_UPLOAD_DIR = os.getenv("CHUNKED_UPLOAD_DIR", os.path.join(BASE_DIR, "upload_parts"))
+CHUNKED_UPLOAD_MAX_SIZE = int(os.getenv("CHUNKED_UPLOAD_MAX_SIZE", str(2 * 1024 ** 3)))
+CHUNKED_UPLOAD_CHUNK_SIZE = 5 * 1024 ** 2
+# Unfinished sessions expire this many seconds after their last chunk; run
+# ``manage.py cleanup_uploads`` periodically to delete them and their parts.
+CHUNKED_UPLOAD_EXPIRY = int(os.getenv("CHUNKED_UPLOAD_EXPIRY", str(24 * 3600)))
+# Unfinished, unexpired sessions a student may have at once
+CHUNKED_UPLOAD_MAX_SESSIONS = int(os.getenv("CHUNKED_UPLOAD_MAX_SESSIONS", "3"))
+
 TIME_ZONE = "UTC"
 
 USE_I18N = True
@@ -143,25 +238,35 @@ USE_TZ = True
 STATIC_URL = "/static/"
 STATIC_ROOT = BASE_DIR / "staticfiles"
 
+# Route the hot read endpoints to the native async views in core.async_views.
+# config.asgi turns this on, so it only applies when served by uvicorn/ASGI.
+ASYNC_VIEWS = os.getenv("ASYNC_VIEWS", "0") == "1"
+
 # Custom user model
 AUTH_USER_MODEL = "core.User"
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "core.authentication.ProfileJWTAuthentication",
     ),
     "DEFAULT_PERMISSION_CLASSES": (
         "rest_framework.permissions.IsAuthenticated",
     ),
+    "DEFAULT_PAGINATION_CLASS": "core.pagination.KeysetPagination",
 }
 
 CORS_ALLOW_ALL_ORIGINS = True
+# lets the browser read the comment feed's ETag when it polls
+CORS_EXPOSE_HEADERS = ["ETag"]
 
 from datetime import timedelta
 
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(minutes=60),
     "REFRESH_TOKEN_LIFETIME": timedelta(days=1),
+    # adds role/profile claims, see core.authentication
+    "TOKEN_OBTAIN_SERIALIZER": "core.authentication.ProfileTokenObtainPairSerializer",
+    "TOKEN_REFRESH_SERIALIZER": "core.authentication.ProfileTokenRefreshSerializer",
 }
 
 # Default primary key field type
@@ -26,18 +26,18 @@ from drf_yasg.views import get_schema_view
 from drf_yasg import openapi
 from rest_framework.permissions import AllowAny
 from core import views as core_views
+from core import async_views
+from core.metrics import metrics_view
+from django.conf import settings
 from rest_framework_simplejwt.views import (
     TokenObtainPairView,
     TokenRefreshView,
 )
-from django.conf import settings
-from django.conf.urls.static import static
 schema_view = get_schema_view(
     openapi.Info(title="Edukacja API", default_version="v1"),
     public=True,
     permission_classes=[AllowAny],
 )
-from core import urls as core_urls
 from core.views import my_tasks, SubmissionUploadView, GroupRankingView
 from core.views import (
     TeacherMyStudentsView,
@@ -59,8 +59,6 @@ router.register(r"rankings", core_views.RankingViewSet)
 router.register(r"relations", core_views.ParentChildRelationViewSet)
 
 
-print("Loaded core urls:", core_urls.urlpatterns)
-
 urlpatterns = [
     path("admin/", admin.site.urls),
     path("api/token/", TokenObtainPairView.as_view(), name="token_obtain_pair"),
@@ -76,6 +74,9 @@ urlpatterns = [
     path("api/my/", core_views.MeView.as_view()),
     path("api/my-tasks/", my_tasks),
     path("api/submit-task/", SubmissionUploadView.as_view(), name="submit-task"),
+    path("api/submit-task/uploads/", core_views.ChunkedUploadInitView.as_view()),
+    path("api/submit-task/uploads/<uuid:pk>/", core_views.ChunkedUploadView.as_view()),
+    path("api/submit-task/uploads/<uuid:pk>/finalize/", core_views.ChunkedUploadFinalizeView.as_view()),
     path(
         "api/submissions/<int:pk>/add_comment/",
         core_views.SubmissionViewSet.as_view({"patch": "add_comment", "post": "add_comment"}),
@@ -84,6 +85,7 @@ urlpatterns = [
         "api/submissions/<int:pk>/comments/",
         core_views.SubmissionViewSet.as_view({"get": "comments"}),
     ),
+    path("api/top-ranking/", core_views.TopRankingView.as_view(), name="top-ranking"),
     path("api/ranking/group/<int:group_id>/", GroupRankingView.as_view(), name='group-ranking'),
     path(
         "api/teacher/student/<int:pk>/submissions/",
@@ -98,7 +100,20 @@ urlpatterns = [
         TeacherSubmissionCommentsView.as_view(),
     ),
     path("api/teacher/tasks/create/", TeacherTaskCreateView.as_view()),
+    path("api/parent/dashboard/", core_views.ParentDashboardView.as_view(), name="parent-dashboard"),
+    path("api/search/", core_views.SearchView.as_view(), name="search"),
+    path("api/teacher/groups/<int:pk>/gradebook/", core_views.GroupGradebookView.as_view()),
+    path("api/teacher/tasks/<int:pk>/export/", core_views.TaskSubmissionsExportView.as_view()),
+    path("api/teacher/groups/<int:pk>/export/", core_views.GroupSubmissionsExportView.as_view()),
+    path("api/teacher/tasks/<int:pk>/stats/", core_views.TaskStatsView.as_view()),
+    path("api/teacher/groups/<int:pk>/stats/", core_views.GroupStatsView.as_view()),
+    # server-sent events, only streamed when served by config.asgi (501 otherwise)
+    path("api/events/ticket/", core_views.EventTicketView.as_view(), name="events-ticket"),
+    path("api/events/", async_views.event_stream, name="events"),
+    path("metrics", metrics_view, name="metrics"),
+    path("media/<path:name>", core_views.MediaView.as_view(), name="media"),
 ]
 
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
+if settings.ASYNC_VIEWS:
+    # same URLs, matched first
+    urlpatterns = async_views.urlpatterns + urlpatterns
@@ -0,0 +1,293 @@
+"""Native async versions of the hot, polled read endpoints.
+
+When the project is served over ASGI (``config.asgi`` turns ``ASYNC_VIEWS``
+on), ``config.urls`` routes these URLs here instead of to the DRF views, so a
+request never leaves the event loop except for the database round trips made
+through Django's async ORM. Responses are identical to the synchronous views
+they stand in for; the JWT is checked the same way ``JWTAuthentication`` does,
+with the user and their profiles loaded in one async query.
+"""
+import asyncio
+import functools
+import json
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core import signing
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.urls import path
+from django.views.decorators.http import require_GET
+from rest_framework.exceptions import AuthenticationFailed, NotAuthenticated
+from rest_framework.request import Request
+from rest_framework.utils.encoders import JSONEncoder
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+from . import events, leaderboard, replicas
+from .authentication import users_with_profiles
+from .models import Comment, ParentChildRelation, Ranking, StudentProfile, Submission, Task
+from .serializers import (
+    CommentSerializer,
+    RankedRankingSerializer,
+    TaskSerializer,
+    aindex_submissions_by_task,
+)
+from .views import (
+    COMMENT_FEED_STATE,
+    GroupRankingView,
+    TopRankingView,
+    comment_feed_etag,
+    etag_matches,
+)
+
+_jwt = JWTAuthentication()
+
+
+def _json(data, status=200, headers=None):
+    # same output as DRF's JSONRenderer
+    return JsonResponse(
+        data,
+        status=status,
+        headers=headers,
+        safe=False,
+        encoder=JSONEncoder,
+        json_dumps_params={"ensure_ascii": False, "separators": (",", ":")},
+    )
+
+
+async def authenticate(request, ticket=False):
+    """The user of the request's JWT with their profiles joined, or None without a token.
+
+    With ``ticket`` an ``events.ticket`` may come as ``?ticket=`` instead
+    (``EventSource`` can't send headers, and a JWT in the URL would end up in logs).
+    """
+    header = _jwt.get_header(request)
+    raw_token = _jwt.get_raw_token(header) if header is not None else None
+    if raw_token is not None:
+        token = _jwt.get_validated_token(raw_token)
+        try:
+            lookup = {jwt_settings.USER_ID_FIELD: token[jwt_settings.USER_ID_CLAIM]}
+        except KeyError:
+            raise AuthenticationFailed("Token contained no recognizable user identification")
+    elif ticket and request.GET.get("ticket"):
+        try:
+            lookup = {"pk": events.ticket_user_id(request.GET["ticket"])}
+        except signing.BadSignature:
+            raise AuthenticationFailed("Invalid or expired ticket")
+    else:
+        return None
+    user = await users_with_profiles().filter(**lookup).afirst()
+    if user is None or not user.is_active:
+        raise AuthenticationFailed("User not found")
+    return user
+
+
+def async_api_view(view=None, *, ticket=False, replica=False):
+    """GET-only async view for authenticated users; ``view`` gets a DRF ``Request``.
+
+    With ``replica`` its reads go to a replica like ``ReplicaReadsMixin`` views.
+    """
+    if view is None:
+        return functools.partial(async_api_view, ticket=ticket, replica=replica)
+
+    @require_GET
+    @functools.wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        try:
+            user = await authenticate(request, ticket=ticket)
+        except AuthenticationFailed as exc:
+            return _json(exc.detail, status=exc.status_code, headers={"WWW-Authenticate": 'Bearer realm="api"'})
+        if user is None:
+            exc = NotAuthenticated()
+            return _json({"detail": exc.detail}, status=exc.status_code, headers={"WWW-Authenticate": 'Bearer realm="api"'})
+        drf_request = Request(request)
+        drf_request.user = user
+        with replicas.reads(replica and await replicas.aallowed(user)):
+            return await view(drf_request, *args, **kwargs)
+
+    return wrapper
+
+
+@async_api_view(replica=True)
+async def my_tasks(request):
+    student_profile = getattr(request.user, "studentprofile", None)
+    if not student_profile:
+        return _json({"error": "Brak profilu ucznia"}, status=403)
+
+    queryset = TaskSerializer.optimize_queryset(
+        Task.objects.filter(assigned_students=student_profile), request
+    ).order_by("-created_at")
+    tasks = [task async for task in queryset]
+    context = {
+        "request": request,
+        "submissions_by_task": await aindex_submissions_by_task(student_profile, tasks),
+    }
+    return _json(TaskSerializer(tasks, many=True, context=context).data)
+
+
+@async_api_view(replica=True)
+async def top_ranking(request):
+    size = TopRankingView.top_size
+    if leaderboard.enabled():
+        return _json(await leaderboard.atop(size))
+    return _json(RankedRankingSerializer([r async for r in Ranking.ranked()[:size]], many=True).data)
+
+
+@async_api_view(replica=True)
+async def group_ranking(request, group_id):
+    try:
+        around = GroupRankingView.parse_around(request)
+    except ValueError:
+        return _json({"error": "Parametr around musi być liczbą"}, status=400)
+
+    if leaderboard.enabled():
+        standings = await leaderboard.astandings(group_id)
+        return _json(GroupRankingView.from_standings(request, standings, around))
+    # raw SQL has no async API yet, run it in a worker thread
+    rows = await sync_to_async(Ranking.group_standings)(
+        group_id, user_id=request.user.id, top=GroupRankingView.top_size, around=around
+    )
+    return _json(GroupRankingView.from_rows(request, rows, around))
+
+
+@async_api_view
+async def me(request):
+    user = request.user
+    student = getattr(user, "studentprofile", None)
+    return _json({
+        "id": user.id,
+        "name": user.get_full_name(),
+        "group_id": student.group_id if student else None,
+    })
+
+
+async def _comment_feed(request, submission_id):
+    try:
+        since = int(request.query_params.get("since", 0))
+    except ValueError:
+        return _json({"error": "Parametr since musi być liczbą"}, status=400)
+
+    comments = Comment.objects.filter(submission_id=submission_id)
+    state = await comments.aaggregate(**COMMENT_FEED_STATE)
+    etag = comment_feed_etag(submission_id, state, since)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+    if etag_matches(request, etag):
+        return HttpResponse(status=304, headers=headers)
+
+    comments = comments.filter(id__gt=since).select_related("author").order_by("created_at", "id")
+    return _json(CommentSerializer([c async for c in comments], many=True).data, headers=headers)
+
+
+@async_api_view
+async def submission_comments(request, pk):
+    owners = await (
+        Submission.objects.filter(pk=pk).values("student__user_id", "task__created_by__user_id").afirst()
+    )
+    if owners is None:
+        return _json({"detail": "Not found."}, status=404)
+    if request.user.id not in (owners["student__user_id"], owners["task__created_by__user_id"]):
+        return HttpResponse(status=403)
+    return await _comment_feed(request, pk)
+
+
+@async_api_view
+async def teacher_submission_comments(request, pk):
+    if not hasattr(request.user, "teacherprofile"):
+        return HttpResponse(status=403)
+    submission_id = await (
+        Submission.objects.filter(id=pk, task__created_by__user=request.user)
+        .values_list("id", flat=True)
+        .afirst()
+    )
+    if submission_id is None:
+        return HttpResponse(status=404)
+    return await _comment_feed(request, submission_id)
+
+
+async def _stream_allowed(user, kind, object_id):
+    """Whether ``user`` may follow the ``submission`` or ``student`` stream ``object_id``."""
+    student = getattr(user, "studentprofile", None)
+    if kind == "submission":
+        owners = await (
+            Submission.objects.filter(pk=object_id)
+            .values("student_id", "task__created_by__user_id")
+            .afirst()
+        )
+        if owners is None:
+            return False
+        if (student and owners["student_id"] == student.id) or owners["task__created_by__user_id"] == user.id:
+            return True
+        student_id = owners["student_id"]
+    else:
+        if student and student.id == object_id:
+            return True
+        if await StudentProfile.objects.filter(id=object_id, group__teacher__user=user).aexists():
+            return True
+        student_id = object_id
+    return await ParentChildRelation.objects.filter(parent__user=user, child_id=student_id).aexists()
+
+
+async def _tail(stream, last_event_id):
+    interval = settings.EVENTS_POLL_INTERVAL
+    yield f"retry: {int(interval * 1000) + 1000}\n\n"
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + settings.EVENTS_STREAM_DURATION
+    quiet_since = loop.time()
+    while loop.time() < deadline:
+        for event in await events.asince(stream, last_event_id):
+            last_event_id = event["id"]
+            data = json.dumps(event["data"], cls=JSONEncoder, ensure_ascii=False)
+            yield f"id: {last_event_id}\nevent: {event['type']}\ndata: {data}\n\n"
+            quiet_since = loop.time()
+        if loop.time() - quiet_since >= settings.EVENTS_HEARTBEAT:
+            yield ": ping\n\n"
+            quiet_since = loop.time()
+        await asyncio.sleep(interval)
+    # the browser reconnects with Last-Event-ID and continues from here
+
+
+@async_api_view(ticket=True)
+async def event_stream(request):
+    """Server-sent ``comment.created`` and ``grade.set`` events.
+
+    ``?submission=<id>`` follows one submission, ``?student=<id>`` everything
+    of a student; students get their own stream by default. Answers 501 when
+    events can't be pushed live (see ``events.streaming_available``): under
+    WSGI the response would be collected whole before being sent, holding a
+    worker for ``EVENTS_STREAM_DURATION``.
+    """
+    if not events.streaming_available():
+        return _json({"error": "Strumień zdarzeń niedostępny"}, status=501)
+    params = request.query_params
+    kind = "submission" if "submission" in params else "student"
+    try:
+        object_id = int(params[kind]) if kind in params else None
+        last_event_id = int(request.headers.get("Last-Event-ID") or params.get("last_event_id") or -1)
+    except ValueError:
+        return _json({"error": "Nieprawidłowy parametr"}, status=400)
+    if object_id is None:
+        student = getattr(request.user, "studentprofile", None)
+        if not student:
+            return _json({"error": "Brak parametru submission lub student"}, status=400)
+        object_id = student.id
+    if not await _stream_allowed(request.user, kind, object_id):
+        return HttpResponse(status=403)
+    stream = f"{kind}:{object_id}"
+    if last_event_id < 0:
+        last_event_id = await events.alast_id(stream)
+
+    response = StreamingHttpResponse(_tail(stream, last_event_id), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
+urlpatterns = [
+    path("api/my-tasks/", my_tasks),
+    path("api/top-ranking/", top_ranking),
+    path("api/ranking/group/<int:group_id>/", group_ranking),
+    path("api/my/", me),
+    path("api/submissions/<int:pk>/comments/", submission_comments),
+    path("api/teacher/submission/<int:pk>/comments/", teacher_submission_comments),
+]
@@ -0,0 +1,119 @@
+"""JWT authentication that resolves the caller's profiles up front.
+
+``ProfileJWTAuthentication`` loads the user together with their student,
+teacher and parent profiles (and the student's group) in one query right
+after the token is validated. DRF keeps the user on the request, so every
+``hasattr(user, "teacherprofile")`` / ``user.studentprofile`` afterwards is
+free, including the "no such profile" answers.
+
+Tokens issued by ``ProfileTokenObtainPairSerializer`` also carry signed
+``role``, ``profile_type``, ``profile_id`` and ``group_id`` claims. Views with
+``token_claims_user = True`` take the user straight from those claims and skip
+the database lookup; such a user only has ids (no names, no ``points``), so
+only use it where that's enough. ``ProfileTokenRefreshSerializer`` reads the
+claims from the database again on every refresh and refuses inactive users,
+so deactivation or a group change reaches those views within one access
+token lifetime.
+"""
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from .models import ParentProfile, StudentProfile, TeacherProfile, User
+
+PROFILES = {
+    "teacher": ("teacherprofile", TeacherProfile),
+    "student": ("studentprofile", StudentProfile),
+    "parent": ("parentprofile", ParentProfile),
+}
+
+
+def users_with_profiles():
+    return User.objects.select_related("studentprofile__group", "teacherprofile", "parentprofile")
+
+
+def profile_claims(user):
+    """Claims describing the user's (first) profile, as embedded in issued tokens."""
+    for profile_type, (accessor, _model) in PROFILES.items():
+        profile = getattr(user, accessor, None)
+        if profile is not None:
+            return {
+                "role": user.role,
+                "profile_type": profile_type,
+                "profile_id": profile.id,
+                "group_id": getattr(profile, "group_id", None),
+            }
+    return {"role": user.role, "profile_type": None, "profile_id": None, "group_id": None}
+
+
+def user_from_claims(token):
+    """A ``User`` with its profile built from the token's claims, or None if they're missing."""
+    if "profile_type" not in token:
+        return None
+    # simplejwt may store the id as a string
+    user_id = User._meta.get_field(api_settings.USER_ID_FIELD).to_python(token[api_settings.USER_ID_CLAIM])
+    user = User(**{api_settings.USER_ID_FIELD: user_id}, role=token["role"])
+    for profile_type, (accessor, model) in PROFILES.items():
+        profile = None
+        if profile_type == token["profile_type"]:
+            profile = model(id=token["profile_id"], user=user)
+            if model is StudentProfile:
+                profile.group_id = token["group_id"]
+        getattr(User, accessor).related.set_cached_value(user, profile)
+    return user
+
+
+class ProfileJWTAuthentication(JWTAuthentication):
+    def authenticate(self, request):
+        view = (request.parser_context or {}).get("view")
+        self.trust_claims = getattr(view, "token_claims_user", False)
+        return super().authenticate(request)
+
+    def get_user(self, validated_token):
+        if getattr(self, "trust_claims", False):
+            user = user_from_claims(validated_token)
+            if user is not None:
+                return user
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        user = users_with_profiles().filter(**{api_settings.USER_ID_FIELD: user_id}).first()
+        if user is None:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        if api_settings.CHECK_REVOKE_TOKEN and validated_token.get(
+            api_settings.REVOKE_TOKEN_CLAIM
+        ) != get_md5_hash_password(user.password):
+            raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+        return user
+
+
+class ProfileTokenObtainPairSerializer(TokenObtainPairSerializer):
+    @classmethod
+    def get_token(cls, user):
+        token = super().get_token(user)
+        for claim, value in profile_claims(user).items():
+            token[claim] = value
+        return token
+
+
+class ProfileTokenRefreshSerializer(TokenRefreshSerializer):
+    """Refresh with the profile claims re-read from the database instead of copied from the old token."""
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs["refresh"])
+        user = users_with_profiles().filter(
+            **{api_settings.USER_ID_FIELD: refresh.get(api_settings.USER_ID_CLAIM)}
+        ).first()
+        if user is None or not api_settings.USER_AUTHENTICATION_RULE(user):
+            raise AuthenticationFailed(self.error_messages["no_active_account"], "no_active_account")
+        for claim, value in profile_claims(user).items():
+            refresh[claim] = value
+        # the access token (and a rotated refresh token) are made from these claims
+        return super().validate({**attrs, "refresh": str(refresh)})
@@ -0,0 +1,19 @@
+from django.conf import settings
+from django.core.checks import Error, register
+
+from . import events
+
+
+@register("events")
+def shared_cache_for_events(app_configs, **kwargs):
+    """Server-sent events need every process to see the events published by the others."""
+    if settings.ASYNC_VIEWS and not events.shared_cache():
+        return [
+            Error(
+                "ASYNC_VIEWS serves server-sent events, which need a cache shared by all processes.",
+                hint="Set CACHE_BACKEND/CACHE_LOCATION to a shared cache, e.g. "
+                "django.core.cache.backends.redis.RedisCache and redis://redis:6379/0.",
+                id="core.E001",
+            )
+        ]
+    return []
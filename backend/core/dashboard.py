@@ -0,0 +1,175 @@
+"""The parent dashboard: an overview of every child of a parent.
+
+For each child: upcoming and overdue tasks, recent grades, recent teacher
+comments and the child's rank in their group. ``build`` computes it in four
+queries however many children, tasks or comments there are; ``get`` serves
+it from the cache, one entry per parent.
+
+``core.signals`` calls ``invalidate`` after the writes that change a
+dashboard. A grade change moves ranks, so it clears the dashboards of every
+parent in the student's group; submissions and teacher comments clear only
+the parents of the student. Other changes, e.g. a task's new deadline, show up
+within ``DASHBOARD_CACHE_TIMEOUT``.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Q, Subquery, Value, Window
+from django.db.models.functions import Coalesce, RowNumber
+from django.utils import timezone
+
+from .models import Comment, ParentChildRelation, Ranking, StudentProfile, Submission, Task
+
+RECENT = 5
+
+
+def _key(parent_id):
+    return f"dashboard:parent:{parent_id}"
+
+
+def get(parent):
+    data = cache.get(_key(parent.id))
+    if data is None:
+        data = build(parent)
+        cache.set(_key(parent.id), data, timeout=settings.DASHBOARD_CACHE_TIMEOUT)
+    return data
+
+
+def invalidate(student_ids=(), classmates_of=(), submission_id=None):
+    """After commit, drop the cached dashboards of the parents of ``student_ids``, of
+    ``classmates_of`` and everyone in their groups, or of the student of ``submission_id``."""
+    condition = Q(child_id__in=student_ids)
+    if classmates_of:
+        condition |= Q(child_id__in=classmates_of) | Q(child__group__students__in=classmates_of)
+    if submission_id is not None:
+        condition |= Q(child__submissions=submission_id)
+    parent_ids = ParentChildRelation.objects.filter(condition).values_list("parent_id", flat=True).distinct()
+    # the lookup runs after commit too, keeping it off the writing transaction
+    transaction.on_commit(lambda: invalidate_parents(parent_ids))
+
+
+def invalidate_parents(parent_ids):
+    cache.delete_many([_key(parent_id) for parent_id in parent_ids])
+
+
+def _children(parent):
+    ranked_above = (
+        Ranking.objects.filter(student__group_id=OuterRef("group_id"), points__gt=OuterRef("ranking__points"))
+        .values("student__group_id")
+        .annotate(count=Count("*"))
+        .values("count")
+    )
+    group_size = (
+        StudentProfile.objects.filter(group_id=OuterRef("group_id"))
+        .values("group_id")
+        .annotate(count=Count("*"))
+        .values("count")
+    )
+    return list(
+        StudentProfile.objects.filter(parents__parent=parent)
+        .select_related("user", "group")
+        .annotate(
+            ranking_points=Coalesce("ranking__points", 0),
+            rank=Coalesce(Subquery(ranked_above, output_field=IntegerField()), Value(0)) + 1,
+            group_size=Subquery(group_size, output_field=IntegerField()),
+        )
+        .order_by("user__first_name", "user__last_name", "id")
+    )
+
+
+def _latest(queryset, partition, ordering):
+    """The ``RECENT`` latest rows of ``queryset`` per ``partition``."""
+    return queryset.annotate(
+        position=Window(RowNumber(), partition_by=F(partition), order_by=ordering)
+    ).filter(position__lte=RECENT)
+
+
+def build(parent):
+    children = _children(parent)
+    ids = [child.id for child in children]
+    today = timezone.localdate()
+
+    assignments = (
+        Task.assigned_students.through.objects.filter(studentprofile_id__in=ids)
+        .select_related("task")
+        .order_by(F("task__deadline").asc(nulls_last=True), "task_id")
+    )
+    submissions = {
+        (s["student_id"], s["task_id"]): s
+        for s in Submission.objects.filter(student_id__in=ids).values(
+            "id", "student_id", "task_id", "task__name", "status", "grade", "submitted_at"
+        )
+    }
+    comments = _latest(
+        Comment.objects.filter(submission__student_id__in=ids, role="teacher"),
+        "submission__student_id",
+        [F("created_at").desc(), F("id").desc()],
+    ).order_by("-created_at", "-id").values(
+        "id",
+        "submission_id",
+        "submission__student_id",
+        "submission__task_id",
+        "submission__task__name",
+        "author__first_name",
+        "author__last_name",
+        "author__username",
+        "text",
+        "created_at",
+    )
+
+    dashboards = {child.id: _child(child) for child in children}
+    for assignment in assignments:
+        task = assignment.task
+        submission = submissions.get((assignment.studentprofile_id, task.id))
+        if submission is not None and submission["status"] != "pending":
+            continue
+        entry = {"id": task.id, "name": task.name, "deadline": task.deadline}
+        overdue = task.deadline is not None and task.deadline < today
+        dashboards[assignment.studentprofile_id]["overdue_tasks" if overdue else "upcoming_tasks"].append(entry)
+
+    graded = sorted(
+        (s for s in submissions.values() if s["grade"] is not None),
+        key=lambda s: (s["submitted_at"] is not None, s["submitted_at"], s["id"]),
+        reverse=True,
+    )
+    for s in graded:
+        grades = dashboards[s["student_id"]]["recent_grades"]
+        if len(grades) < RECENT:
+            grades.append({
+                "submission": s["id"],
+                "task": {"id": s["task_id"], "name": s["task__name"]},
+                "grade": s["grade"],
+                "status": s["status"],
+                "submitted_at": s["submitted_at"],
+            })
+
+    for c in comments:
+        author = f"{c['author__first_name']} {c['author__last_name']}".strip() or c["author__username"]
+        dashboards[c["submission__student_id"]]["teacher_comments"].append({
+            "id": c["id"],
+            "submission": c["submission_id"],
+            "task": {"id": c["submission__task_id"], "name": c["submission__task__name"]},
+            "author": author,
+            "text": c["text"],
+            "created_at": c["created_at"],
+        })
+
+    return {"children": list(dashboards.values()), "generated_at": timezone.now()}
+
+
+def _child(child):
+    user = child.user
+    return {
+        "student": {
+            "id": child.id,
+            "full_name": user.get_full_name() or user.username,
+            "group": {"id": child.group.id, "name": child.group.name} if child.group else None,
+        },
+        "points": child.ranking_points,
+        "rank": child.rank if child.group else None,
+        "group_size": child.group_size,
+        "upcoming_tasks": [],
+        "overdue_tasks": [],
+        "recent_grades": [],
+        "teacher_comments": [],
+    }
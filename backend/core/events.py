@@ -0,0 +1,150 @@
+"""Push events (new comments, grades) for the server-sent events stream.
+
+Events are published to a stream per submission (``submission:<id>``) and
+one per student (``student:<id>``). Each stream has a counter in the Django
+cache; publishing takes the next id from it with an atomic ``incr`` and
+stores the event under its own key, so concurrent publishers never overwrite
+each other. ``core.async_views.event_stream`` tails a stream and pushes new
+entries to the browser, which resumes after a reconnect with
+``Last-Event-ID``. Readers look back at most ``EVENTS_BACKLOG`` ids and stop
+at an id that was taken but not stored yet, unless later events are older
+than ``PUBLISH_GRACE`` seconds (the publisher died or the event expired).
+
+Events are published by whichever process handles the write, so streaming
+needs a cache shared by every process, with an atomic ``incr``
+(``CACHE_BACKEND``, e.g. Redis or memcached, not the file cache); the
+``core.E001`` system check fails when ``ASYNC_VIEWS`` is on without one. The
+stream is only served under ASGI (``streaming_available``); clients fall back
+to polling the comment feed otherwise.
+
+``EventSource`` can't send an ``Authorization`` header, so the browser first
+exchanges its JWT for a ``ticket``: a signed user id valid for
+``EVENTS_TICKET_MAX_AGE`` seconds, which is then passed as ``?ticket=``.
+
+Events expire after ``EVENTS_TIMEOUT`` and caches may evict them earlier, so
+clients also re-read the comment feed whenever a stream (re)connects.
+"""
+import time
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from django.db import transaction
+
+PUBLISH_GRACE = 5
+TICKET_SALT = "core.events.ticket"
+# caches that live inside one process
+LOCAL_CACHES = (
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+)
+
+
+def shared_cache():
+    return settings.CACHES["default"]["BACKEND"] not in LOCAL_CACHES
+
+
+def streaming_available():
+    """Whether ``/api/events/`` can push events live: served by ASGI, over a shared cache."""
+    return settings.ASYNC_VIEWS and shared_cache()
+
+
+def ticket(user):
+    """A short-lived credential for opening ``user``'s event streams."""
+    return signing.dumps({"user": user.pk}, salt=TICKET_SALT)
+
+
+def ticket_user_id(value):
+    """The user id of ``value``; raises ``signing.BadSignature`` (or ``SignatureExpired``)."""
+    return signing.loads(value, salt=TICKET_SALT, max_age=settings.EVENTS_TICKET_MAX_AGE)["user"]
+
+
+def _sequence_key(stream):
+    return f"events:{stream}:seq"
+
+
+def _start_key(stream):
+    return f"events:{stream}:start"
+
+
+def _key(stream, event_id):
+    return f"events:{stream}:{event_id}"
+
+
+def _next_id(stream):
+    # start from the clock, so a counter evicted from the cache never hands out old ids again
+    start = int(time.time() * 1000)
+    if cache.add(_sequence_key(stream), start, timeout=None):
+        # readers don't wait for the ids below it, they were never taken
+        cache.set(_start_key(stream), start + 1, timeout=None)
+    return cache.incr(_sequence_key(stream))
+
+
+def last_id(stream):
+    return cache.get(_sequence_key(stream), 0)
+
+
+async def alast_id(stream):
+    return await cache.aget(_sequence_key(stream), 0)
+
+
+def publish(streams, event_type, data):
+    """Append an event to ``streams``; return its id in each, by stream."""
+    ids = {}
+    for stream in streams:
+        ids[stream] = _next_id(stream)
+        event = {"id": ids[stream], "type": event_type, "data": data, "at": time.time()}
+        cache.set(_key(stream, ids[stream]), event, timeout=settings.EVENTS_TIMEOUT)
+    return ids
+
+
+def _keys(stream, event_id, counters):
+    last = counters.get(_sequence_key(stream), 0)
+    first = max(event_id + 1, last - settings.EVENTS_BACKLOG + 1, counters.get(_start_key(stream), 0))
+    return [_key(stream, i) for i in range(first, last + 1)]
+
+
+def _in_order(keys, found):
+    events = []
+    for i, key in enumerate(keys):
+        if key in found:
+            events.append(found[key])
+            continue
+        later = next((found[k] for k in keys[i + 1:] if k in found), None)
+        if later is None or later["at"] > time.time() - PUBLISH_GRACE:
+            # its publisher may still be storing it
+            break
+    return events
+
+
+def since(stream, event_id):
+    """Events of ``stream`` newer than ``event_id``."""
+    keys = _keys(stream, event_id, cache.get_many([_sequence_key(stream), _start_key(stream)]))
+    return _in_order(keys, cache.get_many(keys))
+
+
+async def asince(stream, event_id):
+    keys = _keys(stream, event_id, await cache.aget_many([_sequence_key(stream), _start_key(stream)]))
+    return _in_order(keys, await cache.aget_many(keys))
+
+
+def _streams(submission):
+    return [f"submission:{submission.id}", f"student:{submission.student_id}"]
+
+
+def comment_created(comment, data):
+    """Publish ``comment`` (serialized as ``data``) once the transaction commits."""
+    submission = comment.submission
+    transaction.on_commit(
+        lambda: publish(_streams(submission), "comment.created", {"submission": submission.id, "comment": dict(data)})
+    )
+
+
+def grade_set(submission):
+    data = {
+        "submission": submission.id,
+        "task": submission.task_id,
+        "grade": submission.grade,
+        "status": submission.status,
+    }
+    transaction.on_commit(lambda: publish(_streams(submission), "grade.set", data))
@@ -0,0 +1,116 @@
+"""Grading many submissions in one request.
+
+``apply`` validates every item on its own, then loads and locks all the
+submissions in one query, which also checks that the teacher owns them. It
+writes the changes with a single ``bulk_update`` and moves each affected
+student's points once (``Ranking.apply_deltas``) and the grade statistics
+once (``stats.record``). The alternative is one ``save()`` per submission,
+each firing the signals. Invalid items are reported in the result and don't
+stop the others.
+"""
+from collections import defaultdict
+
+from django.db import transaction
+
+from . import dashboard, events, stats
+from .models import Ranking, Submission
+
+MAX_ITEMS = 500
+STATUSES = {value for value, _label in Submission._meta.get_field("status").choices}
+
+
+def _clean(item):
+    """``(submission_id, changes)`` of one item; raises ``ValueError`` with the message for the client."""
+    if not isinstance(item, dict):
+        raise ValueError("Nieprawidłowy element")
+    try:
+        submission_id = int(item.get("submission_id"))
+    except (TypeError, ValueError):
+        raise ValueError("Nieprawidłowe ID zgłoszenia")
+    changes = {}
+    if "grade" in item:
+        grade = item["grade"]
+        if grade is not None:
+            try:
+                grade = int(grade)
+            except (TypeError, ValueError):
+                grade = -1
+            if not 0 <= grade <= 6:
+                raise ValueError("Ocena musi być liczbą z przedziału 0–6")
+        changes["grade"] = grade
+    if "status" in item:
+        if item["status"] not in STATUSES:
+            raise ValueError("Nieprawidłowy status")
+        changes["status"] = item["status"]
+    if "feedback" in item:
+        if not isinstance(item["feedback"], str):
+            raise ValueError("Uwagi muszą być tekstem")
+        changes["feedback"] = item["feedback"]
+    if not changes:
+        raise ValueError("Brak zmian")
+    return submission_id, changes
+
+
+def _error(item, message):
+    submission_id = item.get("submission_id") if isinstance(item, dict) else None
+    return {"submission_id": submission_id, "ok": False, "error": message}
+
+
+def apply(teacher, items):
+    """Apply ``items`` (``{submission_id, grade?, status?, feedback?}``) as ``teacher``."""
+    results = [None] * len(items)
+    cleaned = {}
+    for i, item in enumerate(items):
+        try:
+            submission_id, changes = _clean(item)
+        except ValueError as exc:
+            results[i] = _error(item, str(exc))
+            continue
+        if submission_id in cleaned:
+            results[i] = _error(item, "Zgłoszenie powtórzone w żądaniu")
+            continue
+        cleaned[submission_id] = (i, changes)
+
+    with transaction.atomic():
+        # locked, so concurrent gradings can't compute their deltas from the same old grades;
+        # always in id order, so two writers locking overlapping rows can't deadlock
+        submissions = (
+            Submission.objects.filter(task__created_by=teacher)
+            .select_related("task", "student")
+            .select_for_update(of=("self",))
+            .order_by("pk")
+            .in_bulk(sorted(cleaned))
+        )
+        changed, fields, deltas = [], set(), defaultdict(int)
+        for submission_id, (i, changes) in cleaned.items():
+            submission = submissions.get(submission_id)
+            if submission is None:
+                results[i] = _error(items[i], "Brak zgłoszenia")
+                continue
+            if "grade" in changes:
+                deltas[submission.student_id] += (changes["grade"] or 0) - (submission.grade or 0)
+            for field, value in changes.items():
+                setattr(submission, field, value)
+            fields.update(changes)
+            changed.append(submission)
+            results[i] = {
+                "submission_id": submission_id,
+                "ok": True,
+                "grade": submission.grade,
+                "status": submission.status,
+            }
+
+        if changed:
+            Submission.objects.bulk_update(changed, sorted(fields))
+            Ranking.apply_deltas(deltas)
+            stats.record(
+                stats.Change(s.task_id, s.student.group_id, s.task.deadline, s._loaded_state, s.stats_state())
+                for s in changed
+            )
+            for submission in changed:
+                events.grade_set(submission)
+            moved = [student_id for student_id, delta in deltas.items() if delta]
+            dashboard.invalidate(
+                student_ids={submission.student_id for submission in changed}, classmates_of=moved
+            )
+    return {"updated": len(changed), "results": results}
@@ -0,0 +1,150 @@
+"""Durable background jobs kept in the database.
+
+``enqueue()`` stores a ``Job`` row in the caller's transaction, so a job exists
+exactly when the write that queued it was committed. ``manage.py run_jobs``
+workers claim queued rows with ``SELECT ... FOR UPDATE SKIP LOCKED``, so any
+number of workers can share the table without a broker. On SQLite, which
+has no row locks, a conditional ``UPDATE`` decides which worker wins a row.
+
+A failed job is retried with exponential backoff until ``max_attempts``,
+then left as ``failed`` with its traceback in ``last_error``. Jobs that were
+``running`` for longer than ``JOBS_LEASE`` seconds (their worker died) are
+claimed again. A ``dedupe_key`` coalesces jobs: while one job with the key
+is queued, enqueueing another one is a no-op.
+
+With ``JOBS_EAGER`` (the default, for development and tests) jobs run inline
+at ``enqueue()`` and no worker is needed.
+"""
+import logging
+import os
+import socket
+import time
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from . import dashboard
+from .models import Job, Ranking, StudentProfile, Task
+
+logger = logging.getLogger(__name__)
+
+HANDLERS = {}
+
+
+def handler(name):
+    """Register the decorated function as the handler of jobs called ``name``."""
+
+    def register(func):
+        HANDLERS[name] = func
+        return func
+
+    return register
+
+
+def enqueue(name, payload=None, *, dedupe_key=None, delay=0, max_attempts=None):
+    """Queue job ``name``; its handler is called with ``**payload``."""
+    if name not in HANDLERS:
+        raise KeyError(f"No job handler {name!r}")
+    payload = payload or {}
+    if settings.JOBS_EAGER:
+        HANDLERS[name](**payload)
+        return
+    job = Job(
+        name=name,
+        payload=payload,
+        dedupe_key=dedupe_key,
+        run_at=timezone.now() + timedelta(seconds=delay),
+        max_attempts=max_attempts or settings.JOBS_MAX_ATTEMPTS,
+    )
+    Job.objects.bulk_create([job], ignore_conflicts=dedupe_key is not None)
+
+
+def backoff(attempts):
+    """Seconds to wait before retrying a job that has failed ``attempts`` times."""
+    return min(settings.JOBS_RETRY_DELAY * 2 ** (attempts - 1), settings.JOBS_RETRY_MAX_DELAY)
+
+
+def worker_name():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _claimable(now):
+    stale = now - timedelta(seconds=settings.JOBS_LEASE)
+    return Q(status=Job.Status.QUEUED, run_at__lte=now) | Q(status=Job.Status.RUNNING, locked_at__lt=stale)
+
+
+def claim(worker, batch=1):
+    """Lock up to ``batch`` due jobs for ``worker`` and return them."""
+    now = timezone.now()
+    due = Job.objects.filter(_claimable(now)).order_by("run_at", "id")
+    lock = {"status": Job.Status.RUNNING, "locked_at": now, "locked_by": worker, "attempts": F("attempts") + 1}
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            ids = list(due.select_for_update(skip_locked=True).values_list("id", flat=True)[:batch])
+            Job.objects.filter(id__in=ids).update(**lock)
+    else:
+        # one statement, so concurrent workers can't both take a row
+        Job.objects.filter(_claimable(now), id__in=list(due.values_list("id", flat=True)[:batch])).update(**lock)
+    return list(Job.objects.filter(locked_by=worker, locked_at=now).order_by("run_at", "id"))
+
+
+def execute(job):
+    """Run a claimed job; delete it on success, schedule a retry or mark it failed otherwise."""
+    try:
+        with transaction.atomic():
+            HANDLERS[job.name](**job.payload)
+    except Exception:
+        logger.exception("Job %s failed (attempt %s of %s)", job, job.attempts, job.max_attempts)
+        _failed(job, traceback.format_exc())
+        return False
+    Job.objects.filter(id=job.id, locked_by=job.locked_by).delete()
+    return True
+
+
+def _failed(job, error):
+    update = {"last_error": error, "locked_at": None, "locked_by": ""}
+    if job.attempts >= job.max_attempts:
+        Job.objects.filter(id=job.id).update(status=Job.Status.FAILED, **update)
+        return
+    run_at = timezone.now() + timedelta(seconds=backoff(job.attempts))
+    try:
+        with transaction.atomic():
+            Job.objects.filter(id=job.id).update(status=Job.Status.QUEUED, run_at=run_at, **update)
+    except IntegrityError:
+        # the same work was queued again meanwhile; that job covers this one
+        Job.objects.filter(id=job.id).delete()
+
+
+def work(worker=None, *, batch=1, burst=False, poll_interval=None, should_stop=lambda: False):
+    """Process jobs until ``should_stop()`` (or, with ``burst``, the queue is empty); return the count."""
+    worker = worker or worker_name()
+    poll_interval = settings.JOBS_POLL_INTERVAL if poll_interval is None else poll_interval
+    processed = 0
+    while not should_stop():
+        jobs = claim(worker, batch)
+        for job in jobs:
+            execute(job)
+            processed += 1
+        if not jobs:
+            if burst:
+                break
+            time.sleep(poll_interval)
+    return processed
+
+
+@handler("ranking.recompute")
+def recompute_ranking(student_id):
+    ranking, _ = Ranking.objects.get_or_create(student_id=student_id)
+    ranking.update_points()
+
+
+@handler("task.assign")
+def assign_task(task_id, student_ids):
+    task = Task.objects.filter(id=task_id).first()
+    if task is not None:
+        task.assign_students(StudentProfile.objects.filter(id__in=student_ids).only("id", "group_id"))
+        dashboard.invalidate(student_ids=student_ids)
@@ -0,0 +1,270 @@
+"""Leaderboards: the top of the global ranking and every ``ClassGroup``'s standings.
+
+Each scope (``GLOBAL`` or a group id) has a ``Board`` in the Django cache:
+its students ordered by points, ties by student, kept sorted with ``bisect``.
+The global board holds the first ``LEADERBOARD_GLOBAL_SIZE`` students, a
+group board the whole (class-sized) group. A board finds a user's place,
+rank and dense rank in O(log n), and its entries have the shape of
+``RankedRankingSerializer``, so the views answer the same with and without
+boards.
+
+A change moves entries, it never recomputes a board: after commit,
+``Ranking.apply_delta``/``apply_deltas`` (and the ranking and group change
+signals in ``core.signals``) call ``record`` with the students whose points
+moved. Under each affected board's lock ``record`` reloads just those
+students' points and groups with one query and puts them back in place.
+Reloading the current points, instead of adding the deltas, keeps a board
+right when a change commits while the board is being built.
+
+A missing board is built from the database by the request that gets its
+lock; concurrent readers wait up to ``LOCK_WAIT`` seconds for it instead of
+each running the query. ``rebuild_leaderboards`` builds every board ahead of
+the first read.
+
+Every process must read and update the same boards, so several processes
+need a shared cache (``CACHE_BACKEND``); the default process-local cache
+serves a single development server.
+"""
+import time
+import uuid
+from bisect import bisect_left, insort
+from contextlib import ExitStack, contextmanager
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+
+from . import replicas
+from .models import ClassGroup, Ranking, StudentProfile
+
+GLOBAL = "global"
+# seconds a reader or writer waits for a board's lock, and after which a lock left by a crashed holder expires
+LOCK_WAIT = 2
+LOCK_TIMEOUT = 10
+FIELDS = ("student_id", "id", "student__user__username", "points", "student__user_id")
+
+
+class Board:
+    """Students of a scope by points, best first (ties by student id).
+
+    With a ``limit`` only the best ``limit`` students are kept; ``complete``
+    tells whether that is every student of the scope.
+    """
+
+    def __init__(self, limit=None):
+        self.limit = limit
+        self.complete = True
+        self.keys = []  # (-points, student_id), sorted
+        self.students = {}  # student_id -> (ranking id, username, points, user id)
+        self.users = {}  # user id -> student_id
+        self.counts = {}  # points -> number of students with them
+        self.distinct = []  # -points of every key of ``counts``, sorted
+
+    def __len__(self):
+        return len(self.keys)
+
+    @property
+    def short(self):
+        """Lost an entry that only the database can replace."""
+        return not self.complete and len(self.keys) < self.limit
+
+    def put(self, student_id, ranking_id, username, points, user_id):
+        """Add or move a student."""
+        self.remove(student_id)
+        key = (-points, student_id)
+        if not self.complete and self.keys and key > self.keys[-1]:
+            # somewhere below the kept part
+            return
+        insort(self.keys, key)
+        self.students[student_id] = (ranking_id, username, points, user_id)
+        self.users[user_id] = student_id
+        if points not in self.counts:
+            self.counts[points] = 0
+            insort(self.distinct, -points)
+        self.counts[points] += 1
+        if self.limit is not None and len(self.keys) > self.limit:
+            self.remove(self.keys[-1][1])
+            self.complete = False
+
+    def remove(self, student_id):
+        info = self.students.pop(student_id, None)
+        if info is None:
+            return
+        _ranking_id, _username, points, user_id = info
+        del self.keys[bisect_left(self.keys, (-points, student_id))]
+        self.users.pop(user_id, None)
+        self.counts[points] -= 1
+        if not self.counts[points]:
+            del self.counts[points]
+            del self.distinct[bisect_left(self.distinct, -points)]
+
+    def entry(self, index):
+        student_id = self.keys[index][1]
+        ranking_id, username, points, _user_id = self.students[student_id]
+        return {
+            "id": ranking_id,
+            "student": student_id,
+            "student_name": username,
+            "points": points,
+            # (-points,) sorts before every key with these points
+            "rank": bisect_left(self.keys, (-points,)) + 1,
+            "dense_rank": bisect_left(self.distinct, -points) + 1,
+        }
+
+    def top(self, n):
+        return [self.entry(i) for i in range(min(n, len(self.keys)))]
+
+    def index_of_user(self, user_id):
+        """Position of ``user_id``'s entry, or None."""
+        student_id = self.users.get(user_id)
+        if student_id is None:
+            return None
+        return bisect_left(self.keys, (-self.students[student_id][2], student_id))
+
+    def around(self, index, k):
+        return [self.entry(i) for i in range(max(index - k, 0), min(index + k + 1, len(self.keys)))]
+
+
+def enabled():
+    return getattr(settings, "LEADERBOARD_CACHE", True)
+
+
+def _key(scope):
+    return f"leaderboard:{scope}"
+
+
+def _lock_key(scope):
+    return f"leaderboard:{scope}:lock"
+
+
+@contextmanager
+def _locked(scope):
+    """Hold ``scope``'s lock; yields False if it wasn't free within ``LOCK_WAIT`` seconds."""
+    token = uuid.uuid4().hex
+    deadline = time.monotonic() + LOCK_WAIT
+    while not cache.add(_lock_key(scope), token, timeout=LOCK_TIMEOUT):
+        if time.monotonic() >= deadline:
+            yield False
+            return
+        time.sleep(0.01)
+    try:
+        yield True
+    finally:
+        if cache.get(_lock_key(scope)) == token:
+            cache.delete(_lock_key(scope))
+
+
+def _store(scope, board):
+    cache.set(_key(scope), board, timeout=settings.LEADERBOARD_CACHE_TIMEOUT)
+
+
+def _build(scope):
+    board = Board(limit=settings.LEADERBOARD_GLOBAL_SIZE if scope == GLOBAL else None)
+    # read from the primary: a board built from a lagging replica would stay stale in the cache
+    with replicas.primary():
+        if scope == GLOBAL:
+            # one more than kept, so the board knows whether it has everyone
+            rankings = Ranking.objects.order_by("-points", "student_id")[:board.limit + 1]
+        else:
+            rankings = Ranking.objects.filter(student__group_id=scope)
+        for row in rankings.values_list(*FIELDS):
+            board.put(*row)
+    return board
+
+
+def _board(scope):
+    board = cache.get(_key(scope))
+    if board is None:
+        with _locked(scope) as locked:
+            # whoever held the lock may have stored it meanwhile
+            board = cache.get(_key(scope))
+            if board is None:
+                board = _build(scope)
+                if locked:
+                    _store(scope, board)
+    return board
+
+
+async def _aboard(scope):
+    board = await cache.aget(_key(scope))
+    if board is None:
+        board = await sync_to_async(_board)(scope)
+    return board
+
+
+def top(n):
+    """The first ``n`` (at most ``LEADERBOARD_GLOBAL_SIZE``) entries of the global ranking."""
+    return _board(GLOBAL).top(n)
+
+
+async def atop(n):
+    """Async ``top`` for the ASGI views."""
+    return (await _aboard(GLOBAL)).top(n)
+
+
+def standings(group_id):
+    """``Board`` of the group."""
+    return _board(group_id)
+
+
+async def astandings(group_id):
+    """Async ``standings`` for the ASGI views."""
+    return await _aboard(group_id)
+
+
+def _update(scopes, student_ids):
+    """Put ``student_ids`` back on the stored boards of ``scopes`` from their current rankings."""
+    with ExitStack() as stack:
+        boards = {}
+        for scope in scopes:
+            if cache.get(_key(scope)) is None:
+                # built from the database, with this change, on the next read
+                continue
+            if not stack.enter_context(_locked(scope)):
+                cache.delete(_key(scope))
+                continue
+            board = cache.get(_key(scope))
+            if board is not None:
+                boards[scope] = board
+        if not boards:
+            return
+        with replicas.primary():
+            rows = {
+                row[0]: row
+                for row in Ranking.objects.filter(student_id__in=student_ids).values_list(*FIELDS, "student__group_id")
+            }
+        for scope, board in boards.items():
+            for student_id in student_ids:
+                row = rows.get(student_id)
+                if row is None or (scope != GLOBAL and row[-1] != scope):
+                    board.remove(student_id)
+                else:
+                    board.put(*row[:-1])
+            _store(scope, _build(scope) if board.short else board)
+
+
+def record(student_ids):
+    """The given students' points changed: move them on the global board and their groups' boards."""
+    student_ids = set(student_ids)
+    group_ids = StudentProfile.objects.filter(id__in=student_ids, group__isnull=False).values_list(
+        "group_id", flat=True
+    )
+    # locks are always taken global first, then by group id
+    _update([GLOBAL, *sorted(set(group_ids))], student_ids)
+
+
+def discard(student_id, group_id=None):
+    """A student left ``group_id`` (or the ranking): take them off the boards they no longer belong to."""
+    _update([GLOBAL] if group_id is None else [GLOBAL, group_id], {student_id})
+
+
+def rebuild_all():
+    """Build and store the global board and every group board; return the number of boards."""
+    scopes = [GLOBAL, *ClassGroup.objects.order_by("id").values_list("id", flat=True)]
+    for scope in scopes:
+        with _locked(scope) as locked:
+            if locked:
+                _store(scope, _build(scope))
+            else:
+                cache.delete(_key(scope))
+    return len(scopes)
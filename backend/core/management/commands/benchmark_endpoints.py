@@ -0,0 +1,240 @@
+import json
+import time
+from contextlib import ExitStack
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+from django.db.models import Count
+from rest_framework.test import APIClient
+
+from core import events, uploads
+from core.authentication import ProfileTokenObtainPairSerializer
+from core.metrics import QueryTimer
+from core.models import ClassGroup, ParentChildRelation, Submission, UploadSession
+
+# first bytes of the file sent by the upload endpoints; must pass core.uploads.sniff
+UPLOAD = b"%PDF-1.4\n" + b"0" * 1024
+
+
+def json_body(data):
+    return {"data": data, "format": "json"}
+
+
+# (name, actor, method, path, body); paths are formatted with the ids picked in _context(),
+# body is None or a function of those ids returning the keyword arguments of the client call.
+# Writes are rolled back after every request, so each one finds the same data.
+ENDPOINTS = [
+    ("my_tasks", "student", "get", "/api/my-tasks/", None),
+    ("me", "student", "get", "/api/my/", None),
+    ("top_ranking", "student", "get", "/api/top-ranking/", None),
+    ("group_ranking", "student", "get", "/api/ranking/group/{group}/?around=3", None),
+    ("submission_comments", "student", "get", "/api/submissions/{submission}/comments/", None),
+    ("tasks", "student", "get", "/api/tasks/", None),
+    ("search", "student", "get", "/api/search/?q=zadanie", None),
+    ("event_ticket", "student", "post", "/api/events/ticket/", None),
+    ("submissions", "teacher", "get", "/api/submissions/?student={student}", None),
+    ("teacher_students", "teacher", "get", "/api/teacher/my-students/", None),
+    ("teacher_groups", "teacher", "get", "/api/teacher/my-groups/", None),
+    ("teacher_student_submissions", "teacher", "get", "/api/teacher/student/{student}/submissions/", None),
+    ("teacher_comments", "teacher", "get", "/api/teacher/submission/{submission}/comments/", None),
+    ("gradebook", "teacher", "get", "/api/teacher/groups/{group}/gradebook/", None),
+    ("task_stats", "teacher", "get", "/api/teacher/tasks/{task}/stats/", None),
+    ("group_stats", "teacher", "get", "/api/teacher/groups/{group}/stats/", None),
+    ("task_export", "teacher", "get", "/api/teacher/tasks/{task}/export/", None),
+    ("group_export", "teacher", "get", "/api/teacher/groups/{group}/export/", None),
+    ("rankings", "teacher", "get", "/api/rankings/", None),
+    ("users", "teacher", "get", "/api/users/", None),
+    ("full_profile", "parent", "get", "/api/me/full-profile/", None),
+    ("parent_dashboard", "parent", "get", "/api/parent/dashboard/", None),
+    (
+        "set_grade", "teacher", "patch", "/api/submissions/{submission}/set_grade/",
+        lambda ids: json_body({"grade": 5}),
+    ),
+    (
+        "set_grades", "teacher", "post", "/api/submissions/set_grades/",
+        lambda ids: json_body({"grades": [{"submission_id": pk, "grade": 4} for pk in ids["group_submissions"]]}),
+    ),
+    (
+        "add_comment", "student", "post", "/api/submissions/{submission}/add_comment/",
+        lambda ids: json_body({"text": "Benchmark"}),
+    ),
+    (
+        "teacher_add_comment", "teacher", "post", "/api/teacher/submission/{submission}/add_comment/",
+        lambda ids: json_body({"text": "Benchmark"}),
+    ),
+    (
+        "submission_upsert", "student", "post", "/api/submissions/",
+        lambda ids: json_body({"task_id": ids["task"]}),
+    ),
+    (
+        "upload_init", "student", "post", "/api/submit-task/uploads/",
+        lambda ids: json_body({"task": ids["task"], "filename": "benchmark.pdf", "size": len(UPLOAD)}),
+    ),
+    (
+        "upload_chunk", "student", "put", "/api/submit-task/uploads/{upload}/",
+        lambda ids: {"data": UPLOAD, "content_type": "application/octet-stream", "HTTP_UPLOAD_OFFSET": "0"},
+    ),
+]
+
+
+class _Rollback(Exception):
+    pass
+
+
+def percentile(sorted_values, p):
+    return sorted_values[min(int(len(sorted_values) * p / 100), len(sorted_values) - 1)]
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark every API endpoint in-process against the current database (seed it with seed_world) "
+        "and report req/s, p50/p95/p99 latency and queries per request; writes are rolled back. "
+        "--save-baseline stores the results; --baseline compares against stored results and fails on regressions."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=50, help="Measured requests per endpoint.")
+        parser.add_argument("--warmup", type=int, default=3, help="Unmeasured requests per endpoint.")
+        parser.add_argument("--only", default="", help="Comma separated endpoint names.")
+        parser.add_argument("--save-baseline", metavar="PATH", help="Write the results as a baseline.")
+        parser.add_argument("--baseline", metavar="PATH", help="Fail if results regress against this baseline.")
+        parser.add_argument(
+            "--tolerance", type=float, default=0.25, help="Allowed relative p95 slowdown (default 25%%)."
+        )
+        parser.add_argument(
+            "--min-slowdown-ms", type=float, default=2.0, help="Ignore p95 slowdowns smaller than this."
+        )
+
+    def handle(self, *args, **options):
+        only = {name for name in options["only"].split(",") if name}
+        results = {}
+        self.stdout.write(
+            f"{'endpoint':<28} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'queries':>8}"
+        )
+        try:
+            # everything the benchmark writes, including the upload session, is rolled back at the end
+            with transaction.atomic():
+                context, users, upload = self._context()
+                clients = {actor: self._client(user) for actor, user in users.items()}
+                try:
+                    for name, actor, method, path, body in ENDPOINTS:
+                        if only and name not in only:
+                            continue
+                        if name == "event_ticket" and not events.streaming_available():
+                            self.stdout.write(f"{name:<28} skipped: event streaming is not available")
+                            continue
+                        kwargs = body(context) if body else {}
+                        result = self._measure(clients[actor], method, path.format(**context), kwargs, options)
+                        results[name] = result
+                        self.stdout.write(
+                            f"{name:<28} {result['rps']:>8.1f} {result['p50']:>8.2f} {result['p95']:>8.2f} "
+                            f"{result['p99']:>8.2f} {result['queries']:>8}"
+                        )
+                finally:
+                    uploads.remove_part(uploads.part_path(upload))
+                raise _Rollback
+        except _Rollback:
+            pass
+
+        if options["save_baseline"]:
+            with open(options["save_baseline"], "w") as f:
+                json.dump(results, f, indent=2, sort_keys=True)
+            self.stdout.write(f"Baseline written to {options['save_baseline']}")
+        if options["baseline"]:
+            self._compare(results, options)
+
+    def _context(self):
+        group = (
+            ClassGroup.objects.annotate(size=Count("students")).filter(size__gt=0).order_by("-size", "id").first()
+        )
+        if group is None:
+            raise CommandError("No group with students; run 'manage.py seed_world' first")
+        submission = (
+            Submission.objects.filter(student__group=group, task__created_by=group.teacher)
+            .annotate(comment_count=Count("comments"))
+            .select_related("student__user", "task")
+            .order_by("-comment_count", "id")
+            .first()
+        )
+        if submission is None:
+            raise CommandError(f"Group {group.id} has no submissions")
+        relation = ParentChildRelation.objects.filter(child=submission.student).select_related("parent__user").first()
+        if relation is None:
+            raise CommandError(f"Student {submission.student_id} has no parent")
+        users = {"student": submission.student.user, "teacher": group.teacher.user, "parent": relation.parent.user}
+        upload = UploadSession.objects.create(
+            student=submission.student, task=submission.task, filename="benchmark.pdf", size=len(UPLOAD)
+        )
+        group_submissions = list(
+            Submission.objects.filter(task=submission.task, student__group=group).values_list("id", flat=True)
+        )
+        context = {
+            "group": group.id,
+            "student": submission.student_id,
+            "submission": submission.id,
+            "task": submission.task_id,
+            "upload": upload.id,
+            "group_submissions": group_submissions,
+        }
+        return context, users, upload
+
+    def _client(self, user):
+        client = APIClient(SERVER_NAME="localhost")
+        token = ProfileTokenObtainPairSerializer.get_token(user).access_token
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+        return client
+
+    def _measure(self, client, method, path, kwargs, options):
+        for _ in range(options["warmup"]):
+            self._request(client, method, path, kwargs)
+        latencies, queries = [], 0
+        start = time.perf_counter()
+        for _ in range(options["requests"]):
+            elapsed, count = self._request(client, method, path, kwargs)
+            latencies.append(elapsed * 1000)
+            queries = max(queries, count)
+        total = time.perf_counter() - start
+        latencies.sort()
+        return {
+            "rps": round(options["requests"] / total, 1),
+            "p50": round(percentile(latencies, 50), 2),
+            "p95": round(percentile(latencies, 95), 2),
+            "p99": round(percentile(latencies, 99), 2),
+            "queries": queries,
+        }
+
+    def _request(self, client, method, path, kwargs):
+        timer = QueryTimer()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(timer))
+            if method != "get":
+                # a savepoint, rolled back once the request is measured
+                stack.enter_context(transaction.atomic())
+            start = time.perf_counter()
+            response = getattr(client, method)(path, **kwargs)
+            if response.streaming:
+                b"".join(response.streaming_content)
+            elapsed = time.perf_counter() - start
+            if method != "get":
+                transaction.set_rollback(True)
+        if not 200 <= response.status_code < 300:
+            raise CommandError(f"{method.upper()} {path} returned {response.status_code}")
+        return elapsed, timer.count
+
+    def _compare(self, results, options):
+        with open(options["baseline"]) as f:
+            baseline = json.load(f)
+        regressions = []
+        for name, result in results.items():
+            base = baseline.get(name)
+            if base is None:
+                continue
+            if result["queries"] > base["queries"]:
+                regressions.append(f"{name}: {result['queries']} queries (baseline {base['queries']})")
+            slower = result["p95"] - base["p95"]
+            if slower > options["min_slowdown_ms"] and result["p95"] > base["p95"] * (1 + options["tolerance"]):
+                regressions.append(f"{name}: p95 {result['p95']:.2f} ms (baseline {base['p95']:.2f} ms)")
+        if regressions:
+            raise CommandError("Regressions against baseline:\n  " + "\n  ".join(regressions))
+        self.stdout.write(self.style.SUCCESS(f"No regressions against {options['baseline']}"))
@@ -0,0 +1,93 @@
+import http.client
+import threading
+import time
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework_simplejwt.tokens import AccessToken
+
+from core.models import User
+
+DEFAULT_PATHS = "/api/my-tasks/,/api/top-ranking/,/api/my/"
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(int(len(sorted_values) * p / 100), len(sorted_values) - 1)]
+
+
+class Command(BaseCommand):
+    help = (
+        "Poll running servers concurrently and report throughput and latency percentiles. "
+        "Start the servers first, e.g. the WSGI path with "
+        "'gunicorn config.wsgi -w 4 -b :8000' and the ASGI path with "
+        "'uvicorn config.asgi:application --workers 4 --port 8001', then run "
+        "'benchmark_polling --target wsgi=http://localhost:8000 --target asgi=http://localhost:8001 "
+        "--username <student>'."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--target", action="append", required=True, help="name=base URL; repeatable.")
+        parser.add_argument("--username", required=True, help="User whose access token is sent.")
+        parser.add_argument("--paths", default=DEFAULT_PATHS, help="Comma separated paths polled round-robin.")
+        parser.add_argument("--concurrency", type=int, default=50, help="Concurrent pollers per target.")
+        parser.add_argument("--duration", type=float, default=10.0, help="Seconds per target.")
+
+    def handle(self, *args, **options):
+        user = User.objects.filter(username=options["username"]).first()
+        if user is None:
+            raise CommandError(f"No user {options['username']!r}")
+        token = str(AccessToken.for_user(user))
+        paths = [p.strip() for p in options["paths"].split(",") if p.strip()]
+
+        self.stdout.write(
+            f"{'target':>10} {'requests':>9} {'errors':>7} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}"
+        )
+        for target in options["target"]:
+            name, _, url = target.partition("=")
+            latencies, errors = self._run(url or name, token, paths, options["concurrency"], options["duration"])
+            latencies.sort()
+            self.stdout.write(
+                f"{name:>10} {len(latencies):>9} {errors:>7} {len(latencies) / options['duration']:>9.1f} "
+                f"{percentile(latencies, 50):>8.1f} {percentile(latencies, 95):>8.1f} {percentile(latencies, 99):>8.1f}"
+            )
+
+    def _run(self, base_url, token, paths, concurrency, duration):
+        url = urlsplit(base_url)
+        headers = {"Authorization": f"Bearer {token}"}
+        latencies, errors = [], [0]
+        lock = threading.Lock()
+        deadline = time.perf_counter() + duration
+
+        def poll(offset):
+            # one keep-alive connection per poller, like a browser tab polling
+            connection = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=30)
+            mine, failed, i = [], 0, offset
+            while time.perf_counter() < deadline:
+                path = paths[i % len(paths)]
+                i += 1
+                start = time.perf_counter()
+                try:
+                    connection.request("GET", path, headers=headers)
+                    response = connection.getresponse()
+                    response.read()
+                    ok = response.status < 400
+                except (OSError, http.client.HTTPException):
+                    connection.close()
+                    ok = False
+                if ok:
+                    mine.append((time.perf_counter() - start) * 1000)
+                else:
+                    failed += 1
+            connection.close()
+            with lock:
+                latencies.extend(mine)
+                errors[0] += failed
+
+        threads = [threading.Thread(target=poll, args=(n,)) for n in range(concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return latencies, errors[0]
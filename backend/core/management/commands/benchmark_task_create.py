@@ -0,0 +1,59 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from core.models import ClassGroup, StudentProfile, TeacherProfile, User
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure TeacherTaskCreateView request time against group size. "
+        "All data is created inside a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", default="10,50,100,400", help="Comma separated group sizes.")
+        parser.add_argument("--repeat", type=int, default=3, help="Requests per size (best is reported).")
+
+    def handle(self, *args, **options):
+        sizes = [int(s) for s in options["sizes"].split(",")]
+        self.stdout.write(f"{'students':>9} {'best ms':>9} {'queries':>8}")
+        try:
+            with transaction.atomic():
+                teacher_user = User.objects.create_user(username="bench_teacher", role="teacher")
+                teacher = TeacherProfile.objects.create(user=teacher_user, subject="Bench")
+                client = APIClient(SERVER_NAME="localhost")
+                client.force_authenticate(user=teacher_user)
+                for size in sizes:
+                    group = self._make_group(teacher, size)
+                    best, queries = None, None
+                    for i in range(options["repeat"]):
+                        with CaptureQueriesContext(connection) as ctx:
+                            start = time.perf_counter()
+                            response = client.post(
+                                "/api/teacher/tasks/create/",
+                                {"name": f"bench {size}/{i}", "description": "bench", "group": group.id},
+                            )
+                            elapsed = (time.perf_counter() - start) * 1000
+                        assert response.status_code == 201, response.content
+                        if best is None or elapsed < best:
+                            best, queries = elapsed, len(ctx.captured_queries)
+                    self.stdout.write(f"{size:>9} {best:>9.1f} {queries:>8}")
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def _make_group(self, teacher, size):
+        group = ClassGroup.objects.create(name=f"bench {size}", teacher=teacher)
+        users = User.objects.bulk_create(
+            User(username=f"bench_{group.id}_{i}", role="student") for i in range(size)
+        )
+        StudentProfile.objects.bulk_create(StudentProfile(user=u, group=group) for u in users)
+        return group
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from core import uploads
+
+
+class Command(BaseCommand):
+    help = "Delete expired chunked upload sessions and part files that no session owns."
+
+    def handle(self, *args, **options):
+        sessions, files = uploads.cleanup()
+        self.stdout.write(self.style.SUCCESS(f"Deleted {sessions} expired sessions and {files} orphaned part files"))
@@ -0,0 +1,29 @@
+import os
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+
+from core.storage import BLOB_DIR, DeduplicatingStorage
+
+
+class Command(BaseCommand):
+    help = "Convert an existing MEDIA_ROOT in place: link every file to a shared blob of its content."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true", help="Only report how much would be saved.")
+
+    def handle(self, *args, **options):
+        if not isinstance(default_storage, DeduplicatingStorage):
+            raise CommandError("Default storage is not core.storage.DeduplicatingStorage")
+        count = saved = 0
+        for root, dirs, files in os.walk(default_storage.location):
+            if root == default_storage.location and BLOB_DIR in dirs:
+                dirs.remove(BLOB_DIR)
+            for filename in files:
+                path = os.path.join(root, filename)
+                if os.path.islink(path) or not os.path.isfile(path):
+                    continue
+                saved += default_storage.adopt(path, dry_run=options["dry_run"])
+                count += 1
+        verb = "Would save" if options["dry_run"] else "Saved"
+        self.stdout.write(self.style.SUCCESS(f"Checked {count} files. {verb} {saved} bytes"))
@@ -0,0 +1,33 @@
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import Submission, Task
+from core.storage import DeduplicatingStorage
+
+UPLOAD_DIRS = ("task_files", "submissions")
+
+
+class Command(BaseCommand):
+    help = "Delete stored files no task or submission refers to, then the contents nothing links to any more."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true", help="Only report what would be deleted.")
+        parser.add_argument(
+            "--min-age", type=int, default=3600,
+            help="Keep unreferenced files stored less than this many seconds ago (default: 3600).",
+        )
+
+    def handle(self, *args, **options):
+        if not isinstance(default_storage, DeduplicatingStorage):
+            raise CommandError("Default storage is not core.storage.DeduplicatingStorage")
+        referenced = set()
+        for model in (Task, Submission):
+            referenced.update(model.objects.exclude(file="").exclude(file__isnull=True).values_list("file", flat=True))
+        dropped = default_storage.drop_unreferenced(
+            referenced, UPLOAD_DIRS, min_age=options["min_age"], dry_run=options["dry_run"]
+        )
+        count, freed = default_storage.collect_garbage(
+            dry_run=options["dry_run"], ignore=dropped if options["dry_run"] else ()
+        )
+        verb = "Would remove" if options["dry_run"] else "Removed"
+        self.stdout.write(self.style.SUCCESS(f"{verb} {len(dropped)} unreferenced files and {count} blobs ({freed} bytes)"))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from core import leaderboard
+
+
+class Command(BaseCommand):
+    help = "Build the global and every group's leaderboard from the database and store them in the cache."
+
+    def handle(self, *args, **options):
+        count = leaderboard.rebuild_all()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {count} leaderboards"))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from core.models import Ranking, StudentProfile
+
+
+class Command(BaseCommand):
+    help = "Recompute every student's ranking points from graded submissions."
+
+    def handle(self, *args, **options):
+        count = 0
+        for student in StudentProfile.objects.all().iterator():
+            ranking, _ = Ranking.objects.get_or_create(student=student)
+            ranking.update_points()
+            count += 1
+        self.stdout.write(self.style.SUCCESS(f"Recomputed {count} rankings"))
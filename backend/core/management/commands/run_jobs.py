@@ -0,0 +1,66 @@
+import multiprocessing
+import signal
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from core import jobs
+
+
+class Command(BaseCommand):
+    help = (
+        "Run background job workers (core.jobs). Each of the --processes workers claims jobs with "
+        "SELECT ... FOR UPDATE SKIP LOCKED; SIGTERM/SIGINT let them finish the current job and exit."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--processes", type=int, default=1, help="Number of worker processes.")
+        parser.add_argument("--batch", type=int, default=1, help="Jobs claimed per query.")
+        parser.add_argument("--burst", action="store_true", help="Exit once the queue is empty.")
+        parser.add_argument("--poll-interval", type=float, help="Seconds to sleep when the queue is empty.")
+
+    def handle(self, *args, **options):
+        work_options = {
+            "batch": options["batch"],
+            "burst": options["burst"],
+            "poll_interval": options["poll_interval"],
+        }
+        if options["processes"] <= 1:
+            processed = _work(work_options)
+            self.stdout.write(self.style.SUCCESS(f"Processed {processed} jobs"))
+            return
+
+        # children must not share the parent's database connections
+        connections.close_all()
+        processes = [
+            multiprocessing.Process(target=_work, args=(work_options,), daemon=False)
+            for _ in range(options["processes"])
+        ]
+        for process in processes:
+            process.start()
+        self.stdout.write(f"Started {len(processes)} workers")
+
+        def forward(signum, frame):
+            for process in processes:
+                if process.is_alive():
+                    process.terminate()
+
+        signal.signal(signal.SIGTERM, forward)
+        signal.signal(signal.SIGINT, forward)
+        for process in processes:
+            process.join()
+        self.stdout.write(self.style.SUCCESS("Workers stopped"))
+
+
+def _work(options):
+    stopping = []
+
+    def stop(signum, frame):
+        stopping.append(signum)
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    try:
+        return jobs.work(should_stop=lambda: bool(stopping), **options)
+    finally:
+        connections.close_all()
@@ -0,0 +1,191 @@
+import random
+from datetime import datetime, time, timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from core import leaderboard, stats
+from core.models import (
+    ClassGroup,
+    Comment,
+    ParentChildRelation,
+    ParentProfile,
+    Ranking,
+    StudentProfile,
+    Submission,
+    Task,
+    TeacherProfile,
+    User,
+)
+
+FIRST_NAMES = ["Anna", "Jan", "Maria", "Piotr", "Katarzyna", "Tomasz", "Zofia", "Michał", "Julia", "Kacper"]
+LAST_NAMES = ["Nowak", "Kowalski", "Wiśniewski", "Wójcik", "Kamiński", "Lewandowski", "Zieliński", "Szymański"]
+SUBJECTS = ["Matematyka", "Polski", "Historia", "Biologia", "Fizyka", "Chemia", "Geografia", "Angielski"]
+COMMENTS = ["Dobra robota!", "Popraw zadanie 2.", "Proszę o więcej szczegółów.", "Dziękuję, poprawiłem.", "Świetnie."]
+BATCH = 1000
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a synthetic school world (groups, teachers, students, parents, tasks, submissions "
+        "with files, comments and rankings) using bulk inserts."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--schools", type=int, default=1)
+        parser.add_argument("--groups-per-school", type=int, default=10)
+        parser.add_argument("--teachers-per-school", type=int, default=8)
+        parser.add_argument("--students-per-group", type=int, default=25)
+        parser.add_argument("--tasks-per-group", type=int, default=20)
+        parser.add_argument("--submission-rate", type=float, default=0.8, help="Share of assignments submitted.")
+        parser.add_argument("--graded-rate", type=float, default=0.6, help="Share of submissions graded.")
+        parser.add_argument("--comments-per-submission", type=int, default=2, help="Upper bound, random per submission.")
+        parser.add_argument("--no-files", action="store_true", help="Don't store files for submissions.")
+        parser.add_argument("--prefix", default="seed", help="Username prefix; must not be in use yet.")
+        parser.add_argument("--password", default="haslo123", help="Password of every seeded user.")
+        parser.add_argument("--seed", type=int, default=0, help="Random seed.")
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options["seed"])
+        self.prefix = options["prefix"]
+        if User.objects.filter(username__startswith=f"{self.prefix}_").exists():
+            raise CommandError(f"Users with prefix {self.prefix!r} already exist; pick another --prefix")
+        self.password = make_password(options["password"])
+        self.now = timezone.now()
+
+        with transaction.atomic():
+            counts = self._seed(options)
+        if leaderboard.enabled():
+            leaderboard.rebuild_all()
+        self.stdout.write(self.style.SUCCESS(", ".join(f"{count} {name}" for name, count in counts.items())))
+
+    def _users(self, role, count, label):
+        users = [
+            User(
+                username=f"{self.prefix}_{label}{i}",
+                first_name=self.random.choice(FIRST_NAMES),
+                last_name=self.random.choice(LAST_NAMES),
+                email=f"{self.prefix}_{label}{i}@example.com",
+                role=role,
+                password=self.password,
+            )
+            for i in range(count)
+        ]
+        return User.objects.bulk_create(users, batch_size=BATCH)
+
+    def _seed(self, options):
+        schools = options["schools"]
+        teacher_users = self._users(User.Role.TEACHER, schools * options["teachers_per_school"], "t")
+        teachers = TeacherProfile.objects.bulk_create(
+            [TeacherProfile(user=u, subject=self.random.choice(SUBJECTS)) for u in teacher_users], batch_size=BATCH
+        )
+        groups = []
+        for school in range(schools):
+            staff = teachers[school * options["teachers_per_school"]:(school + 1) * options["teachers_per_school"]]
+            for g in range(options["groups_per_school"]):
+                groups.append(ClassGroup(name=f"Szkoła {school + 1} klasa {g + 1}", teacher=staff[g % len(staff)]))
+        groups = ClassGroup.objects.bulk_create(groups, batch_size=BATCH)
+
+        per_group = options["students_per_group"]
+        student_users = self._users(User.Role.STUDENT, len(groups) * per_group, "s")
+        students = StudentProfile.objects.bulk_create(
+            [StudentProfile(user=u, group=groups[i // per_group]) for i, u in enumerate(student_users)],
+            batch_size=BATCH,
+        )
+        parent_users = self._users(User.Role.PARENT, len(students), "p")
+        parents = ParentProfile.objects.bulk_create([ParentProfile(user=u) for u in parent_users], batch_size=BATCH)
+        ParentChildRelation.objects.bulk_create(
+            [ParentChildRelation(parent=p, child=s) for p, s in zip(parents, students)], batch_size=BATCH
+        )
+
+        tasks, task_groups = [], []
+        for group in groups:
+            for t in range(options["tasks_per_group"]):
+                task_groups.append(group.id)
+                tasks.append(Task(
+                    name=f"{group.name}: zadanie {t + 1}",
+                    description=f"Opis zadania {t + 1} dla klasy {group.name}.",
+                    deadline=timezone.localdate(self.now) + timedelta(days=self.random.randint(-60, 30)),
+                    created_by=group.teacher,
+                ))
+        tasks = Task.objects.bulk_create(tasks, batch_size=BATCH)
+        members = {group.id: students[i * per_group:(i + 1) * per_group] for i, group in enumerate(groups)}
+        Through = Task.assigned_students.through
+        Through.objects.bulk_create(
+            [
+                Through(task_id=task.id, studentprofile_id=student.id)
+                for task, group_id in zip(tasks, task_groups)
+                for student in members[group_id]
+            ],
+            batch_size=BATCH,
+        )
+
+        samples = [] if options["no_files"] else [
+            f"%PDF-1.4\n% seed {n}\n".encode() + bytes(self.random.getrandbits(8) for _ in range(2048))
+            for n in range(8)
+        ]
+        submissions, points = [], {}
+        for task, group_id in zip(tasks, task_groups):
+            for student in members[group_id]:
+                submitted = self.random.random() < options["submission_rate"]
+                submission = Submission(task=task, student=student, status="pending", submitted_at=None)
+                if submitted:
+                    submission.status = "submitted"
+                    # up to two days late, and never in the future
+                    end_of_deadline = datetime.combine(task.deadline, time.max, tzinfo=timezone.get_current_timezone())
+                    submission.submitted_at = min(
+                        end_of_deadline - timedelta(hours=self.random.randint(-48, 240)), self.now
+                    )
+                    if samples:
+                        name = f"submissions/{student.user_id}/zadanie_{task.id}.pdf"
+                        submission.file = default_storage.save(name, ContentFile(self.random.choice(samples)))
+                    if self.random.random() < options["graded_rate"]:
+                        submission.status = "approved"
+                        submission.grade = self.random.randint(0, 6)
+                        points[student.id] = points.get(student.id, 0) + submission.grade
+                submissions.append(submission)
+        submissions = Submission.objects.bulk_create(submissions, batch_size=BATCH)
+
+        teacher_user_by_profile = {t.id: t.user for t in teachers}
+        students_by_id = {s.id: s for s in students}
+        task_by_id = {t.id: t for t in tasks}
+        comments = []
+        for submission in submissions:
+            if submission.status == "pending":
+                continue
+            for _ in range(self.random.randint(0, options["comments_per_submission"])):
+                teacher_says = self.random.random() < 0.6
+                author = (
+                    teacher_user_by_profile[task_by_id[submission.task_id].created_by_id]
+                    if teacher_says
+                    else students_by_id[submission.student_id].user
+                )
+                comments.append(Comment(
+                    submission_id=submission.id,
+                    author=author,
+                    text=self.random.choice(COMMENTS),
+                    role="teacher" if teacher_says else "student",
+                ))
+        Comment.objects.bulk_create(comments, batch_size=BATCH)
+
+        Ranking.objects.bulk_create(
+            [Ranking(student=s, points=points.get(s.id, 0)) for s in students], batch_size=BATCH
+        )
+        for s in students:
+            s.points = points.get(s.id, 0)
+        StudentProfile.objects.bulk_update(students, ["points"], batch_size=BATCH)
+        stats.rebuild(task_ids=[t.id for t in tasks], group_ids=[g.id for g in groups])
+
+        return {
+            "groups": len(groups),
+            "teachers": len(teachers),
+            "students": len(students),
+            "parents": len(parents),
+            "tasks": len(tasks),
+            "submissions": len(submissions),
+            "comments": len(comments),
+        }
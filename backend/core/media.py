@@ -0,0 +1,163 @@
+"""Access-controlled serving of uploaded task and submission files.
+
+``/media/<name>`` is answered by ``MediaView``: the caller must own the
+``Submission`` or ``Task`` the file belongs to (see ``can_access``). Browsers
+load files through ``<img src>``/links without the JWT header, so URLs rendered
+by the API carry a ``?token=`` bound to the user and the file name, valid for
+``MEDIA_TOKEN_MAX_AGE`` seconds.
+
+Responses support ``Range``, ``ETag`` and ``Last-Modified``. With
+``MEDIA_SENDFILE`` set to ``"x-accel-redirect"`` (nginx) or ``"x-sendfile"``
+(Apache, lighttpd) the file itself is left to the front proxy.
+"""
+import mimetypes
+import os
+import re
+from urllib.parse import quote, urlencode
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.signing import BadSignature, SignatureExpired, TimestampSigner
+from django.db.models import Q
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, parse_etags, quote_etag
+
+from .models import Submission, Task, User
+
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+READ_SIZE = 64 * 1024
+
+
+def _signer(name):
+    return TimestampSigner(salt=f"core.media:{name}")
+
+
+def token(user_id, name):
+    return _signer(name).sign(str(user_id))
+
+
+def user_from_token(value, name):
+    """The active user ``value`` was issued to for ``name``, or None; raises ``SignatureExpired``."""
+    try:
+        user_id = _signer(name).unsign(value or "", max_age=settings.MEDIA_TOKEN_MAX_AGE)
+    except SignatureExpired:
+        raise
+    except BadSignature:
+        return None
+    if not user_id.isdigit():
+        return None
+    return User.objects.filter(pk=user_id, is_active=True).first()
+
+
+def file_url(request, file):
+    """Absolute URL of ``file`` that the requesting user can open without headers."""
+    url = file.url
+    user = getattr(request, "user", None)
+    if user is not None and user.is_authenticated:
+        url = f"{url}?{urlencode({'token': token(user.pk, file.name)})}"
+    return request.build_absolute_uri(url) if request is not None else url
+
+
+def can_access(user, name):
+    """Whether ``user`` may read the submission or task file stored as ``name``."""
+    if user.is_staff:
+        return True
+    submissions = Submission.objects.filter(
+        Q(student__user=user) | Q(task__created_by__user=user) | Q(student__parents__parent__user=user),
+        file=name,
+    )
+    if submissions.exists():
+        return True
+    tasks = Task.objects.filter(
+        Q(created_by__user=user)
+        | Q(assigned_students__user=user)
+        | Q(assigned_students__parents__parent__user=user),
+        file=name,
+    )
+    return tasks.exists()
+
+
+def _byte_range(request, size, etag, last_modified):
+    """``(start, end)`` of a satisfiable single range, None for the whole file, or ``False``."""
+    header = request.META.get("HTTP_RANGE")
+    if not header:
+        return None
+    if_range = request.META.get("HTTP_IF_RANGE")
+    if if_range and if_range not in parse_etags(etag) + [http_date(last_modified)]:
+        return None
+    match = RANGE_RE.match(header.strip())
+    if not match or match.groups() == ("", ""):
+        # several ranges or an unknown unit: answering with the whole file is allowed
+        return None
+    first, last = match.groups()
+    if first and last and int(last) < int(first):
+        return None
+    if first:
+        start, end = int(first), min(int(last), size - 1) if last else size - 1
+    else:
+        start, end = max(size - int(last), 0), size - 1
+    if start > end or start >= size:
+        return False
+    return start, end
+
+
+def _read_range(path, start, length):
+    with open(path, "rb") as f:
+        f.seek(start)
+        while length > 0:
+            chunk = f.read(min(READ_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def serve(request, name):
+    """Response with the stored file ``name``; access must be checked before."""
+    try:
+        path = default_storage.path(name)
+        stat = os.stat(path)
+    except (OSError, ValueError):
+        raise Http404
+    etag = quote_etag(f"{stat.st_ino:x}-{stat.st_size:x}-{stat.st_mtime_ns:x}")
+    last_modified = int(stat.st_mtime)
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = _file_response(request, name, path, stat.st_size, etag, last_modified)
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(last_modified)
+    patch_cache_control(response, private=True, max_age=settings.MEDIA_CACHE_MAX_AGE)
+    return response
+
+
+def _file_response(request, name, path, size, etag, last_modified):
+    content_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+    sendfile = getattr(settings, "MEDIA_SENDFILE", "")
+    if sendfile == "x-accel-redirect":
+        # nginx handles Range and conditional requests for internal redirects itself
+        response = HttpResponse(content_type=content_type)
+        response["X-Accel-Redirect"] = quote(settings.MEDIA_ACCEL_PREFIX + name)
+        return response
+    if sendfile == "x-sendfile":
+        response = HttpResponse(content_type=content_type)
+        response["X-Sendfile"] = path
+        return response
+
+    byte_range = _byte_range(request, size, etag, last_modified)
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response["Content-Range"] = f"bytes */{size}"
+        return response
+    if byte_range is None:
+        response = FileResponse(open(path, "rb"), content_type=content_type)
+    else:
+        start, end = byte_range
+        response = StreamingHttpResponse(
+            _read_range(path, start, end - start + 1), status=206, content_type=content_type
+        )
+        response["Content-Length"] = str(end - start + 1)
+        response["Content-Range"] = f"bytes {start}-{end}/{size}"
+    response["Accept-Ranges"] = "bytes"
+    return response
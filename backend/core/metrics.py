@@ -0,0 +1,209 @@
+"""Per-endpoint request metrics in the Prometheus text format.
+
+``MetricsMiddleware`` times every request and counts the database queries
+(and their time) it ran, then records them under the resolved URL route
+template and method, e.g. ``api/submissions/<int:pk>/comments/`` - never the
+raw path, so the number of series stays bounded. ``metrics_view`` serves the
+registry on ``/metrics``, only to Prometheus: requests must carry
+``METRICS_TOKEN`` as a Bearer token or come from ``METRICS_ALLOWED_IPS``, and
+the endpoint answers 403 to everyone while neither is configured.
+
+The middleware runs natively under both WSGI and ASGI. Queries are counted
+by a wrapper that ``core.signals`` installs on every database connection as
+it opens, in whatever thread runs them; it adds to the ``QueryTimer`` of the
+current request, found through a context variable that ``sync_to_async``
+carries into the worker thread.
+
+Metrics live in process memory: with several worker processes each one
+reports its own numbers, so scrape every worker (or run one per container).
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.crypto import constant_time_compare
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+UNMATCHED = "<unmatched>"
+METHODS = {"GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"}
+
+_timer = ContextVar("query_timer", default=None)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names, values, extra=""):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    def __init__(self, name, documentation, labelnames):
+        self.name, self.documentation, self.labelnames = name, documentation, labelnames
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def inc(self, labels, amount=1):
+        with self.lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self.lock:
+            for labels, value in sorted(self.values.items()):
+                lines.append(f"{self.name}{_labels(self.labelnames, labels)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, documentation, labelnames, buckets):
+        self.name, self.documentation, self.labelnames = name, documentation, labelnames
+        self.buckets = tuple(buckets)
+        self.values = {}  # labels -> [count per bucket (+Inf last), sum]
+        self.lock = threading.Lock()
+
+    def observe(self, labels, value):
+        index = bisect_left(self.buckets, value)
+        with self.lock:
+            series = self.values.get(labels)
+            if series is None:
+                series = self.values[labels] = [[0] * (len(self.buckets) + 1), 0]
+            series[0][index] += 1
+            series[1] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self.lock:
+            for labels, (counts, total) in sorted(self.values.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets + ("+Inf",), counts):
+                    cumulative += count
+                    le = _labels(self.labelnames, labels, f'le="{bound}"')
+                    lines.append(f"{self.name}_bucket{le} {cumulative}")
+                lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {total}")
+                lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+ROUTE = ("route", "method")
+REQUESTS = Counter("http_requests_total", "Requests by route, method and status.", ROUTE + ("status",))
+LATENCY = Histogram("http_request_duration_seconds", "Request latency.", ROUTE, LATENCY_BUCKETS)
+RESPONSE_SIZE = Histogram("http_response_size_bytes", "Response body size.", ROUTE, SIZE_BUCKETS)
+DB_QUERIES = Histogram("http_request_db_queries", "Database queries per request.", ROUTE, QUERY_BUCKETS)
+DB_TIME = Histogram("http_request_db_duration_seconds", "Database time per request.", ROUTE, LATENCY_BUCKETS)
+REGISTRY = [REQUESTS, LATENCY, RESPONSE_SIZE, DB_QUERIES, DB_TIME]
+
+
+class QueryTimer:
+    """``connection.execute_wrapper`` counting queries and their duration."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+
+
+def time_queries(execute, sql, params, many, context):
+    """Connection-wide ``execute_wrapper`` feeding the current request's ``QueryTimer``."""
+    timer = _timer.get()
+    if timer is None:
+        return execute(sql, params, many, context)
+    return timer(execute, sql, params, many, context)
+
+
+def instrument(connection):
+    if time_queries not in connection.execute_wrappers:
+        # first, so execute_wrapper() blocks still pop their own wrapper
+        connection.execute_wrappers.insert(0, time_queries)
+
+
+def _route(request):
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return UNMATCHED
+    return match.route or match.view_name or UNMATCHED
+
+
+class MetricsMiddleware:
+    sync_capable = async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        timer = QueryTimer()
+        token = _timer.set(timer)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _timer.reset(token)
+        self.record(request, response, time.perf_counter() - start, timer)
+        return response
+
+    async def __acall__(self, request):
+        timer = QueryTimer()
+        token = _timer.set(timer)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _timer.reset(token)
+        self.record(request, response, time.perf_counter() - start, timer)
+        return response
+
+    def record(self, request, response, elapsed, timer):
+        method = request.method if request.method in METHODS else "OTHER"
+        labels = (_route(request), method)
+        REQUESTS.inc(labels + (str(response.status_code),))
+        LATENCY.observe(labels, elapsed)
+        DB_QUERIES.observe(labels, timer.count)
+        DB_TIME.observe(labels, timer.duration)
+        if not response.streaming:
+            RESPONSE_SIZE.observe(labels, len(response.content))
+        elif response.has_header("Content-Length"):
+            RESPONSE_SIZE.observe(labels, int(response["Content-Length"]))
+
+
+def render():
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+def allowed(request):
+    """Whether ``request`` carries ``METRICS_TOKEN`` or comes from ``METRICS_ALLOWED_IPS``; never open by default."""
+    token = getattr(settings, "METRICS_TOKEN", "")
+    if token and constant_time_compare(request.headers.get("Authorization", ""), f"Bearer {token}"):
+        return True
+    return request.META.get("REMOTE_ADDR") in getattr(settings, "METRICS_ALLOWED_IPS", [])
+
+
+def metrics_view(request):
+    """``/metrics`` for Prometheus, for the callers ``allowed`` lets in."""
+    if not allowed(request):
+        return HttpResponse(status=403)
+    return HttpResponse(render(), content_type="text/plain; version=0.0.4; charset=utf-8")
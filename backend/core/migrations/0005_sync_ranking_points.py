@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:12
+
+from django.db import migrations
+from django.db.models import Sum
+
+
+def sync_ranking_points(apps, schema_editor):
+    StudentProfile = apps.get_model("core", "StudentProfile")
+    Ranking = apps.get_model("core", "Ranking")
+    Submission = apps.get_model("core", "Submission")
+
+    totals = dict(
+        Submission.objects.filter(grade__isnull=False)
+        .values("student_id")
+        .annotate(total=Sum("grade"))
+        .values_list("student_id", "total")
+    )
+    existing = set(Ranking.objects.values_list("student_id", flat=True))
+    Ranking.objects.bulk_create(
+        Ranking(student_id=student_id, points=0)
+        for student_id in StudentProfile.objects.exclude(id__in=existing).values_list("id", flat=True)
+    )
+    for student_id, total in totals.items():
+        Ranking.objects.filter(student_id=student_id).update(points=total)
+        StudentProfile.objects.filter(id=student_id).update(points=total)
+    Ranking.objects.exclude(student_id__in=totals).update(points=0)
+    StudentProfile.objects.exclude(id__in=totals).update(points=0)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0004_task_file_alter_submission_status"),
+    ]
+
+    operations = [
+        migrations.RunPython(sync_ranking_points, migrations.RunPython.noop),
+    ]
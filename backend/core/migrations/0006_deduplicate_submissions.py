@@ -0,0 +1,53 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:05
+
+from django.db import migrations
+from django.db.models import Count, Sum
+
+
+def deduplicate_submissions(apps, schema_editor):
+    """Keep one submission per (student, task) before adding the constraint.
+
+    The graded row wins, then the most recent one; comments of the dropped
+    duplicates are moved to the kept row and the affected students' points
+    are recomputed.
+    """
+    Submission = apps.get_model("core", "Submission")
+    Comment = apps.get_model("core", "Comment")
+    Ranking = apps.get_model("core", "Ranking")
+    StudentProfile = apps.get_model("core", "StudentProfile")
+
+    duplicates = (
+        Submission.objects.values("student_id", "task_id")
+        .annotate(n=Count("id"))
+        .filter(n__gt=1)
+    )
+    students = set()
+    for dup in duplicates:
+        rows = list(
+            Submission.objects.filter(student_id=dup["student_id"], task_id=dup["task_id"])
+            .order_by("-id")
+        )
+        keep = next((s for s in rows if s.grade is not None), rows[0])
+        dropped = [s.id for s in rows if s.id != keep.id]
+        Comment.objects.filter(submission_id__in=dropped).update(submission_id=keep.id)
+        Submission.objects.filter(id__in=dropped).delete()
+        students.add(dup["student_id"])
+
+    for student_id in students:
+        total = (
+            Submission.objects.filter(student_id=student_id, grade__isnull=False)
+            .aggregate(total=Sum("grade"))["total"]
+            or 0
+        )
+        Ranking.objects.filter(student_id=student_id).update(points=total)
+        StudentProfile.objects.filter(id=student_id).update(points=total)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0005_sync_ranking_points"),
+    ]
+
+    operations = [
+        migrations.RunPython(deduplicate_submissions, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0006_deduplicate_submissions"),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name="submission",
+            constraint=models.UniqueConstraint(
+                fields=("student", "task"), name="unique_submission_per_task"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="comment",
+            index=models.Index(
+                fields=["submission", "created_at"],
+                name="comment_submission_created_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="ranking",
+            index=models.Index(fields=["-points"], name="ranking_points_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="task",
+            index=models.Index(fields=["-created_at"], name="task_created_at_idx"),
+        ),
+    ]
@@ -0,0 +1,71 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:25
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0010_job"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="GradeStats",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("assigned", models.IntegerField(default=0)),
+                ("submitted", models.IntegerField(default=0)),
+                ("on_time", models.IntegerField(default=0)),
+                ("graded", models.IntegerField(default=0)),
+                ("grade_sum", models.IntegerField(default=0)),
+                ("grade_0", models.IntegerField(default=0)),
+                ("grade_1", models.IntegerField(default=0)),
+                ("grade_2", models.IntegerField(default=0)),
+                ("grade_3", models.IntegerField(default=0)),
+                ("grade_4", models.IntegerField(default=0)),
+                ("grade_5", models.IntegerField(default=0)),
+                ("grade_6", models.IntegerField(default=0)),
+                (
+                    "group",
+                    models.OneToOneField(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="grade_stats",
+                        to="core.classgroup",
+                    ),
+                ),
+                (
+                    "task",
+                    models.OneToOneField(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="grade_stats",
+                        to="core.task",
+                    ),
+                ),
+            ],
+            options={
+                "constraints": [
+                    models.CheckConstraint(
+                        condition=models.Q(
+                            models.Q(("group__isnull", True), ("task__isnull", False)),
+                            models.Q(("group__isnull", False), ("task__isnull", True)),
+                            _connector="OR",
+                        ),
+                        name="grade_stats_one_scope",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:02
+
+from django.db import migrations
+
+
+def install(apps, schema_editor):
+    from core import search
+
+    search.install(schema_editor.connection)
+
+
+def uninstall(apps, schema_editor):
+    from core import search
+
+    search.uninstall(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0011_gradestats"),
+    ]
+
+    operations = [
+        migrations.RunPython(install, uninstall),
+    ]
@@ -1,4 +1,8 @@
-from django.db import models
+import uuid
+
+from django.db import models, transaction
+from django.db.models import Case, F, Value, When, Window
+from django.db.models.functions import DenseRank, Rank
 from django.contrib.auth.models import AbstractUser
 from django.conf import settings
 from django.contrib.auth import get_user_model
@@ -38,6 +42,14 @@ class StudentProfile(models.Model):
     points = models.PositiveIntegerField(default=0)
     group = models.ForeignKey(ClassGroup, on_delete=models.CASCADE, related_name="students", null=True, blank=True)
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # remembered so the leaderboard can drop the student from their old group
+        if "group_id" in field_names:
+            instance._loaded_group_id = instance.group_id
+        return instance
+
     def __str__(self):
         return self.user.username
 
@@ -62,6 +74,54 @@ class Task(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     file = models.FileField(upload_to='task_files/', null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["-created_at"], name="task_created_at_idx"),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # remembered so grade statistics can recount on-time submissions when it changes
+        if "deadline" in field_names:
+            instance._loaded_deadline = instance.deadline
+        return instance
+
+    def assign_students(self, students):
+        """Assign ``students`` and create their pending submissions in bulk.
+
+        Runs a fixed number of queries regardless of how many students are
+        assigned; ranking signals are bypassed since pending submissions
+        carry no grade, and grade statistics are updated in one go.
+        """
+        from . import leaderboard, stats
+
+        group_ids = {s.id: s.group_id for s in students}
+        student_ids = list(group_ids)
+        Through = Task.assigned_students.through
+        with transaction.atomic():
+            Through.objects.bulk_create(
+                [Through(task_id=self.id, studentprofile_id=sid) for sid in student_ids],
+                ignore_conflicts=True,
+            )
+            existing = set(
+                Submission.objects.filter(task=self, student_id__in=student_ids).values_list("student_id", flat=True)
+            )
+            created = Submission.objects.bulk_create(
+                Submission(task=self, student_id=sid, status="pending")
+                for sid in student_ids
+                if sid not in existing
+            )
+            stats.record(
+                stats.Change(self.id, group_ids[s.student_id], self.deadline, None, s.stats_state()) for s in created
+            )
+            ranked = set(Ranking.objects.filter(student_id__in=student_ids).values_list("student_id", flat=True))
+            missing = [sid for sid in student_ids if sid not in ranked]
+            if missing:
+                Ranking.objects.bulk_create([Ranking(student_id=sid) for sid in missing], ignore_conflicts=True)
+                if leaderboard.enabled():
+                    transaction.on_commit(lambda: leaderboard.record(missing))
+
     def __str__(self):
         return self.name
 
@@ -86,6 +146,60 @@ class Submission(models.Model):
     )
     created_at = models.DateTimeField(auto_now_add=True)
 
+    # fields a student may set when (re)submitting a task
+    UPSERT_FIELDS = ("file", "comment")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["student", "task"], name="unique_submission_per_task"),
+        ]
+
+    @classmethod
+    def upsert(cls, student, task, **fields):
+        """Submit ``task`` for ``student`` with a single ``INSERT ... ON CONFLICT``.
+
+        Creates the submission or updates the existing one (e.g. the pending
+        row created when the task was assigned); only ``UPSERT_FIELDS`` given
+        in ``fields`` are overwritten, plus status and submission time.
+        Returns ``(submission, created)``. Bypasses save signals, which is
+        fine since the grade is never touched; grade statistics are updated
+        from the state read beforehand and the parent dashboards of the
+        student are invalidated after commit, as the signals would do.
+        """
+        from . import dashboard, stats
+
+        fields = {name: value for name, value in fields.items() if name in cls.UPSERT_FIELDS}
+        old = cls.objects.filter(student=student, task=task).values_list("status", "grade", "submitted_at").first()
+        submission = cls(
+            student=student, task=task, status="submitted", submitted_at=timezone.now(), **fields
+        )
+        cls.objects.bulk_create(
+            [submission],
+            update_conflicts=True,
+            unique_fields=["student", "task"],
+            update_fields=["status", "submitted_at", *fields],
+        )
+        stored = cls.objects.get(student=student, task=task)
+        stats.record([stats.Change(task.id, student.group_id, task.deadline, old, stored.stats_state())])
+        dashboard.invalidate(student_ids=[student.id])
+        # created_at is only written on insert, so it tells whether we created the row
+        return stored, stored.created_at == submission.created_at
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # remembered so the ranking signal can apply only the grade delta
+        if "grade" in field_names:
+            instance._loaded_grade = instance.grade
+        # and so grade statistics can apply only what changed
+        if {"status", "grade", "submitted_at"} <= set(field_names):
+            instance._loaded_state = instance.stats_state()
+        return instance
+
+    def stats_state(self):
+        """What grade statistics count of this submission (see ``core.stats``)."""
+        return (self.status, self.grade, self.submitted_at)
+
     def __str__(self):
         return f"{self.student.user.username} - {self.task.name}"
 
@@ -96,19 +210,129 @@ class Comment(models.Model):
     text = models.TextField()
     role = models.CharField(max_length=20, choices=[("student", "Student"), ("teacher", "Teacher")])
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["submission", "created_at"], name="comment_submission_created_idx"),
+        ]
 
     def __str__(self):
         return f"Comment by {self.author.username}"
 
 
 class Ranking(models.Model):
+    """Points of a student; the source of truth mirrored to ``StudentProfile.points``."""
+
     student = models.OneToOneField(StudentProfile, on_delete=models.CASCADE)
     points = models.PositiveIntegerField(default=0)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["-points"], name="ranking_points_idx"),
+        ]
+
     def update_points(self):
+        """Recompute points from scratch (SUM over all graded submissions)."""
         total = Submission.objects.filter(student=self.student, grade__isnull=False).aggregate(models.Sum("grade"))["grade__sum"] or 0
-        self.points = total
-        self.save()
+        with transaction.atomic():
+            self.points = total
+            self.save()
+            StudentProfile.objects.filter(pk=self.student_id).update(points=total)
+
+    @staticmethod
+    def _moved(student_ids):
+        """Move the students on the leaderboards once the points are committed.
+
+        A ranking created or recomputed instead is saved, which the
+        ``core.signals`` receivers record.
+        """
+        from . import leaderboard
+
+        if leaderboard.enabled():
+            transaction.on_commit(lambda: leaderboard.record(student_ids))
+
+    @classmethod
+    def apply_delta(cls, student_id, delta, create_missing=True):
+        """Atomically add ``delta`` points to a student's ranking and profile."""
+        if not delta:
+            return
+        with transaction.atomic():
+            updated = cls.objects.filter(student_id=student_id).update(points=F("points") + delta)
+            if updated:
+                StudentProfile.objects.filter(pk=student_id).update(points=F("points") + delta)
+                cls._moved([student_id])
+                return
+        if not create_missing:
+            return
+        # no ranking row yet (or it was created concurrently): fall back to a full recompute
+        ranking, _ = cls.objects.get_or_create(student_id=student_id)
+        ranking.update_points()
+
+    @classmethod
+    def apply_deltas(cls, deltas):
+        """``apply_delta`` for many students (``{student_id: delta}``) with one UPDATE per table."""
+        deltas = {student_id: delta for student_id, delta in deltas.items() if delta}
+        if not deltas:
+            return
+        with transaction.atomic():
+            ranked = set(cls.objects.filter(student_id__in=deltas).values_list("student_id", flat=True))
+            if ranked:
+                cases = [When(student_id=student_id, then=Value(deltas[student_id])) for student_id in ranked]
+                cls.objects.filter(student_id__in=ranked).update(points=F("points") + Case(*cases, default=0))
+                cases = [When(pk=student_id, then=Value(deltas[student_id])) for student_id in ranked]
+                StudentProfile.objects.filter(pk__in=ranked).update(points=F("points") + Case(*cases, default=0))
+                cls._moved(ranked)
+        for student_id in deltas.keys() - ranked:
+            ranking, _ = cls.objects.get_or_create(student_id=student_id)
+            ranking.update_points()
+
+    @classmethod
+    def ranked(cls, **filters):
+        """Rankings matching ``filters``, best first and ties by student.
+
+        Each row carries ``username``, ``rank`` and ``dense_rank``, like the
+        rows of ``group_standings``.
+        """
+        best_first = F("points").desc()
+        return (
+            cls.objects.filter(**filters)
+            .annotate(
+                username=F("student__user__username"),
+                rank=Window(Rank(), order_by=best_first),
+                dense_rank=Window(DenseRank(), order_by=best_first),
+            )
+            .order_by("-points", "student_id")
+        )
+
+    @classmethod
+    def group_standings(cls, group_id, user_id=None, top=3, around=0):
+        """Ranked rows of a group: the top ``top`` plus ``around`` rows on each side of ``user_id``.
+
+        Computed in a single query with window functions. Every row carries
+        ``rank`` (ties share a place, 1, 1, 3), ``dense_rank`` (1, 1, 2),
+        ``row_num`` (stable position, ties broken by student) and
+        ``username``; the caller's own row is always included.
+        """
+        sql = f"""
+            WITH ranked AS (
+                SELECT r.id, r.student_id, r.points, u.id AS user_id, u.username,
+                       RANK() OVER (ORDER BY r.points DESC) AS rank,
+                       DENSE_RANK() OVER (ORDER BY r.points DESC) AS dense_rank,
+                       ROW_NUMBER() OVER (ORDER BY r.points DESC, r.student_id) AS row_num
+                FROM {cls._meta.db_table} r
+                JOIN {StudentProfile._meta.db_table} s ON s.id = r.student_id
+                JOIN {User._meta.db_table} u ON u.id = s.user_id
+                WHERE s.group_id = %s
+            ), me AS (
+                SELECT row_num FROM ranked WHERE user_id = %s
+            )
+            SELECT * FROM ranked
+            WHERE row_num <= %s
+               OR row_num BETWEEN (SELECT row_num FROM me) - %s AND (SELECT row_num FROM me) + %s
+            ORDER BY row_num
+        """
+        return list(cls.objects.raw(sql, [group_id, user_id, top, around, around]))
 
     def __str__(self):
         return f"{self.student.user.username} - {self.points} pts"
@@ -125,4 +349,93 @@ class ParentChildRelation(models.Model):
         return f"{self.parent.user.username} -> {self.child.user.username}"
 
 
+class UploadSession(models.Model):
+    """A resumable, chunked upload of a submission file (see ``core.uploads``)."""
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    student = models.ForeignKey(StudentProfile, on_delete=models.CASCADE, related_name="upload_sessions")
+    task = models.ForeignKey(Task, on_delete=models.CASCADE, related_name="upload_sessions")
+    filename = models.CharField(max_length=255)
+    size = models.BigIntegerField()
+    received = models.BigIntegerField(default=0)
+    sha256 = models.CharField(max_length=64, blank=True)
+    content_type = models.CharField(max_length=100, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    # last chunk received; the session expires CHUNKED_UPLOAD_EXPIRY seconds later
+    updated_at = models.DateTimeField(auto_now=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.filename} ({self.received}/{self.size})"
+
+
+class GradeStats(models.Model):
+    """Grade counters of one task or one group, maintained by ``core.stats``."""
+
+    task = models.OneToOneField(Task, on_delete=models.CASCADE, null=True, blank=True, related_name="grade_stats")
+    group = models.OneToOneField(
+        ClassGroup, on_delete=models.CASCADE, null=True, blank=True, related_name="grade_stats"
+    )
+    assigned = models.IntegerField(default=0)
+    submitted = models.IntegerField(default=0)
+    on_time = models.IntegerField(default=0)
+    graded = models.IntegerField(default=0)
+    grade_sum = models.IntegerField(default=0)
+    # number of grades 0 to 6
+    grade_0 = models.IntegerField(default=0)
+    grade_1 = models.IntegerField(default=0)
+    grade_2 = models.IntegerField(default=0)
+    grade_3 = models.IntegerField(default=0)
+    grade_4 = models.IntegerField(default=0)
+    grade_5 = models.IntegerField(default=0)
+    grade_6 = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.CheckConstraint(
+                condition=models.Q(task__isnull=False, group__isnull=True)
+                | models.Q(task__isnull=True, group__isnull=False),
+                name="grade_stats_one_scope",
+            ),
+        ]
+
+    def __str__(self):
+        return f"Stats of {self.task or self.group}"
+
+
+class Job(models.Model):
+    """A unit of background work for ``manage.py run_jobs`` (see ``core.jobs``)."""
+
+    class Status(models.TextChoices):
+        QUEUED = "queued", "Queued"
+        RUNNING = "running", "Running"
+        FAILED = "failed", "Failed"
+
+    name = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict, blank=True)
+    dedupe_key = models.CharField(max_length=200, null=True, blank=True)
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.QUEUED)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_at = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    locked_by = models.CharField(max_length=100, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            # at most one queued job per key; enqueueing another one is a no-op
+            models.UniqueConstraint(
+                fields=["dedupe_key"], condition=models.Q(status="queued"), name="unique_queued_job_key"
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["status", "run_at"], name="job_status_run_at_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.name} #{self.id} ({self.status})"
+
+
 # Create your models here.
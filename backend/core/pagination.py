@@ -0,0 +1,112 @@
+import base64
+import json
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """Forward cursor pagination over a unique composite ordering.
+
+    The cursor holds the ordering values of the last row of the page and the
+    next page is selected with a ``WHERE (created_at, id) < (...)`` style
+    filter, so page 1000 costs the same as page 1. Views pick the ordering
+    with ``keyset_ordering``; it must end with a unique field (normally ``id``).
+    The page size can be chosen with ``?page_size=`` up to ``max_page_size``.
+    """
+
+    page_size = 50
+    max_page_size = 200
+    page_size_query_param = "page_size"
+    cursor_query_param = "cursor"
+    invalid_cursor_message = "Nieprawidłowy kursor"
+    ordering = ("-created_at", "-id")
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.ordering = tuple(getattr(view, "keyset_ordering", self.ordering))
+        size = self.get_page_size(request)
+        queryset = queryset.order_by(*self.ordering)
+
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded:
+            queryset = queryset.filter(self._after(queryset.model, self.decode_cursor(encoded)))
+
+        rows = list(queryset[:size + 1])
+        self.has_next = len(rows) > size
+        rows = rows[:size]
+        self.next_values = self._key(rows[-1]) if self.has_next else None
+        return rows
+
+    def get_paginated_response(self, data):
+        return Response({"next": self.get_next_link(), "results": data})
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except ValueError:
+            return self.page_size
+        return min(max(size, 1), self.max_page_size)
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.next_values))
+
+    def encode_cursor(self, values):
+        # full isoformat: DjangoJSONEncoder would cut datetimes to milliseconds
+        raw = json.dumps(values, default=lambda v: v.isoformat() if hasattr(v, "isoformat") else str(v)).encode()
+        return base64.urlsafe_b64encode(raw).decode()
+
+    def decode_cursor(self, encoded):
+        try:
+            values = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+        except (ValueError, TypeError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return values
+
+    def _key(self, row):
+        values = []
+        for name in self.ordering:
+            value = row
+            for part in name.lstrip("-").split("__"):
+                value = getattr(value, part)
+            values.append(value)
+        return values
+
+    def _after(self, model, values):
+        """Rows strictly after ``values`` in ``self.ordering`` (lexicographic)."""
+        condition = Q()
+        equal = Q()
+        for name, raw in zip(self.ordering, values):
+            path = name.lstrip("-")
+            value = self._to_python(model, path, raw)
+            lookup = "lt" if name.startswith("-") else "gt"
+            condition |= equal & Q(**{f"{path}__{lookup}": value})
+            equal &= Q(**{path: value})
+        return condition
+
+    def _to_python(self, model, path, raw):
+        *relations, name = path.split("__")
+        for relation in relations:
+            model = model._meta.get_field(relation).related_model
+        try:
+            return model._meta.get_field(name).to_python(raw)
+        except Exception:
+            raise NotFound(self.invalid_cursor_message)
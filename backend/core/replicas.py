@@ -0,0 +1,186 @@
+"""Read replicas for the read-only endpoints.
+
+``ReplicaRouter`` sends every write, and by default every read, to
+``default``. Reads made inside ``reads()`` go to one of the healthy aliases in
+``settings.REPLICA_DATABASES`` instead. The read-only views opt in with
+``ReplicaReadsMixin`` (class views) or ``replica_reads`` (function views).
+
+Replicas lag behind the primary, so a user who has just written something
+would not see it. ``ReplicaPinMiddleware`` pins a user to the primary for
+``REPLICA_STICKY_SECONDS`` after each successful write request; it runs
+natively under both WSGI and ASGI. The pin is kept in the cache, so it holds
+across workers when the cache is shared.
+
+Every replica is checked at most every ``REPLICA_HEALTH_INTERVAL`` seconds.
+A replica that can't be reached is skipped until its next check, and reads
+fall back to the primary when no replica is healthy.
+"""
+import functools
+import logging
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+from django.utils.functional import SimpleLazyObject, empty
+from rest_framework.permissions import SAFE_METHODS
+
+logger = logging.getLogger(__name__)
+
+_use_replica = ContextVar("use_replica", default=False)
+_health = {}  # alias -> (healthy, monotonic time of the check)
+
+
+def aliases():
+    return getattr(settings, "REPLICA_DATABASES", [])
+
+
+def _pin_key(user_id):
+    return f"replicas:pin:{user_id}"
+
+
+def pin(user):
+    """Send ``user``'s reads to the primary for the next ``REPLICA_STICKY_SECONDS``."""
+    cache.set(_pin_key(user.pk), True, timeout=settings.REPLICA_STICKY_SECONDS)
+
+
+async def apin(user):
+    await cache.aset(_pin_key(user.pk), True, timeout=settings.REPLICA_STICKY_SECONDS)
+
+
+def allowed(user):
+    """Whether ``user``'s reads may go to a replica right now."""
+    if not aliases():
+        return False
+    return not (user.is_authenticated and cache.get(_pin_key(user.pk)))
+
+
+async def aallowed(user):
+    if not aliases():
+        return False
+    return not (user.is_authenticated and await cache.aget(_pin_key(user.pk)))
+
+
+@contextmanager
+def reads(enabled=True):
+    """Route the reads in this block to a replica (or, with ``enabled=False``, to the primary)."""
+    token = _use_replica.set(enabled)
+    try:
+        yield
+    finally:
+        _use_replica.reset(token)
+
+
+def primary():
+    return reads(False)
+
+
+def healthy(alias):
+    ok, checked_at = _health.get(alias, (True, None))
+    now = time.monotonic()
+    if checked_at is not None and now - checked_at < settings.REPLICA_HEALTH_INTERVAL:
+        return ok
+    connection = connections[alias]
+    try:
+        if connection.connection is not None and not connection.is_usable():
+            connection.close()
+        connection.ensure_connection()
+        ok = True
+    except DatabaseError:
+        logger.warning("Replica %s is unavailable, reading from %s", alias, DEFAULT_DB_ALIAS, exc_info=True)
+        ok = False
+    _health[alias] = (ok, now)
+    return ok
+
+
+def choose():
+    """A healthy replica alias, or the primary when there's none."""
+    candidates = [alias for alias in aliases() if healthy(alias)]
+    return random.choice(candidates) if candidates else DEFAULT_DB_ALIAS
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if _use_replica.get() and aliases():
+            return choose()
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # replicas hold the same rows as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # replicas get their schema through replication
+        return db not in aliases()
+
+
+class ReplicaReadsMixin:
+    """Serve this view's safe-method requests from a replica, unless the caller is pinned."""
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if request.method in SAFE_METHODS and allowed(request.user):
+            self._replica_token = _use_replica.set(True)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        token = getattr(self, "_replica_token", None)
+        if token is not None:
+            _use_replica.reset(token)
+            self._replica_token = None
+        return super().finalize_response(request, response, *args, **kwargs)
+
+
+def replica_reads(view):
+    """``ReplicaReadsMixin`` for ``@api_view`` functions; put it below ``@api_view``."""
+
+    @functools.wraps(view)
+    def wrapper(request, *args, **kwargs):
+        with reads(request.method in SAFE_METHODS and allowed(request.user)):
+            return view(request, *args, **kwargs)
+
+    return wrapper
+
+
+class ReplicaPinMiddleware:
+    """Pin users to the primary after their successful write requests."""
+
+    sync_capable = async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    @staticmethod
+    def wrote(request, response):
+        return aliases() and request.method not in SAFE_METHODS and response.status_code < 400
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        response = self.get_response(request)
+        # DRF copies the authenticated user onto the Django request
+        user = getattr(request, "user", None)
+        if self.wrote(request, response) and user is not None and user.is_authenticated:
+            pin(user)
+        return response
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        if not self.wrote(request, response):
+            return response
+        user = getattr(request, "user", None)
+        if isinstance(user, SimpleLazyObject) and user._wrapped is empty and hasattr(request, "auser"):
+            # the session user nobody loaded yet; loading it synchronously isn't allowed here
+            user = await request.auser()
+        if user is not None and user.is_authenticated:
+            await apin(user)
+        return response
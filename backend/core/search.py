@@ -0,0 +1,275 @@
+"""Full-text search over tasks, submissions and comments.
+
+Searched fields (the first of each model weighs more in the ranking):
+- ``Task.name`` and ``Task.description``
+- ``Submission.feedback`` and ``Submission.comment``
+- ``Comment.text``
+
+On PostgreSQL every table gets a ``search_vector`` tsvector column, filled
+by a trigger on insert and update and indexed with GIN. Matches are ranked
+with ``ts_rank`` and highlighted with ``ts_headline``.
+
+On SQLite, for local development and tests, each table gets an FTS5 table
+kept in sync by triggers. Matches are ranked with ``bm25`` and highlighted
+with ``snippet``.
+
+The columns and tables live only in the database; the models don't know
+about them, so loading a row never fetches its vector. Migration 0012 calls
+``install``. SQLite drops a table's triggers when a later migration rebuilds
+that table, so ``core.signals`` installs them again after every ``migrate``
+there.
+
+``search`` only returns what the caller may see:
+- teachers: their own tasks, with the submissions and comments on them
+- students: the tasks they were given, their submissions and the comments on them
+- parents: the same as their children
+"""
+import html
+import operator
+import re
+from functools import reduce
+
+from django.db import connection
+from django.db.models import BooleanField, FloatField, Q, TextField, Value
+from django.db.models.expressions import RawSQL
+
+from .models import Comment, ParentChildRelation, StudentProfile, Submission, Task
+
+CONFIG = "simple"  # text search configuration of the PostgreSQL triggers; Polish isn't built in
+KINDS = {
+    "task": (Task, ("name", "description")),
+    "submission": (Submission, ("feedback", "comment")),
+    "comment": (Comment, ("text",)),
+}
+WEIGHTS = (("A", 1.0), ("B", 0.4))
+# highlighted terms come back between these, so the text can be escaped before adding <mark>
+START, STOP = "\x02", "\x03"
+HEADLINE_OPTIONS = f'StartSel="{START}", StopSel="{STOP}", MaxWords=30, MinWords=10, MaxFragments=2'
+SNIPPET_TOKENS = 30
+
+
+def _fts(table):
+    return f"{table}_fts"
+
+
+def _postgres_ddl(table, fields):
+    def vector(row):
+        return " || ".join(
+            f"setweight(to_tsvector('{CONFIG}', coalesce({row}{field}, '')), '{letter}')"
+            for field, (letter, _) in zip(fields, WEIGHTS)
+        )
+
+    return [
+        f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS search_vector tsvector",
+        f"CREATE OR REPLACE FUNCTION {table}_search_vector() RETURNS trigger AS $$ "
+        f"BEGIN NEW.search_vector := {vector('NEW.')}; RETURN NEW; END $$ LANGUAGE plpgsql",
+        f"DROP TRIGGER IF EXISTS {table}_search_vector ON {table}",
+        f"CREATE TRIGGER {table}_search_vector BEFORE INSERT OR UPDATE OF {', '.join(fields)} ON {table} "
+        f"FOR EACH ROW EXECUTE FUNCTION {table}_search_vector()",
+        f"UPDATE {table} SET search_vector = {vector('')} WHERE search_vector IS NULL",
+        f"CREATE INDEX IF NOT EXISTS {table}_search_idx ON {table} USING gin (search_vector)",
+    ]
+
+
+def _sqlite_ddl(table, fields):
+    fts, columns = _fts(table), ", ".join(fields)
+    new, old = ", ".join(f"new.{f}" for f in fields), ", ".join(f"old.{f}" for f in fields)
+    delete = f"INSERT INTO {fts}({fts}, rowid, {columns}) VALUES ('delete', old.id, {old});"
+    insert = f"INSERT INTO {fts}(rowid, {columns}) VALUES (new.id, {new});"
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5({columns}, content='{table}', "
+        f"content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_insert AFTER INSERT ON {table} BEGIN {insert} END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_delete AFTER DELETE ON {table} BEGIN {delete} END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_update AFTER UPDATE OF {columns} ON {table} "
+        f"BEGIN {delete} {insert} END",
+    ]
+
+
+def _sqlite_table_exists(cursor, name):
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE name = %s", [name])
+    return cursor.fetchone() is not None
+
+
+def installed(conn):
+    """Whether the SQLite search tables exist (i.e. migration 0012 is applied)."""
+    with conn.cursor() as cursor:
+        return _sqlite_table_exists(cursor, _fts(Task._meta.db_table))
+
+
+def install(conn):
+    """Create the search columns, triggers and indexes on ``conn``; safe to run again."""
+    with conn.cursor() as cursor:
+        for model, fields in KINDS.values():
+            table = model._meta.db_table
+            if conn.vendor == "postgresql":
+                statements = _postgres_ddl(table, fields)
+            elif conn.vendor == "sqlite":
+                statements = _sqlite_ddl(table, fields)
+                if not _sqlite_table_exists(cursor, _fts(table)):
+                    statements.append(f"INSERT INTO {_fts(table)}({_fts(table)}) VALUES ('rebuild')")
+            else:
+                return
+            for statement in statements:
+                cursor.execute(statement)
+
+
+def uninstall(conn):
+    with conn.cursor() as cursor:
+        for model, _fields in KINDS.values():
+            table = model._meta.db_table
+            if conn.vendor == "postgresql":
+                cursor.execute(f"DROP TRIGGER IF EXISTS {table}_search_vector ON {table}")
+                cursor.execute(f"DROP FUNCTION IF EXISTS {table}_search_vector()")
+                cursor.execute(f"ALTER TABLE {table} DROP COLUMN IF EXISTS search_vector")
+            elif conn.vendor == "sqlite":
+                for trigger in ("insert", "delete", "update"):
+                    cursor.execute(f"DROP TRIGGER IF EXISTS {_fts(table)}_{trigger}")
+                cursor.execute(f"DROP TABLE IF EXISTS {_fts(table)}")
+
+
+def terms(text):
+    """The words of ``text``; empty when there's nothing to search for."""
+    return re.findall(r"\w+", text or "")
+
+
+def _query(text):
+    if connection.vendor == "postgresql":
+        return text
+    # every word as a quoted FTS5 string, so operators in the input are taken literally
+    return " ".join('"%s"' % word for word in terms(text))
+
+
+def _match(table, query):
+    if connection.vendor == "postgresql":
+        sql = f"{table}.search_vector @@ websearch_to_tsquery('{CONFIG}', %s)"
+    else:
+        fts = _fts(table)
+        sql = f"{table}.id IN (SELECT rowid FROM {fts} WHERE {fts} MATCH %s)"
+    return RawSQL(sql, [query], output_field=BooleanField())
+
+
+def _rank(table, fields, query):
+    if connection.vendor == "postgresql":
+        sql = f"ts_rank({table}.search_vector, websearch_to_tsquery('{CONFIG}', %s))"
+    else:
+        weights = ", ".join(str(weight) for _, weight in WEIGHTS[:len(fields)])
+        fts = _fts(table)
+        # bm25 is lower for better matches
+        sql = f"(SELECT -bm25({fts}, {weights}) FROM {fts} WHERE {fts} MATCH %s AND rowid = {table}.id)"
+    return RawSQL(sql, [query], output_field=FloatField())
+
+
+def _headline(table, fields, field, query):
+    if connection.vendor == "postgresql":
+        sql = f"ts_headline('{CONFIG}', {table}.{field}, websearch_to_tsquery('{CONFIG}', %s), %s)"
+        params = [query, HEADLINE_OPTIONS]
+    else:
+        fts = _fts(table)
+        sql = (
+            f"(SELECT snippet({fts}, {fields.index(field)}, char(2), char(3), '…', {SNIPPET_TOKENS}) "
+            f"FROM {fts} WHERE {fts} MATCH %s AND rowid = {table}.id)"
+        )
+        params = [query]
+    return RawSQL(sql, params, output_field=TextField())
+
+
+def highlight(text):
+    """``text`` HTML-escaped, with the matched terms in ``<mark>``."""
+    return html.escape(text or "").replace(START, "<mark>").replace(STOP, "</mark>")
+
+
+def scopes(user):
+    """``{kind: Q}`` of the rows ``user`` may find; kinds they can't see are left out."""
+    teacher = getattr(user, "teacherprofile", None)
+    student = getattr(user, "studentprofile", None)
+    parent = getattr(user, "parentprofile", None)
+    assignments = Task.assigned_students.through.objects
+    conditions = {kind: [] for kind in KINDS}
+    if teacher:
+        conditions["task"].append(Q(created_by=teacher))
+        conditions["submission"].append(Q(task__created_by=teacher))
+        conditions["comment"].append(Q(submission__task__created_by=teacher))
+    students = []
+    if student:
+        students.append(Q(id=student.id))
+    if parent:
+        students.append(Q(id__in=ParentChildRelation.objects.filter(parent=parent).values("child_id")))
+    for condition in students:
+        student_ids = StudentProfile.objects.filter(condition).values("id")
+        conditions["task"].append(Q(id__in=assignments.filter(studentprofile_id__in=student_ids).values("task_id")))
+        conditions["submission"].append(Q(student_id__in=student_ids))
+        conditions["comment"].append(Q(submission__student_id__in=student_ids))
+    return {kind: reduce(operator.or_, q) for kind, q in conditions.items() if q}
+
+
+def search(user, text, kinds=None, offset=0, limit=20):
+    """One page of matches of ``text`` that ``user`` may see, best first.
+
+    Returns ``(results, has_next)``. Matching, ranking and paging run in a
+    single query over all kinds; highlights are computed only for the page.
+    """
+    query = _query(text)
+    branches = []
+    for kind, scope in scopes(user).items():
+        if kinds and kind not in kinds:
+            continue
+        model, fields = KINDS[kind]
+        table = model._meta.db_table
+        branches.append(
+            model.objects.filter(scope)
+            .filter(_match(table, query))
+            .annotate(kind=Value(kind), rank=_rank(table, fields, query))
+            .values_list("kind", "id", "rank")
+        )
+    if not branches:
+        return [], False
+    matches = branches[0].union(*branches[1:], all=True) if len(branches) > 1 else branches[0]
+    page = list(matches.order_by("-rank", "kind", "-id")[offset:offset + limit + 1])
+    has_next = len(page) > limit
+    page = page[:limit]
+
+    ids = {kind: [] for kind in KINDS}
+    for kind, pk, _rank_value in page:
+        ids[kind].append(pk)
+    details = {kind: _details(kind, pks, query) for kind, pks in ids.items() if pks}
+    return [
+        {"type": kind, "id": pk, "rank": rank_value, **details[kind][pk]}
+        for kind, pk, rank_value in page
+    ], has_next
+
+
+DETAILS = {
+    "task": ("name", "deadline"),
+    "submission": ("task_id", "task__name", "student_id", "student__user__username",
+                   "student__user__first_name", "student__user__last_name", "status", "grade"),
+    "comment": ("submission_id", "submission__task_id", "submission__task__name", "author__username",
+                "author__first_name", "author__last_name", "role", "created_at"),
+}
+
+
+def _name(row, prefix):
+    full_name = f"{row[prefix + 'first_name']} {row[prefix + 'last_name']}".strip()
+    return full_name or row[prefix + "username"]
+
+
+def _details(kind, pks, query):
+    model, fields = KINDS[kind]
+    table = model._meta.db_table
+    headlines = {f"headline_{field}": _headline(table, fields, field, query) for field in fields}
+    rows = model.objects.filter(id__in=pks).annotate(**headlines).values("id", *DETAILS[kind], *headlines)
+    details = {}
+    for row in rows:
+        entry = {"highlights": {field: highlight(row[f"headline_{field}"]) for field in fields}}
+        if kind == "task":
+            entry["task"] = {"id": row["id"], "name": row["name"], "deadline": row["deadline"]}
+        elif kind == "submission":
+            entry["task"] = {"id": row["task_id"], "name": row["task__name"]}
+            entry["student"] = {"id": row["student_id"], "full_name": _name(row, "student__user__")}
+            entry.update(status=row["status"], grade=row["grade"])
+        else:
+            entry["submission"] = row["submission_id"]
+            entry["task"] = {"id": row["submission__task_id"], "name": row["submission__task__name"]}
+            entry.update(author=_name(row, "author__"), role=row["role"], created_at=row["created_at"])
+        details[row["id"]] = entry
+    return details
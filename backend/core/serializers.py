@@ -1,5 +1,5 @@
+from django.db.models import Prefetch
 from rest_framework import serializers
-from django.utils import timezone
 from .models import (
     Task,
     Submission,
@@ -12,13 +12,112 @@ from .models import (
     ParentChildRelation,
     ClassGroup,
 )
+from . import media
 
-class TaskSerializer(serializers.ModelSerializer):
+
+def parse_expand(value):
+    """Turn ``"task,task.created_by,student"`` into ``{"task": {"created_by": {}}, "student": {}}``."""
+    tree = {}
+    for item in (value or "").split(","):
+        node = tree
+        for part in filter(None, item.strip().split(".")):
+            node = node.setdefault(part, {})
+    return tree
+
+
+class ExpandableFieldsMixin:
+    """Sparse fieldsets (``?fields=id,name``) and opt-in nesting (``?expand=task``).
+
+    ``expandable_fields`` maps a field name to a spec: ``serializer`` (class
+    name in this module), optional ``many``, ``fields`` for the nested
+    serializer and the ``select_related``/``prefetch_related`` path it needs.
+    Unless expanded, a relation is rendered as its id (or left out when it
+    isn't in ``Meta.fields``). Only the root serializer reads the query
+    parameters; nested serializers get their part of the tree passed down.
+    """
+
+    expandable_fields = {}
+
+    def __init__(self, *args, fields=None, expand=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if expand is None:
+            request = self.context.get("request")
+            params = getattr(request, "query_params", {})
+            expand = parse_expand(params.get("expand"))
+            if fields is None and params.get("fields"):
+                fields = [f.strip() for f in params["fields"].split(",")]
+
+        for name, subtree in expand.items():
+            spec = self.expandable_fields.get(name)
+            if spec is None:
+                continue
+            serializer_class = globals()[spec["serializer"]]
+            self.fields[name] = serializer_class(
+                read_only=True,
+                many=spec.get("many", False),
+                fields=spec.get("fields"),
+                expand=subtree,
+            )
+
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                if not self.fields[name].write_only:
+                    self.fields.pop(name)
+
+    @classmethod
+    def optimize_queryset(cls, queryset, request=None, expand=None):
+        """Apply the select/prefetch_related needed by the requested expansions."""
+        if expand is None:
+            expand = parse_expand(getattr(request, "query_params", {}).get("expand"))
+        select, prefetch = cls._related_paths(expand)
+        if select:
+            queryset = queryset.select_related(*select)
+        if prefetch:
+            queryset = queryset.prefetch_related(*prefetch)
+        return queryset
+
+    @classmethod
+    def _related_paths(cls, expand, prefix="", prefetching=False):
+        select, prefetch = [], []
+        for name, subtree in expand.items():
+            spec = cls.expandable_fields.get(name)
+            if spec is None:
+                continue
+            nested_prefetching = prefetching or "prefetch_related" in spec
+            path = prefix + spec.get("prefetch_related", spec.get("select_related", name))
+            if "queryset" in spec:
+                prefetch.append(Prefetch(path, queryset=spec["queryset"]()))
+            else:
+                (prefetch if nested_prefetching else select).append(path)
+            nested = globals()[spec["serializer"]]
+            if issubclass(nested, ExpandableFieldsMixin):
+                more_select, more_prefetch = nested._related_paths(
+                    subtree, prefix=f"{prefix}{name}__", prefetching=nested_prefetching
+                )
+                select += more_select
+                prefetch += more_prefetch
+        return select, prefetch
+
+
+class MediaFileField(serializers.FileField):
+    """File URL with the access token of the requesting user (see ``core.media``)."""
+
+    def to_representation(self, value):
+        if not value:
+            return None
+        return media.file_url(self.context.get("request"), value)
+
+
+# Task fields that make sense when the task is nested in another object
+TASK_BRIEF_FIELDS = ["id", "name", "description", "deadline", "file", "created_at", "created_by"]
+
+
+class TaskSerializer(ExpandableFieldsMixin, serializers.ModelSerializer):
     status = serializers.SerializerMethodField()
     submission_id = serializers.SerializerMethodField()
     submission = serializers.SerializerMethodField()
-    file = serializers.FileField(required=False, allow_null=True)
-    
+    file = MediaFileField(required=False, allow_null=True)
+
     class Meta:
         model = Task
         fields = [
@@ -28,77 +127,120 @@ class TaskSerializer(serializers.ModelSerializer):
             "deadline",
             "file",
             "created_at",
+            "created_by",
             "status",
             "submission_id",
             "submission",
         ]
+        read_only_fields = ["created_by"]
+
+    expandable_fields = {
+        "created_by": {"serializer": "TeacherProfileSerializer", "select_related": "created_by"},
+        "assigned_students": {
+            "serializer": "StudentBriefSerializer",
+            "many": True,
+            "prefetch_related": "assigned_students__user",
+        },
+    }
 
     def create(self, validated_data):
         # created_by jest ustawiany ręcznie w widoku
         return Task.objects.create(**validated_data)
 
-    def get_status(self, obj):
-        request = self.context.get("request")
-        if not request:
-            return False
-        user = request.user
-        student = getattr(user, "studentprofile", None)
-        if not student:
-            return False
-        return Submission.objects.filter(task=obj, student=student).exists()
+    def _student_submission(self, obj):
+        """Return the requesting student's submission for ``obj`` (or None).
 
-    def get_submission_id(self, obj):
+        Views listing many tasks can pass a ``submissions_by_task`` index
+        (see ``index_submissions_by_task``) in the context, so the lookup
+        does not hit the database once per task.
+        """
+        index = self.context.get("submissions_by_task")
+        if index is not None:
+            return index.get(obj.id)
         request = self.context.get("request")
         if not request:
             return None
-        user = request.user
-        student = getattr(user, "studentprofile", None)
+        student = getattr(request.user, "studentprofile", None)
         if not student:
             return None
-        submission = Submission.objects.filter(task=obj, student=student).first()
+        cache = self.__dict__.setdefault("_submission_cache", {})
+        if obj.id not in cache:
+            cache[obj.id] = Submission.objects.filter(task=obj, student=student).first()
+        return cache[obj.id]
+
+    def get_status(self, obj):
+        return self._student_submission(obj) is not None
+
+    def get_submission_id(self, obj):
+        submission = self._student_submission(obj)
         return submission.id if submission else None
-    def get_submission(self, obj):  # <- NOWA METODA
-        request = self.context.get("request")
-        if not request:
-            return None
-        user = request.user
-        student = getattr(user, "studentprofile", None)
-        if not student:
-            return None
-        submission = Submission.objects.filter(task=obj, student=student).first()
+
+    def get_submission(self, obj):
+        submission = self._student_submission(obj)
         if not submission:
             return None
         return SubmissionSerializer(submission).data
 
 
-class SubmissionSerializer(serializers.ModelSerializer):
-    task = TaskSerializer(read_only=True)
+def index_submissions_by_task(student, tasks):
+    """Load ``student``'s submissions for ``tasks`` in one query, keyed by task id."""
+    tasks = list(tasks)
+    tasks_by_id = {task.id: task for task in tasks}
+    index = {}
+    for submission in Submission.objects.filter(student=student, task_id__in=tasks_by_id):
+        # reuse the already loaded Task so the nested serializer doesn't refetch it
+        submission.task = tasks_by_id[submission.task_id]
+        index[submission.task_id] = submission
+    return index
+
+
+async def aindex_submissions_by_task(student, tasks):
+    """Async ``index_submissions_by_task`` for the ASGI views."""
+    tasks_by_id = {task.id: task for task in tasks}
+    index = {}
+    async for submission in Submission.objects.filter(student=student, task_id__in=tasks_by_id):
+        submission.task = tasks_by_id[submission.task_id]
+        index[submission.task_id] = submission
+    return index
+
+
+class SubmissionSerializer(ExpandableFieldsMixin, serializers.ModelSerializer):
     task_id = serializers.PrimaryKeyRelatedField(
         queryset=Task.objects.all(), source="task", write_only=True
     )
+    file = MediaFileField(required=False, allow_null=True)
+
     class Meta:
         model = Submission
         fields = ["id", "student", "task", "task_id", "grade", "file", "status", "submitted_at"]
-        read_only_fields = ['id',"student", 'created_at']
+        read_only_fields = ['id', "student", "task", 'created_at']
+
+    expandable_fields = {
+        "task": {"serializer": "TaskSerializer", "fields": TASK_BRIEF_FIELDS, "select_related": "task"},
+        "student": {"serializer": "StudentBriefSerializer", "select_related": "student__user"},
+        "comments": {
+            "serializer": "CommentSerializer",
+            "many": True,
+            "prefetch_related": "comments",
+            "queryset": lambda: Comment.objects.select_related("author").order_by("created_at"),
+        },
+    }
+
+    def to_internal_value(self, data):
+        # the upload form posts the task id as ``task``
+        if "task_id" not in data and "task" in data:
+            data = data.dict() if hasattr(data, "dict") else dict(data)
+            data["task_id"] = data["task"]
+        return super().to_internal_value(data)
 
     def create(self, validated_data):
         request = self.context["request"]
         student = request.user.studentprofile
-        task = validated_data["task"]
-
-        submission, created = Submission.objects.update_or_create(
-            student=student,
-            task=task,
-            defaults={
-                "file": validated_data.get("file"),
-                "status": "submitted",
-                "submitted_at": timezone.now()
-            }
-        )
-
+        task = validated_data.pop("task")
+        submission, self.created = Submission.upsert(student, task, **validated_data)
         return submission
 
-class CommentSerializer(serializers.ModelSerializer):
+class CommentSerializer(ExpandableFieldsMixin, serializers.ModelSerializer):
     author = serializers.StringRelatedField(read_only=True)
 
     class Meta:
@@ -106,6 +248,11 @@ class CommentSerializer(serializers.ModelSerializer):
         fields = ["id", "submission", "author", "text", "role", "created_at"]
         read_only_fields = ["author", "role", "created_at"]
 
+    expandable_fields = {
+        "submission": {"serializer": "SubmissionSerializer", "select_related": "submission"},
+        "author": {"serializer": "UserSerializer", "select_related": "author"},
+    }
+
     def create(self, validated_data):
         request = self.context["request"]
         user = request.user
@@ -115,7 +262,7 @@ class CommentSerializer(serializers.ModelSerializer):
         )
         return super().create(validated_data)
 
-class RankingSerializer(serializers.ModelSerializer):
+class RankingSerializer(ExpandableFieldsMixin, serializers.ModelSerializer):
     """Serialize ranking with username and points."""
 
     student_name = serializers.CharField(
@@ -126,18 +273,34 @@ class RankingSerializer(serializers.ModelSerializer):
         model = Ranking
         fields = ["id", "student", "student_name", "points"]
 
+    expandable_fields = {
+        "student": {"serializer": "StudentBriefSerializer", "select_related": "student__user"},
+    }
+
+
+class RankedRankingSerializer(serializers.ModelSerializer):
+    """Serialize a row returned by ``Ranking.group_standings``."""
+
+    student_name = serializers.CharField(source="username", read_only=True)
+    rank = serializers.IntegerField(read_only=True)
+    dense_rank = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = Ranking
+        fields = ["id", "student", "student_name", "points", "rank", "dense_rank"]
+
 
 class TopRankingSerializer(serializers.Serializer):
     username = serializers.CharField()
     completed = serializers.IntegerField()
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(ExpandableFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ['id', 'username', 'email', 'role']
 
 
-class StudentBriefSerializer(serializers.ModelSerializer):
+class StudentBriefSerializer(ExpandableFieldsMixin, serializers.ModelSerializer):
     full_name = serializers.CharField(source='user.get_full_name')
     email = serializers.EmailField(source='user.email')
 
@@ -146,28 +309,50 @@ class StudentBriefSerializer(serializers.ModelSerializer):
         fields = ['id', 'full_name', 'email']
 
 
-class StudentProfileSerializer(serializers.ModelSerializer):
+class StudentProfileSerializer(ExpandableFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = StudentProfile
         fields = '__all__'
 
-class TeacherProfileSerializer(serializers.ModelSerializer):
+    expandable_fields = {
+        "user": {"serializer": "UserSerializer", "select_related": "user"},
+        "group": {"serializer": "GroupSerializer", "select_related": "group"},
+    }
+
+class TeacherProfileSerializer(ExpandableFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = TeacherProfile
         fields = '__all__'
 
-class ParentProfileSerializer(serializers.ModelSerializer):
+    expandable_fields = {
+        "user": {"serializer": "UserSerializer", "select_related": "user"},
+    }
+
+class ParentProfileSerializer(ExpandableFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = ParentProfile
         fields = '__all__'
 
-class ParentChildRelationSerializer(serializers.ModelSerializer):
+    expandable_fields = {
+        "user": {"serializer": "UserSerializer", "select_related": "user"},
+    }
+
+class ParentChildRelationSerializer(ExpandableFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = ParentChildRelation
         fields = '__all__'
 
+    expandable_fields = {
+        "parent": {"serializer": "ParentProfileSerializer", "select_related": "parent"},
+        "child": {"serializer": "StudentBriefSerializer", "select_related": "child__user"},
+    }
+
 
-class GroupSerializer(serializers.ModelSerializer):
+class GroupSerializer(ExpandableFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = ClassGroup
         fields = '__all__'
+
+    expandable_fields = {
+        "teacher": {"serializer": "TeacherProfileSerializer", "select_related": "teacher"},
+    }
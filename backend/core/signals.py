@@ -1,10 +1,155 @@
-from django.db.models.signals import post_save
+from django.db import connections, transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_migrate, post_save
 from django.dispatch import receiver
 
-from .models import Submission, Ranking, StudentProfile
+from . import dashboard, jobs, leaderboard, metrics, search, stats, uploads
+from .models import Comment, ParentChildRelation, Submission, Ranking, StudentProfile, Task, UploadSession
+
+
+def _refresh_leaderboard(student_id):
+    if leaderboard.enabled():
+        transaction.on_commit(lambda: leaderboard.record([student_id]))
+
+
+def _refresh_dashboards(submission, grade_changed):
+    # a grade moves the student's rank, which classmates' parents see as well
+    if grade_changed:
+        dashboard.invalidate(classmates_of=[submission.student_id])
+    else:
+        dashboard.invalidate(student_ids=[submission.student_id])
+
+
+def _stats_scope(submission):
+    """``(deadline, group_id)`` of ``submission``, querying only what isn't loaded yet."""
+    if Submission.task.is_cached(submission):
+        deadline = submission.task.deadline
+    else:
+        deadline = Task.objects.filter(pk=submission.task_id).values_list("deadline", flat=True).first()
+    if Submission.student.is_cached(submission):
+        group_id = submission.student.group_id
+    else:
+        group_id = StudentProfile.objects.filter(pk=submission.student_id).values_list("group_id", flat=True).first()
+    return deadline, group_id
+
+
+def _record_stats(submission, old, new, **kwargs):
+    if not stats.differs(old, new):
+        return
+    deadline, group_id = _stats_scope(submission)
+    stats.record([stats.Change(submission.task_id, group_id, deadline, old, new)], **kwargs)
+
+
+@receiver(post_save, sender=StudentProfile)
+def create_ranking_for_student(sender, instance, created, **kwargs):
+    if created:
+        Ranking.objects.get_or_create(student=instance)
+        return
+    old_group_id = getattr(instance, "_loaded_group_id", instance.group_id)
+    if old_group_id != instance.group_id:
+        # the student's submissions now count for another group
+        stats.rebuild(group_ids=[g for g in (old_group_id, instance.group_id) if g is not None])
+        if leaderboard.enabled():
+            student_id = instance.id
+            transaction.on_commit(lambda: leaderboard.discard(student_id, old_group_id))
+            _refresh_leaderboard(student_id)
+    instance._loaded_group_id = instance.group_id
+
+
+@receiver(post_save, sender=Ranking)
+def refresh_leaderboard_on_ranking_save(sender, instance, **kwargs):
+    _refresh_leaderboard(instance.student_id)
+
+
+@receiver(post_delete, sender=Ranking)
+def refresh_leaderboard_on_ranking_delete(sender, instance, **kwargs):
+    if leaderboard.enabled():
+        student_id = instance.student_id
+        group_id = StudentProfile.objects.filter(pk=student_id).values_list("group_id", flat=True).first()
+        transaction.on_commit(lambda: leaderboard.discard(student_id, group_id))
+
+
+@receiver(post_save, sender=Submission)
+def update_ranking_on_submission(sender, instance, created, **kwargs):
+    if not created and not hasattr(instance, "_loaded_grade"):
+        # instance wasn't loaded from the db, so the previous grade is unknown
+        jobs.enqueue(
+            "ranking.recompute", {"student_id": instance.student_id}, dedupe_key=f"ranking:{instance.student_id}"
+        )
+        _refresh_dashboards(instance, grade_changed=True)
+    else:
+        old_grade = None if created else instance._loaded_grade
+        delta = (instance.grade or 0) - (old_grade or 0)
+        if delta:
+            Ranking.apply_delta(instance.student_id, delta)
+        _refresh_dashboards(instance, grade_changed=instance.grade != old_grade)
+    instance._loaded_grade = instance.grade
 
 
 @receiver(post_save, sender=Submission)
-def update_ranking_on_submission(sender, instance, **kwargs):
-    ranking, _ = Ranking.objects.get_or_create(student=instance.student)
-    ranking.update_points()
+def update_stats_on_submission(sender, instance, created, **kwargs):
+    if created or hasattr(instance, "_loaded_state"):
+        _record_stats(instance, None if created else instance._loaded_state, instance.stats_state())
+    else:
+        # previous state unknown, count the task and group again
+        _deadline, group_id = _stats_scope(instance)
+        stats.rebuild(task_ids=[instance.task_id], group_ids=[group_id] if group_id is not None else [])
+    instance._loaded_state = instance.stats_state()
+
+
+@receiver(post_delete, sender=Submission)
+def update_ranking_on_submission_delete(sender, instance, **kwargs):
+    grade = getattr(instance, "_loaded_grade", instance.grade)
+    if grade:
+        # the ranking may already be gone when the whole student is being deleted
+        Ranking.apply_delta(instance.student_id, -grade, create_missing=False)
+    _refresh_dashboards(instance, grade_changed=bool(grade))
+
+
+@receiver(post_delete, sender=Submission)
+def update_stats_on_submission_delete(sender, instance, **kwargs):
+    # the task or group may be deleted along with it, so their missing rows stay missing
+    _record_stats(instance, getattr(instance, "_loaded_state", instance.stats_state()), None, rebuild_missing=False)
+
+
+@receiver(post_save, sender=Task)
+def update_stats_on_deadline(sender, instance, created, **kwargs):
+    if not created and getattr(instance, "_loaded_deadline", ...) != instance.deadline:
+        # which submissions were on time depends on the deadline
+        group_ids = Submission.objects.filter(task=instance).values_list("student__group_id", flat=True).distinct()
+        stats.rebuild(task_ids=[instance.id], group_ids=[g for g in group_ids if g is not None])
+    instance._loaded_deadline = instance.deadline
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def refresh_dashboards_on_comment(sender, instance, **kwargs):
+    if instance.role == "teacher":
+        dashboard.invalidate(submission_id=instance.submission_id)
+
+
+@receiver(post_save, sender=ParentChildRelation)
+@receiver(post_delete, sender=ParentChildRelation)
+def refresh_dashboard_on_relation(sender, instance, **kwargs):
+    parent_id = instance.parent_id
+    transaction.on_commit(lambda: dashboard.invalidate_parents([parent_id]))
+
+
+@receiver(post_migrate)
+def reinstall_search_triggers(sender, using, **kwargs):
+    # SQLite loses a table's triggers whenever a migration rebuilds the table
+    conn = connections[using]
+    if sender.name == "core" and conn.vendor == "sqlite" and search.installed(conn):
+        search.install(conn)
+
+
+@receiver(connection_created)
+def instrument_connection(sender, connection, **kwargs):
+    metrics.instrument(connection)
+
+
+@receiver(post_delete, sender=UploadSession)
+def remove_upload_part(sender, instance, **kwargs):
+    # the instance loses its pk once deleted, so take the path now
+    path = uploads.part_path(instance)
+    transaction.on_commit(lambda: uploads.remove_part(path))
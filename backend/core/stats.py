@@ -0,0 +1,183 @@
+"""Grade statistics per task and per group, maintained incrementally.
+
+Every ``Submission`` adds to the ``GradeStats`` row of its task and of its
+student's group:
+- ``assigned``: one for every submission row, pending ones included
+- ``submitted``: non-pending submissions
+- ``on_time``: submitted no later than the task's deadline day, or the task has no deadline
+- ``graded`` and ``grade_sum``: graded submissions and their grades
+- ``grade_0`` to ``grade_6``: how many of each grade
+
+Writes call ``record`` with each submission's old and new state. The
+counters then move by the difference, with one UPDATE per table side
+(tasks, groups) however many submissions changed. A row that doesn't
+exist yet is computed from scratch by ``rebuild``.
+
+Some changes can't be applied as a difference, such as a student moving to
+another group or a task's deadline moving; those scopes are rebuilt instead.
+``manage.py rebuild_grade_stats`` recomputes every row.
+"""
+from collections import defaultdict
+from typing import NamedTuple, Optional
+
+from django.db.models import Case, Count, F, Q, Sum, Value, When
+from django.utils import timezone
+
+from .models import ClassGroup, GradeStats, Submission, Task
+
+GRADES = range(7)
+BUCKETS = tuple(f"grade_{grade}" for grade in GRADES)
+COUNTERS = ("assigned", "submitted", "on_time", "graded", "grade_sum") + BUCKETS
+
+
+class Change(NamedTuple):
+    """A submission going from ``old`` to ``new`` state (``Submission.stats_state()``, None when absent)."""
+
+    task_id: int
+    group_id: Optional[int]
+    deadline: object
+    old: Optional[tuple]
+    new: Optional[tuple]
+
+
+def _counts(state, deadline):
+    if state is None:
+        return {}
+    status, grade, submitted_at = state
+    counts = {"assigned": 1}
+    if status != "pending":
+        counts["submitted"] = 1
+        if deadline is None or (submitted_at is not None and timezone.localdate(submitted_at) <= deadline):
+            counts["on_time"] = 1
+    if grade is not None:
+        counts["graded"] = 1
+        counts["grade_sum"] = grade
+        if grade in GRADES:
+            counts[f"grade_{grade}"] = 1
+    return counts
+
+
+def _counted(state):
+    # what the counters depend on besides the deadline
+    if state is None:
+        return None
+    status, grade, submitted_at = state
+    submitted = status != "pending"
+    return submitted, grade, submitted_at if submitted else None
+
+
+def differs(old, new):
+    """Whether going from state ``old`` to ``new`` can move any counter."""
+    return _counted(old) != _counted(new)
+
+
+def delta(change):
+    old, new = _counts(change.old, change.deadline), _counts(change.new, change.deadline)
+    return {name: new.get(name, 0) - old.get(name, 0) for name in COUNTERS if new.get(name, 0) != old.get(name, 0)}
+
+
+def record(changes, rebuild_missing=True):
+    """Apply ``changes`` to the task and group rows.
+
+    Call it after the submissions are written. Rows that don't exist yet are
+    rebuilt, unless ``rebuild_missing`` is off (when their task or group may
+    be in the middle of being deleted).
+    """
+    by_task, by_group = defaultdict(lambda: defaultdict(int)), defaultdict(lambda: defaultdict(int))
+    for change in changes:
+        for name, amount in delta(change).items():
+            by_task[change.task_id][name] += amount
+            if change.group_id is not None:
+                by_group[change.group_id][name] += amount
+    missing_tasks = _apply("task_id", by_task)
+    missing_groups = _apply("group_id", by_group)
+    if rebuild_missing and (missing_tasks or missing_groups):
+        rebuild(task_ids=missing_tasks, group_ids=missing_groups)
+
+
+def _apply(column, deltas):
+    """Add ``deltas`` (``{scope_id: {counter: amount}}``) in one UPDATE; return the scopes without a row."""
+    deltas = {scope: counts for scope, counts in deltas.items() if any(counts.values())}
+    if not deltas:
+        return set()
+    updates = {}
+    for name in COUNTERS:
+        cases = [
+            When(**{column: scope}, then=Value(counts[name]))
+            for scope, counts in deltas.items()
+            if counts.get(name)
+        ]
+        if cases:
+            updates[name] = F(name) + Case(*cases, default=Value(0))
+    rows = GradeStats.objects.filter(**{f"{column}__in": deltas})
+    if rows.update(**updates) == len(deltas):
+        return set()
+    return deltas.keys() - set(rows.values_list(column, flat=True))
+
+
+def _aggregates():
+    submitted = ~Q(status="pending")
+    on_time = submitted & (Q(task__deadline__isnull=True) | Q(submitted_at__date__lte=F("task__deadline")))
+    aggregates = {
+        "assigned": Count("id"),
+        "submitted": Count("id", filter=submitted),
+        "on_time": Count("id", filter=on_time),
+        "graded": Count("id", filter=Q(grade__isnull=False)),
+        "grade_sum": Sum("grade", default=0),
+    }
+    for grade, name in zip(GRADES, BUCKETS):
+        aggregates[name] = Count("id", filter=Q(grade=grade))
+    return aggregates
+
+
+def rebuild(task_ids=None, group_ids=None):
+    """Recompute rows from the submissions: every row by default, else only the given scopes.
+
+    One GROUP BY query per side, then one upsert per side; returns the number of rows written.
+    """
+    everything = task_ids is None and group_ids is None
+    if everything:
+        task_ids, group_ids = Task.objects.values_list("id", flat=True), ClassGroup.objects.values_list("id", flat=True)
+    written = 0
+    for field, key, scopes in (("task", "task_id", task_ids), ("group", "student__group_id", group_ids)):
+        scopes = list(scopes or ())
+        if not scopes:
+            continue
+        submissions = Submission.objects.all() if everything else Submission.objects.filter(**{f"{key}__in": scopes})
+        counts = {
+            row.pop(key): row
+            for row in submissions.exclude(**{f"{key}__isnull": True})
+            .order_by()
+            .values(key)
+            .annotate(**_aggregates())
+        }
+        rows = [GradeStats(**{f"{field}_id": scope}, **counts.get(scope, {})) for scope in scopes]
+        GradeStats.objects.bulk_create(
+            rows, batch_size=1000, update_conflicts=True, unique_fields=[field], update_fields=COUNTERS
+        )
+        written += len(rows)
+    return written
+
+
+def get(task=None, group=None):
+    """The ``GradeStats`` of ``task`` or ``group``, computed first if there's no row yet."""
+    lookup = {"task": task} if task is not None else {"group": group}
+    stats = GradeStats.objects.filter(**lookup).first()
+    if stats is None:
+        rebuild(task_ids=[task.id] if task is not None else None, group_ids=[group.id] if group is not None else None)
+        stats = GradeStats.objects.get(**lookup)
+    return stats
+
+
+def summary(stats):
+    """API representation: raw counters plus average, rates and histogram."""
+    return {
+        "assigned": stats.assigned,
+        "submitted": stats.submitted,
+        "on_time": stats.on_time,
+        "graded": stats.graded,
+        "average_grade": round(stats.grade_sum / stats.graded, 2) if stats.graded else None,
+        "submission_rate": round(stats.submitted / stats.assigned, 4) if stats.assigned else None,
+        "on_time_rate": round(stats.on_time / stats.submitted, 4) if stats.submitted else None,
+        "histogram": [getattr(stats, name) for name in BUCKETS],
+    }
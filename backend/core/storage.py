@@ -0,0 +1,153 @@
+"""Content-addressed, de-duplicating file storage.
+
+Files keep their usual names (``submissions/<user>/<file>``, ``task_files/...``)
+and URLs, but every name is a hard link to a blob stored once per content
+under ``<MEDIA_ROOT>/.blobs/<sha[:2]>/<sha256>``. Existing media trees are
+converted in place with ``manage.py dedupe_media``.
+
+Django doesn't delete the file of a row that is deleted or whose file is
+replaced, so a name on disk isn't proof anyone still uses it.
+``manage.py gc_blobs`` first unlinks the names no ``Task.file`` or
+``Submission.file`` refers to (``drop_unreferenced``), then removes the blobs
+left with no other link (``collect_garbage``).
+"""
+import hashlib
+import os
+import tempfile
+import time
+from collections import Counter
+
+from django.core.files.storage import FileSystemStorage
+
+BLOB_DIR = ".blobs"
+READ_SIZE = 64 * 1024
+
+
+class DeduplicatingStorage(FileSystemStorage):
+    def blob_root(self):
+        return os.path.join(self.location, BLOB_DIR)
+
+    def blob_path(self, sha256):
+        return os.path.join(self.blob_root(), sha256[:2], sha256)
+
+    def _save(self, name, content):
+        os.makedirs(self.blob_root(), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.blob_root(), prefix=".tmp-")
+        try:
+            digest = hashlib.sha256()
+            with os.fdopen(fd, "wb") as tmp:
+                for chunk in content.chunks():
+                    digest.update(chunk)
+                    tmp.write(chunk)
+            if self.file_permissions_mode is not None:
+                os.chmod(tmp_path, self.file_permissions_mode)
+            blob = self.blob_path(digest.hexdigest())
+            os.makedirs(os.path.dirname(blob), exist_ok=True)
+            return self._link(blob, tmp_path, name)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def _link(self, blob, tmp_path, name):
+        """Hard-link ``name`` to ``blob``, storing ``tmp_path`` as the blob if it's missing."""
+        directory = os.path.dirname(self.path(name))
+        os.makedirs(directory, exist_ok=True)
+        if self.directory_permissions_mode is not None:
+            os.chmod(directory, self.directory_permissions_mode)
+        while True:
+            try:
+                os.link(tmp_path, blob)
+            except FileExistsError:
+                # stored before, or by a concurrent save of the same content; keep that inode
+                pass
+            try:
+                os.link(blob, self.path(name))
+            except FileExistsError:
+                # the name was taken since get_available_name(); pick another one
+                name = self.get_available_name(name)
+            except FileNotFoundError:
+                # gc_blobs removed the blob in the meantime; store it again
+                if not os.path.exists(tmp_path):
+                    raise
+            else:
+                return str(name).replace("\\", "/")
+
+    def refcount(self, name):
+        """Number of names sharing the content of ``name``."""
+        return os.stat(self.path(name)).st_nlink - 1
+
+    def iter_blobs(self):
+        root = self.blob_root()
+        if not os.path.isdir(root):
+            return
+        for prefix in os.listdir(root):
+            directory = os.path.join(root, prefix)
+            if os.path.isdir(directory):
+                for sha256 in os.listdir(directory):
+                    yield os.path.join(directory, sha256)
+
+    def iter_names(self, directories):
+        """Names of the files under ``directories`` (relative to the storage root)."""
+        for directory in directories:
+            for root, _dirs, files in os.walk(self.path(directory)):
+                for filename in files:
+                    yield os.path.relpath(os.path.join(root, filename), self.location).replace(os.sep, "/")
+
+    def drop_unreferenced(self, referenced, directories, min_age=0, dry_run=False):
+        """Unlink the names under ``directories`` not in ``referenced``; return them.
+
+        Names linked less than ``min_age`` seconds ago are kept, since their row
+        may not be committed yet.
+        """
+        cutoff = time.time() - min_age
+        dropped = []
+        for name in self.iter_names(directories):
+            if name in referenced or os.stat(self.path(name)).st_ctime > cutoff:
+                continue
+            if not dry_run:
+                os.remove(self.path(name))
+            dropped.append(name)
+        return dropped
+
+    def collect_garbage(self, dry_run=False, ignore=()):
+        """Remove blobs no file links to; return ``(count, bytes)`` freed.
+
+        Links from the names in ``ignore`` aren't counted, so a dry run can
+        follow ``drop_unreferenced(dry_run=True)``.
+        """
+        ignored = Counter()
+        for name in ignore:
+            if self.exists(name):
+                stat = os.stat(self.path(name))
+                ignored[stat.st_dev, stat.st_ino] += 1
+        count = freed = 0
+        for blob in self.iter_blobs():
+            stat = os.stat(blob)
+            if stat.st_nlink - ignored[stat.st_dev, stat.st_ino] == 1:
+                if not dry_run:
+                    os.remove(blob)
+                count += 1
+                freed += stat.st_size
+        return count, freed
+
+    def adopt(self, path, dry_run=False):
+        """Turn an existing file into a link to its blob; return bytes saved."""
+        if os.stat(path).st_nlink > 1:
+            return 0
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(READ_SIZE), b""):
+                digest.update(chunk)
+        blob = self.blob_path(digest.hexdigest())
+        if dry_run:
+            return os.path.getsize(path) if os.path.exists(blob) else 0
+        os.makedirs(os.path.dirname(blob), exist_ok=True)
+        if not os.path.exists(blob):
+            # the file itself becomes the blob, no data is copied
+            os.link(path, blob)
+            return 0
+        size = os.path.getsize(path)
+        tmp_link = f"{path}.dedupe-tmp"
+        os.link(blob, tmp_link)
+        os.replace(tmp_link, path)
+        return size
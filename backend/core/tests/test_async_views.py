@@ -0,0 +1,104 @@
+import os
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+import django
+django.setup()
+
+import json
+import tempfile
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.test import AsyncRequestFactory, override_settings
+from rest_framework.test import APITestCase
+from rest_framework import status
+from rest_framework_simplejwt.tokens import AccessToken
+from django.contrib.auth import get_user_model
+from core import async_views
+from core.models import (
+    StudentProfile,
+    TeacherProfile,
+    ClassGroup,
+    Task,
+    Submission,
+    Comment,
+    Ranking,
+)
+
+
+SHARED_CACHE = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": tempfile.mkdtemp(prefix="async-views-cache-"),
+    }
+}
+
+
+class AsyncViewsTests(APITestCase):
+    """The async views must answer exactly like the DRF views they replace."""
+
+    def setUp(self):
+        cache.clear()
+        User = get_user_model()
+        teacher_user = User.objects.create_user(username="teacher", role="teacher")
+        self.teacher = TeacherProfile.objects.create(user=teacher_user, subject="Math")
+        self.group = ClassGroup.objects.create(name="G1", teacher=self.teacher)
+        self.students = []
+        for i, points in enumerate([30, 20, 10]):
+            user = User.objects.create_user(username=f"s{i}", first_name=f"Uczeń {i}", role="student")
+            student = StudentProfile.objects.create(user=user, group=self.group)
+            Ranking.objects.filter(student=student).update(points=points)
+            self.students.append(student)
+        for name in ("A", "B"):
+            task = Task.objects.create(name=name, description="d", created_by=self.teacher)
+            task.assign_students(self.students)
+        self.submission = Submission.objects.filter(student=self.students[0]).first()
+        for text in ("pierwszy", "drugi"):
+            Comment.objects.create(submission=self.submission, author=teacher_user, text=text)
+        self.factory = AsyncRequestFactory()
+
+    async def _compare(self, user, view, url, *args, headers=None):
+        self.client.force_authenticate(user=user)
+        expected = await sync_to_async(self.client.get)(url, headers=headers)
+        request = self.factory.get(url, headers={"Authorization": f"Bearer {AccessToken.for_user(user)}", **(headers or {})})
+        response = await view(request, *args)
+        self.assertEqual(response.status_code, expected.status_code)
+        if expected.content:
+            self.assertEqual(json.loads(response.content), expected.json())
+        return response
+
+    async def test_my_tasks(self):
+        await self._compare(self.students[0].user, async_views.my_tasks, "/api/my-tasks/")
+        await self._compare(self.teacher.user, async_views.my_tasks, "/api/my-tasks/")
+
+    async def test_rankings(self):
+        user = self.students[1].user
+        group_url = f"/api/ranking/group/{self.group.id}/"
+        for enabled in (True, False):
+            with override_settings(LEADERBOARD_CACHE=enabled, CACHES=SHARED_CACHE):
+                await self._compare(user, async_views.top_ranking, "/api/top-ranking/")
+                await self._compare(user, async_views.group_ranking, group_url, self.group.id)
+                await self._compare(user, async_views.group_ranking, f"{group_url}?around=1", self.group.id)
+
+    async def test_me(self):
+        await self._compare(self.students[2].user, async_views.me, "/api/my/")
+
+    async def test_comment_feeds(self):
+        student = self.students[0].user
+        url = f"/api/submissions/{self.submission.id}/comments/"
+        response = await self._compare(student, async_views.submission_comments, url, self.submission.id)
+        await self._compare(
+            student, async_views.submission_comments, url, self.submission.id, headers={"If-None-Match": response["ETag"]}
+        )
+        await self._compare(self.students[1].user, async_views.submission_comments, url, self.submission.id)
+
+        url = f"/api/teacher/submission/{self.submission.id}/comments/?since=0"
+        response = await self._compare(
+            self.teacher.user, async_views.teacher_submission_comments, url, self.submission.id
+        )
+        self.assertEqual(len(json.loads(response.content)), 2)
+
+    async def test_requires_token(self):
+        response = await async_views.me(self.factory.get("/api/my/"))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        response = await async_views.me(self.factory.get("/api/my/", headers={"Authorization": "Bearer nope"}))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
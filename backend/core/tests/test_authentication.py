@@ -0,0 +1,100 @@
+import os
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+import django
+django.setup()
+
+from django.core.cache import cache
+from django.test import override_settings
+from rest_framework.test import APITestCase
+from rest_framework import status
+from rest_framework_simplejwt.tokens import AccessToken
+from django.contrib.auth import get_user_model
+from core.models import (
+    StudentProfile,
+    TeacherProfile,
+    ClassGroup,
+    Task,
+    Submission,
+)
+
+
+class ProfileJWTAuthenticationTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        User = get_user_model()
+        self.teacher_user = User.objects.create_user(username="teacher", password="pass", role="teacher")
+        self.teacher = TeacherProfile.objects.create(user=self.teacher_user, subject="Math")
+        self.group = ClassGroup.objects.create(name="G1", teacher=self.teacher)
+        self.student_user = User.objects.create_user(username="student", password="pass", role="student")
+        self.student = StudentProfile.objects.create(user=self.student_user, group=self.group)
+        task = Task.objects.create(name="T", description="d", created_by=self.teacher)
+        task.assign_students([self.student])
+        self.submission = Submission.objects.get(student=self.student, task=task)
+
+    def _login(self, username):
+        response = self.client.post("/api/token/", {"username": username, "password": "pass"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.data['access']}")
+        self.refresh = response.data["refresh"]
+        return AccessToken(response.data["access"])
+
+    def test_tokens_carry_profile_claims(self):
+        token = self._login("student")
+        self.assertEqual(token["role"], "student")
+        self.assertEqual(token["profile_type"], "student")
+        self.assertEqual(token["profile_id"], self.student.id)
+        self.assertEqual(token["group_id"], self.group.id)
+
+        token = self._login("teacher")
+        self.assertEqual((token["profile_type"], token["profile_id"]), ("teacher", self.teacher.id))
+
+    def test_profiles_are_loaded_with_the_user(self):
+        for username in ("student", "teacher"):
+            self._login(username)
+            with self.assertNumQueries(1):
+                response = self.client.get("/api/me/full-profile/")
+            self.assertEqual(response.data["profile_type"], username)
+
+    def test_comment_access_check_runs_no_profile_queries(self):
+        self._login("teacher")
+        # user with profiles, submission with task, comment feed state
+        with self.assertNumQueries(3):
+            response = self.client.get(
+                f"/api/submissions/{self.submission.id}/comments/", HTTP_IF_NONE_MATCH="*"
+            )
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    @override_settings(LEADERBOARD_CACHE=False)
+    def test_claims_views_skip_user_lookup(self):
+        self._login("student")
+        with self.assertNumQueries(1):
+            response = self.client.get(f"/api/ranking/group/{self.group.id}/")
+        self.assertEqual(response.data["my_position"]["data"]["student_name"], "student")
+
+    def test_tokens_without_claims_still_work(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(self.student_user)}")
+        response = self.client.get(f"/api/ranking/group/{self.group.id}/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_inactive_user_is_rejected(self):
+        self._login("student")
+        self.student_user.is_active = False
+        self.student_user.save()
+        response = self.client.get("/api/me/full-profile/")
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_refresh_reissues_profile_claims(self):
+        self._login("student")
+        other = ClassGroup.objects.create(name="G2", teacher=self.teacher)
+        self.student.group = other
+        self.student.save()
+        response = self.client.post("/api/token/refresh/", {"refresh": self.refresh})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(AccessToken(response.data["access"])["group_id"], other.id)
+
+    def test_refresh_rejects_inactive_user(self):
+        self._login("student")
+        self.student_user.is_active = False
+        self.student_user.save()
+        response = self.client.post("/api/token/refresh/", {"refresh": self.refresh})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
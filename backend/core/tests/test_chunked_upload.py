@@ -0,0 +1,202 @@
+import os
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+import django
+django.setup()
+
+import hashlib
+import shutil
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.db.models import QuerySet
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework.test import APITestCase
+from rest_framework import status
+from django.contrib.auth import get_user_model
+from core import uploads
+from core.models import (
+    StudentProfile,
+    TeacherProfile,
+    Task,
+    Submission,
+    UploadSession,
+)
+
+PDF = b"%PDF-1.7\n" + bytes(range(256)) * 40
+
+
+class ChunkedUploadTests(APITestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.settings_override = override_settings(
+            MEDIA_ROOT=os.path.join(self.tmp, "media"),
+            CHUNKED_UPLOAD_DIR=os.path.join(self.tmp, "parts"),
+            CHUNKED_UPLOAD_MAX_SESSIONS=2,
+        )
+        self.settings_override.enable()
+        User = get_user_model()
+        self.user = User.objects.create_user(username="student", role="student")
+        self.student = StudentProfile.objects.create(user=self.user)
+        teacher_user = User.objects.create_user(username="teacher", role="teacher")
+        teacher = TeacherProfile.objects.create(user=teacher_user, subject="Math")
+        self.task = Task.objects.create(name="T", description="d", created_by=teacher)
+        self.task.assign_students([self.student])
+        self.client.force_authenticate(user=self.user)
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.tmp)
+
+    def _init(self, data=PDF, **extra):
+        response = self.client.post(
+            "/api/submit-task/uploads/",
+            {"task": self.task.id, "filename": "scan.pdf", "size": len(data), **extra},
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return f"/api/submit-task/uploads/{response.data['upload_id']}/"
+
+    def _put(self, url, chunk, offset, **headers):
+        return self.client.put(
+            url, chunk, content_type="application/octet-stream", HTTP_UPLOAD_OFFSET=str(offset), **headers
+        )
+
+    def test_upload_in_chunks_and_finalize(self):
+        url = self._init(sha256=hashlib.sha256(PDF).hexdigest())
+        for offset in range(0, len(PDF), 4000):
+            chunk = PDF[offset:offset + 4000]
+            response = self._put(url, chunk, offset, HTTP_UPLOAD_CHECKSUM=hashlib.sha256(chunk).hexdigest())
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(url + "finalize/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        submission = Submission.objects.get(student=self.student, task=self.task)
+        self.assertEqual(submission.status, "submitted")
+        with submission.file.open("rb") as f:
+            self.assertEqual(f.read(), PDF)
+        self.assertEqual(os.listdir(os.path.join(self.tmp, "parts")), [])
+
+    def test_resume_from_reported_offset(self):
+        url = self._init()
+        self._put(url, PDF[:5000], 0)
+        response = self._put(url, PDF[100:200], 100)
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        offset = self.client.get(url).data["offset"]
+        self.assertEqual(offset, 5000)
+        self._put(url, PDF[offset:], offset)
+        self.assertEqual(self.client.post(url + "finalize/").status_code, status.HTTP_200_OK)
+
+    def test_rejects_unknown_file_type(self):
+        data = b"MZ\x90\x00" + b"\x00" * 100
+        url = self._init(data)
+        response = self._put(url, data, 0)
+        self.assertEqual(response.status_code, status.HTTP_415_UNSUPPORTED_MEDIA_TYPE)
+        self.assertEqual(self.client.get(url).data["offset"], 0)
+
+    def test_rejects_oversized_and_bad_checksum(self):
+        url = self._init()
+        response = self._put(url, PDF + b"extra", 0)
+        self.assertEqual(response.status_code, status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+        response = self._put(url, PDF[:1000], 0, HTTP_UPLOAD_CHECKSUM="0" * 64)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get(url).data["offset"], 0)
+
+    def test_finalize_requires_all_bytes(self):
+        url = self._init()
+        self._put(url, PDF[:1000], 0)
+        self.assertEqual(self.client.post(url + "finalize/").status_code, status.HTTP_409_CONFLICT)
+
+    def _expire(self, url):
+        session_id = url.rstrip("/").rsplit("/", 1)[1]
+        UploadSession.objects.filter(pk=session_id).update(updated_at=timezone.now() - timedelta(days=2))
+        return UploadSession.objects.get(pk=session_id)
+
+    def test_chunk_is_read_before_the_session_is_locked(self):
+        url = self._init()
+
+        def append(session, chunk, offset):
+            # the whole body is already on disk when the lock is taken
+            self.assertEqual(chunk.file.read(), PDF[:5000])
+            chunk.file.seek(0)
+            return real_append(session, chunk, offset)
+
+        real_append = uploads.append
+        with mock.patch.object(uploads, "append", side_effect=append) as patched:
+            self.assertEqual(self._put(url, PDF[:5000], 0).data["offset"], 5000)
+        patched.assert_called_once()
+
+    def test_file_is_hashed_before_the_session_is_locked(self):
+        url = self._init(sha256=hashlib.sha256(PDF).hexdigest())
+        self._put(url, PDF, 0)
+        calls = []
+
+        def verify(session):
+            calls.append("verify")
+            return real_verify(session)
+
+        def select_for_update(queryset, *args, **kwargs):
+            calls.append("lock")
+            return real_select_for_update(queryset, *args, **kwargs)
+
+        real_verify = uploads.verify
+        real_select_for_update = QuerySet.select_for_update
+        with mock.patch.object(uploads, "verify", side_effect=verify), \
+                mock.patch.object(QuerySet, "select_for_update", select_for_update):
+            self.assertEqual(self.client.post(url + "finalize/").status_code, status.HTTP_200_OK)
+        self.assertEqual(calls, ["verify", "lock"])
+
+    def test_part_file_is_removed_after_commit(self):
+        url = self._init()
+        self._put(url, PDF, 0)
+        parts = os.path.join(self.tmp, "parts")
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.assertEqual(self.client.post(url + "finalize/").status_code, status.HTTP_200_OK)
+        self.assertEqual(len(os.listdir(parts)), 1)
+        for callback in callbacks:
+            callback()
+        self.assertEqual(os.listdir(parts), [])
+
+    def test_expired_session_is_rejected(self):
+        url = self._init()
+        self._put(url, PDF[:1000], 0)
+        self._expire(url)
+        response = self._put(url, PDF[1000:2000], 1000)
+        self.assertEqual(response.status_code, status.HTTP_410_GONE)
+        self.assertEqual(self.client.post(url + "finalize/").status_code, status.HTTP_410_GONE)
+
+    def test_open_sessions_per_student_are_limited(self):
+        first = self._init()
+        self._init()
+        response = self.client.post(
+            "/api/submit-task/uploads/", {"task": self.task.id, "filename": "scan.pdf", "size": len(PDF)}
+        )
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+        # expired sessions don't count, and are deleted with their part files
+        self._put(first, PDF[:1000], 0)
+        session = self._expire(first)
+        with self.captureOnCommitCallbacks(execute=True):
+            self._init()
+        self.assertFalse(UploadSession.objects.filter(pk=session.pk).exists())
+        self.assertFalse(os.path.exists(uploads.part_path(session)))
+
+    def test_cleanup_command(self):
+        expired, current = self._init(), self._init()
+        self._put(expired, PDF[:1000], 0)
+        self._put(current, PDF[:1000], 0)
+        session = self._expire(expired)
+        orphan = os.path.join(self.tmp, "parts", "0f6d4a7e-1111-4b1e-9c1a-2f5d6e7f8a9b.part")
+        with open(orphan, "wb") as f:
+            f.write(b"x")
+        os.utime(orphan, (0, 0))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            out = StringIO()
+            call_command("cleanup_uploads", stdout=out)
+        self.assertIn("Deleted 1 expired sessions and 1 orphaned part files", out.getvalue())
+        self.assertEqual(os.listdir(os.path.join(self.tmp, "parts")), [f"{UploadSession.objects.get().pk}.part"])
+        self.assertFalse(UploadSession.objects.filter(pk=session.pk).exists())
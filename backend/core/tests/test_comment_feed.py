@@ -0,0 +1,73 @@
+import os
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+import django
+django.setup()
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+from rest_framework import status
+from django.contrib.auth import get_user_model
+from core.models import (
+    StudentProfile,
+    TeacherProfile,
+    Task,
+    Submission,
+    Comment,
+)
+
+
+class CommentFeedTests(APITestCase):
+    def setUp(self):
+        User = get_user_model()
+        self.user = User.objects.create_user(username="student", role="student")
+        student = StudentProfile.objects.create(user=self.user)
+        teacher_user = User.objects.create_user(username="teacher", role="teacher")
+        self.teacher = TeacherProfile.objects.create(user=teacher_user, subject="Math")
+        task = Task.objects.create(name="T", description="d", created_by=self.teacher)
+        self.submission = Submission.objects.create(task=task, student=student)
+        self.first = Comment.objects.create(submission=self.submission, author=self.user, text="a", role="student")
+        self.client.force_authenticate(user=self.user)
+        self.url = f"/api/submissions/{self.submission.id}/comments/"
+
+    def test_since_returns_only_newer_comments(self):
+        second = Comment.objects.create(submission=self.submission, author=self.user, text="b", role="student")
+        response = self.client.get(self.url, {"since": self.first.id})
+        self.assertEqual([c["id"] for c in response.data], [second.id])
+
+    def test_unchanged_poll_gets_304(self):
+        response = self.client.get(self.url)
+        etag = response["ETag"]
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        # only the aggregate touches the comments table
+        self.assertFalse(any('"core_comment"."text"' in q["sql"] for q in ctx.captured_queries))
+
+        Comment.objects.create(submission=self.submission, author=self.user, text="b", role="student")
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 2)
+
+    def test_edit_changes_etag(self):
+        etag = self.client.get(self.url)["ETag"]
+        self.first.text = "edited"
+        self.first.save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_posts_return_created_comment_only(self):
+        response = self.client.post(f"/api/submissions/{self.submission.id}/add_comment/", {"text": "b"})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data["text"], "b")
+
+        self.client.force_authenticate(user=self.teacher.user)
+        response = self.client.post(f"/api/teacher/submission/{self.submission.id}/add_comment/", {"text": "c"})
+        self.assertEqual(response.data["text"], "c")
+        self.assertEqual(response.data["role"], "teacher")
+
+    def test_teacher_feed_supports_since(self):
+        self.client.force_authenticate(user=self.teacher.user)
+        url = f"/api/teacher/submission/{self.submission.id}/comments/"
+        self.assertEqual(len(self.client.get(url).data), 1)
+        self.assertEqual(self.client.get(url, {"since": self.first.id}).data, [])
@@ -13,7 +13,7 @@ from core.models import (
     Task,
     Submission,
     Comment,
-    Group,
+    ClassGroup as Group,
 )
 
 
@@ -91,16 +91,16 @@ class CommentTests(APITestCase):
         url = "/api/teacher/my-students/"
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
-        self.assertEqual(response.data[0]["id"], self.student_profile.id)
+        self.assertEqual(len(response.data["results"]), 1)
+        self.assertEqual(response.data["results"][0]["id"], self.student_profile.id)
 
     def test_teacher_student_submissions_endpoint(self):
         self.client.force_authenticate(user=self.teacher_profile.user)
         url = f"/api/teacher/student/{self.student_profile.id}/submissions/"
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 2)
-        self.assertEqual(response.data[0]["status"], "submitted")
+        self.assertEqual(len(response.data["results"]), 2)
+        self.assertEqual(response.data["results"][0]["status"], "submitted")
 
     def test_teacher_add_comment_endpoint(self):
         self.client.force_authenticate(user=self.teacher_profile.user)
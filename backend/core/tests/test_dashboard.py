@@ -0,0 +1,143 @@
+import os
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+import django
+django.setup()
+
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from core.models import (
+    ClassGroup,
+    Comment,
+    ParentChildRelation,
+    ParentProfile,
+    StudentProfile,
+    Submission,
+    Task,
+    TeacherProfile,
+)
+
+
+class ParentDashboardTests(APITestCase):
+    url = "/api/parent/dashboard/"
+
+    def setUp(self):
+        cache.clear()
+        self.User = get_user_model()
+        self.teacher_user = self.User.objects.create_user(
+            username="teacher", first_name="Ewa", last_name="Nowak", role="teacher"
+        )
+        self.teacher = TeacherProfile.objects.create(user=self.teacher_user, subject="Math")
+        self.group = ClassGroup.objects.create(name="1A", teacher=self.teacher)
+        self.child = self._student("ala", self.group)
+        self.classmate = self._student("ola", self.group)
+        parent_user = self.User.objects.create_user(username="mama", role="parent")
+        self.parent = ParentProfile.objects.create(user=parent_user)
+        ParentChildRelation.objects.create(parent=self.parent, child=self.child)
+        self.client.force_authenticate(parent_user)
+        self.today = timezone.localdate()
+
+    def _student(self, name, group):
+        user = self.User.objects.create_user(username=name, role="student")
+        return StudentProfile.objects.create(user=user, group=group)
+
+    def _task(self, name, days, *students):
+        task = Task.objects.create(
+            name=name, description="d", created_by=self.teacher, deadline=self.today + timedelta(days=days)
+        )
+        task.assign_students(students or [self.child])
+        return task
+
+    def _get(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_dashboard_of_each_child(self):
+        upcoming = self._task("Wypracowanie", 3)
+        overdue = self._task("Zaległe", -2)
+        done = self._task("Oddane", -5)
+        Submission.objects.filter(task=done, student=self.child).update(status="submitted")
+        graded = []
+        for i in range(7):
+            task = self._task(f"Ocenione {i}", -10 - i)
+            submission = Submission.objects.get(task=task, student=self.child)
+            submission.grade = i
+            submission.status = "approved"
+            submission.submitted_at = timezone.now() - timedelta(days=10 + i)
+            submission.save()
+            graded.append(submission)
+        for i in range(7):
+            Comment.objects.create(submission=graded[0], author=self.teacher_user, text=f"k{i}", role="teacher")
+        Comment.objects.create(submission=graded[0], author=self.child.user, text="uczeń", role="student")
+        Submission.objects.filter(student=self.classmate).delete()
+        self.classmate.ranking.points = 100
+        self.classmate.ranking.save()
+
+        [child] = self._get()["children"]
+        self.assertEqual(child["student"]["id"], self.child.id)
+        self.assertEqual(child["student"]["group"], {"id": self.group.id, "name": "1A"})
+        self.assertEqual([t["id"] for t in child["upcoming_tasks"]], [upcoming.id])
+        self.assertEqual([t["id"] for t in child["overdue_tasks"]], [overdue.id])
+        self.assertEqual([g["grade"] for g in child["recent_grades"]], [0, 1, 2, 3, 4])
+        self.assertEqual([c["text"] for c in child["teacher_comments"]], ["k6", "k5", "k4", "k3", "k2"])
+        self.assertEqual(child["teacher_comments"][0]["author"], "Ewa Nowak")
+        self.assertEqual((child["points"], child["rank"], child["group_size"]), (21, 2, 2))
+
+    def test_query_count_does_not_grow_with_children(self):
+        self._task("A", 1)
+        with CaptureQueriesContext(connection) as small:
+            self._get()
+        cache.clear()
+
+        other_group = ClassGroup.objects.create(name="2B", teacher=self.teacher)
+        for name in ("ela", "jan"):
+            child = self._student(name, other_group)
+            ParentChildRelation.objects.create(parent=self.parent, child=child)
+            for days in (-1, 1, 2):
+                task = self._task(f"{name}{days}", days, child)
+                submission = Submission.objects.get(task=task, student=child)
+                submission.grade = 3
+                submission.save()
+                Comment.objects.create(submission=submission, author=self.teacher_user, text="ok", role="teacher")
+        with CaptureQueriesContext(connection) as large:
+            self.assertEqual(len(self._get()["children"]), 3)
+        self.assertEqual(len(small.captured_queries), len(large.captured_queries))
+
+    def test_cached_until_grade_or_comment_changes(self):
+        task = self._task("A", 1, self.child, self.classmate)
+        self._get()
+        with CaptureQueriesContext(connection) as cached:
+            self._get()
+        self.assertLessEqual(len(cached.captured_queries), 1)
+
+        submission = Submission.objects.get(task=task, student=self.child)
+        with self.captureOnCommitCallbacks(execute=True):
+            Comment.objects.create(submission=submission, author=self.teacher_user, text="Hej", role="teacher")
+        self.assertEqual(self._get()["children"][0]["teacher_comments"][0]["text"], "Hej")
+
+        # a classmate's grade changes the child's rank
+        other = Submission.objects.get(task=task, student=self.classmate)
+        other.grade = 5
+        with self.captureOnCommitCallbacks(execute=True):
+            other.save()
+        self.assertEqual(self._get()["children"][0]["rank"], 2)
+
+    def test_cached_until_child_submits(self):
+        task = self._task("A", 1)
+        self.assertEqual([t["id"] for t in self._get()["children"][0]["upcoming_tasks"]], [task.id])
+        with self.captureOnCommitCallbacks(execute=True):
+            Submission.upsert(self.child, task, comment="Gotowe")
+        self.assertEqual(self._get()["children"][0]["upcoming_tasks"], [])
+
+    def test_requires_parent_profile(self):
+        self.client.force_authenticate(self.child.user)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(response.data, {"error": "Brak profilu rodzica"})
@@ -0,0 +1,157 @@
+import os
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+import django
+django.setup()
+
+import tempfile
+import time
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.checks import run_checks
+from django.test import AsyncRequestFactory, override_settings
+from rest_framework.test import APITestCase
+from rest_framework import status
+from rest_framework_simplejwt.tokens import AccessToken
+from django.contrib.auth import get_user_model
+from core import async_views, events
+from core.models import (
+    StudentProfile,
+    TeacherProfile,
+    ParentProfile,
+    ParentChildRelation,
+    Task,
+    Submission,
+)
+
+
+SHARED_CACHE = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": tempfile.mkdtemp(prefix="events-cache-"),
+    }
+}
+
+
+@override_settings(ASYNC_VIEWS=True, CACHES=SHARED_CACHE)
+class EventPublishingTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        User = get_user_model()
+        self.teacher_user = User.objects.create_user(username="teacher", role="teacher")
+        teacher = TeacherProfile.objects.create(user=self.teacher_user, subject="Math")
+        self.student_user = User.objects.create_user(username="student", role="student")
+        self.student = StudentProfile.objects.create(user=self.student_user)
+        self.other_user = User.objects.create_user(username="other", role="student")
+        StudentProfile.objects.create(user=self.other_user)
+        self.parent_user = User.objects.create_user(username="parent", role="parent")
+        ParentChildRelation.objects.create(
+            parent=ParentProfile.objects.create(user=self.parent_user), child=self.student
+        )
+        task = Task.objects.create(name="T", description="d", created_by=teacher)
+        task.assign_students([self.student])
+        self.submission = Submission.objects.get(student=self.student, task=task)
+        self.factory = AsyncRequestFactory()
+
+    def test_grade_and_comments_are_published_to_both_streams(self):
+        self.client.force_authenticate(user=self.teacher_user)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(f"/api/submissions/{self.submission.id}/set_grade/", {"grade": 5})
+            self.client.post(f"/api/teacher/submission/{self.submission.id}/add_comment/", {"text": "Brawo"})
+        self.client.force_authenticate(user=self.student_user)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f"/api/submissions/{self.submission.id}/add_comment/", {"text": "Dzięki"})
+
+        stream = events.since(f"student:{self.student.id}", 0)
+        self.assertEqual([e["type"] for e in stream], ["grade.set", "comment.created", "comment.created"])
+        self.assertEqual(stream[0]["data"]["grade"], 5)
+        self.assertEqual(stream[2]["data"]["comment"]["text"], "Dzięki")
+        submission_stream = events.since(f"submission:{self.submission.id}", 0)
+        self.assertEqual([e["data"] for e in submission_stream], [e["data"] for e in stream])
+        self.assertEqual(events.since(f"student:{self.student.id}", stream[0]["id"]), stream[1:])
+
+    def test_event_taken_but_not_stored_holds_readers_back(self):
+        stream = f"student:{self.student.id}"
+        first = events.publish([stream], "grade.set", {"grade": 3})[stream]
+        # another process took the next id and hasn't stored its event yet
+        events._next_id(stream)
+        third = events.publish([stream], "grade.set", {"grade": 5})[stream]
+
+        self.assertEqual([e["id"] for e in events.since(stream, 0)], [first])
+        later = time.time() + events.PUBLISH_GRACE + 1
+        with mock.patch("core.events.time.time", return_value=later):
+            self.assertEqual([e["id"] for e in events.since(stream, 0)], [first, third])
+
+    # publishing relies on an atomic incr, which the file cache doesn't have (Redis, memcached and locmem do)
+    @override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}})
+    def test_publisher_interrupted_by_another_keeps_both_events(self):
+        stream = f"student:{self.student.id}"
+        real_set = cache.set
+
+        def set(*args, **kwargs):
+            # another process publishes while this one is storing its event
+            if not interrupted:
+                interrupted.append(True)
+                events.publish([stream], "grade.set", {"grade": 2})
+            return real_set(*args, **kwargs)
+
+        interrupted = []
+        with mock.patch.object(cache, "set", side_effect=set):
+            events.publish([stream], "grade.set", {"grade": 1})
+        self.assertEqual(sorted(e["data"]["grade"] for e in events.since(stream, 0)), [1, 2])
+
+    def _stream(self, user, query=""):
+        return self.factory.get(f"/api/events/?ticket={events.ticket(user)}{query}")
+
+    async def test_stream_pushes_backlog_after_last_event_id(self):
+        first = events.publish([f"student:{self.student.id}"], "grade.set", {"grade": 3})[f"student:{self.student.id}"]
+        events.publish([f"student:{self.student.id}"], "grade.set", {"grade": 4})
+
+        request = self._stream(self.student_user, f"&last_event_id={first}")
+        response = await async_views.event_stream(request)
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        chunks = aiter(response.streaming_content)
+        self.assertTrue((await anext(chunks)).startswith(b"retry:"))
+        event = (await anext(chunks)).decode()
+        self.assertIn("event: grade.set\n", event)
+        self.assertIn('data: {"grade": 4}', event)
+
+    async def test_stream_access(self):
+        query = f"&submission={self.submission.id}"
+        for user, expected in (
+            (self.student_user, status.HTTP_200_OK),
+            (self.teacher_user, status.HTTP_200_OK),
+            (self.parent_user, status.HTTP_200_OK),
+            (self.other_user, status.HTTP_403_FORBIDDEN),
+        ):
+            response = await async_views.event_stream(self._stream(user, query))
+            self.assertEqual(response.status_code, expected)
+        response = await async_views.event_stream(self.factory.get("/api/events/"))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_ticket_endpoint(self):
+        self.client.force_authenticate(user=self.student_user)
+        response = self.client.post("/api/events/ticket/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(events.ticket_user_id(response.data["ticket"]), self.student_user.id)
+        with override_settings(ASYNC_VIEWS=False):
+            self.assertEqual(self.client.post("/api/events/ticket/").status_code, 501)
+
+    async def test_jwt_in_query_and_expired_tickets_are_refused(self):
+        token = AccessToken.for_user(self.student_user)
+        response = await async_views.event_stream(self.factory.get(f"/api/events/?token={token}"))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        request = self._stream(self.student_user)
+        with mock.patch("django.core.signing.time.time", return_value=10**10):
+            response = await async_views.event_stream(request)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    async def test_not_streamed_under_wsgi_or_with_a_local_cache(self):
+        with override_settings(ASYNC_VIEWS=False):
+            response = await async_views.event_stream(self._stream(self.student_user))
+        self.assertEqual(response.status_code, 501)
+        with override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}):
+            response = await async_views.event_stream(self._stream(self.student_user))
+            self.assertEqual(response.status_code, 501)
+            self.assertEqual([e.id for e in run_checks(tags=["events"])], ["core.E001"])
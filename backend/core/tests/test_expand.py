@@ -0,0 +1,69 @@
+import os
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+import django
+django.setup()
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+from rest_framework import status
+from django.contrib.auth import get_user_model
+from core.models import (
+    StudentProfile,
+    TeacherProfile,
+    Task,
+    Comment,
+)
+
+
+class ExpandAndFieldsTests(APITestCase):
+    def setUp(self):
+        self.User = get_user_model()
+        teacher_user = self.User.objects.create_user(username="teacher", role="teacher")
+        self.teacher = TeacherProfile.objects.create(user=teacher_user, subject="Math")
+        self.client.force_authenticate(user=teacher_user)
+        self.students = []
+        self._add_submissions(2)
+
+    def _add_submissions(self, count):
+        for _ in range(count):
+            user = self.User.objects.create_user(username=f"s{self.User.objects.count()}", role="student")
+            student = StudentProfile.objects.create(user=user)
+            task = Task.objects.create(name=f"T{user.id}", description="d", created_by=self.teacher)
+            task.assign_students([student])
+            submission = task.submissions.get()
+            Comment.objects.create(submission=submission, author=user, text="hi", role="student")
+
+    def _get(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data["results"], len(ctx.captured_queries)
+
+    def test_relations_are_ids_by_default(self):
+        results, _ = self._get("/api/submissions/")
+        self.assertIsInstance(results[0]["task"], int)
+        self.assertIsInstance(results[0]["student"], int)
+
+    def test_expand_nests_and_keeps_queries_flat(self):
+        url = "/api/submissions/?expand=task.created_by,student,comments"
+        results, small = self._get(url)
+        task = results[0]["task"]
+        self.assertEqual(task["created_by"]["subject"], "Math")
+        self.assertNotIn("submission", task)
+        self.assertEqual(results[0]["comments"][0]["text"], "hi")
+        self.assertIn("full_name", results[0]["student"])
+
+        self._add_submissions(8)
+        results, large = self._get(url)
+        self.assertEqual(len(results), 10)
+        self.assertEqual(small, large)
+
+    def test_sparse_fields(self):
+        results, _ = self._get("/api/submissions/?fields=id,status")
+        self.assertEqual(set(results[0]), {"id", "status"})
+
+    def test_fields_and_expand_on_tasks(self):
+        results, _ = self._get("/api/tasks/?fields=id,name,assigned_students&expand=assigned_students")
+        self.assertEqual(set(results[0]), {"id", "name", "assigned_students"})
+        self.assertEqual(len(results[0]["assigned_students"]), 1)
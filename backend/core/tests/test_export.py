@@ -0,0 +1,94 @@
+import os
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+import django
+django.setup()
+
+import io
+import shutil
+import tempfile
+import zipfile
+
+from django.core.files.base import ContentFile
+from django.test import override_settings
+from rest_framework.test import APITestCase
+from rest_framework import status
+from django.contrib.auth import get_user_model
+from core import exports
+from core.models import (
+    StudentProfile,
+    TeacherProfile,
+    ClassGroup,
+    Task,
+    Submission,
+)
+
+
+class SubmissionsExportTests(APITestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.tmp)
+        self.settings_override.enable()
+        User = get_user_model()
+        teacher_user = User.objects.create_user(username="teacher", role="teacher")
+        self.teacher = TeacherProfile.objects.create(user=teacher_user, subject="Math")
+        self.group = ClassGroup.objects.create(name="1A", teacher=self.teacher)
+        self.students = []
+        for username, first, last in (("ak", "Anna", "Kowalska"), ("jn", "Jan", "Nowak")):
+            user = User.objects.create_user(
+                username=username, first_name=first, last_name=last, role="student"
+            )
+            self.students.append(StudentProfile.objects.create(user=user, group=self.group))
+        self.tasks = [
+            Task.objects.create(name=name, description="d", created_by=self.teacher) for name in ("Algebra", "Geo")
+        ]
+        for task in self.tasks:
+            task.assign_students(self.students)
+        for submission in Submission.objects.filter(student=self.students[0]):
+            submission.file.save("praca.pdf", ContentFile(f"{submission.task.name} by Anna".encode()))
+        self.client.force_authenticate(user=teacher_user)
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def _archive(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Content-Type"], "application/zip")
+        return zipfile.ZipFile(io.BytesIO(b"".join(response.streaming_content)))
+
+    def test_task_export_names_entries_by_student(self):
+        archive = self._archive(f"/api/teacher/tasks/{self.tasks[0].id}/export/")
+
+        self.assertEqual(archive.namelist(), ["Kowalska Anna (ak)/praca.pdf"])
+        self.assertEqual(archive.read("Kowalska Anna (ak)/praca.pdf"), b"Algebra by Anna")
+        self.assertIsNone(archive.testzip())
+
+    def test_group_export_includes_task_folders(self):
+        archive = self._archive(f"/api/teacher/groups/{self.group.id}/export/")
+
+        folders = sorted(name.rsplit("/", 1)[0] for name in archive.namelist())
+        self.assertEqual(folders, ["Kowalska Anna (ak)/Algebra", "Kowalska Anna (ak)/Geo"])
+
+    def test_other_teachers_get_404(self):
+        other = get_user_model().objects.create_user(username="t2", role="teacher")
+        TeacherProfile.objects.create(user=other, subject="Bio")
+        self.client.force_authenticate(user=other)
+        response = self.client.get(f"/api/teacher/tasks/{self.tasks[0].id}/export/")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_archive_is_streamed_in_pieces(self):
+        big = self.students[1]
+        submission = Submission.objects.get(student=big, task=self.tasks[0])
+        submission.file.save("duzy.bin", ContentFile(os.urandom(3 * 64 * 1024 + 7)))
+
+        response = self.client.get(f"/api/teacher/tasks/{self.tasks[0].id}/export/")
+        chunks = list(response.streaming_content)
+
+        self.assertGreater(len(chunks), 3)
+        self.assertLessEqual(max(len(c) for c in chunks), 64 * 1024 + 512)
+        archive = zipfile.ZipFile(io.BytesIO(b"".join(chunks)))
+        self.assertEqual(archive.getinfo("Nowak Jan (jn)/duzy.bin").file_size, 3 * 64 * 1024 + 7)
+
+    def test_entry_name_sanitizes_path_parts(self):
+        self.assertEqual(exports.entry_name(("u", "", ""), "a/b/c.pdf", task="1/2"), "u/1_2/c.pdf")
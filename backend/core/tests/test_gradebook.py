@@ -0,0 +1,86 @@
+import os
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+import django
+django.setup()
+
+import json
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+from rest_framework import status
+from django.contrib.auth import get_user_model
+from core.models import (
+    StudentProfile,
+    TeacherProfile,
+    ClassGroup,
+    Task,
+    Submission,
+    Comment,
+)
+
+
+class GradebookTests(APITestCase):
+    def setUp(self):
+        self.User = get_user_model()
+        teacher_user = self.User.objects.create_user(username="teacher", role="teacher")
+        self.teacher = TeacherProfile.objects.create(user=teacher_user, subject="Math")
+        self.group = ClassGroup.objects.create(name="G1", teacher=self.teacher)
+        self.client.force_authenticate(user=teacher_user)
+        self.url = f"/api/teacher/groups/{self.group.id}/gradebook/"
+        self.students = [self._student() for _ in range(2)]
+        self.tasks = [self._task() for _ in range(2)]
+
+    def _student(self):
+        user = self.User.objects.create_user(username=f"s{self.User.objects.count()}", role="student")
+        return StudentProfile.objects.create(user=user, group=self.group)
+
+    def _task(self):
+        task = Task.objects.create(name=f"T{Task.objects.count()}", description="d", created_by=self.teacher)
+        task.assign_students(list(StudentProfile.objects.filter(group=self.group)))
+        return task
+
+    def _get(self, params=None):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(self.url, params or {})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response, len(ctx.captured_queries)
+
+    def test_matrix_cells(self):
+        submission = Submission.objects.get(student=self.students[1], task=self.tasks[0])
+        submission.grade = 5
+        submission.status = "approved"
+        submission.save()
+        Comment.objects.create(submission=submission, author=self.students[1].user, text="a", role="student")
+        Comment.objects.create(submission=submission, author=self.students[1].user, text="b", role="student")
+
+        response, _ = self._get()
+        self.assertEqual([t["id"] for t in response.data["tasks"]], [t.id for t in self.tasks])
+        rows = response.data["rows"]
+        self.assertEqual([r["student"]["id"] for r in rows], [s.id for s in self.students])
+        cell = rows[1]["cells"][0]
+        self.assertEqual((cell["status"], cell["grade"], cell["comment_count"]), ("approved", 5, 2))
+        self.assertEqual(rows[0]["cells"][1]["status"], "pending")
+
+    def test_constant_queries(self):
+        _, small = self._get()
+        for _ in range(5):
+            self._student()
+        for _ in range(3):
+            self._task()
+        response, large = self._get()
+        self.assertEqual(len(response.data["rows"]), 7)
+        self.assertEqual(small, large)
+
+    def test_streaming_ndjson(self):
+        response, _ = self._get({"stream": 1})
+        lines = [json.loads(line) for line in b"".join(response.streaming_content).splitlines()]
+        self.assertEqual(lines[0]["group"]["id"], self.group.id)
+        self.assertEqual(len(lines), 1 + len(self.students))
+        self.assertEqual(len(lines[1]["cells"]), len(self.tasks))
+
+    def test_other_teachers_group(self):
+        other_user = self.User.objects.create_user(username="other", role="teacher")
+        TeacherProfile.objects.create(user=other_user, subject="Art")
+        self.client.force_authenticate(user=other_user)
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_404_NOT_FOUND)
@@ -0,0 +1,148 @@
+import os
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+import django
+django.setup()
+
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+
+from core import events, leaderboard
+from core.models import ClassGroup, Ranking, StudentProfile, Submission, Task, TeacherProfile
+
+
+SHARED_CACHE = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": tempfile.mkdtemp(prefix="grading-cache-"),
+    }
+}
+
+
+@override_settings(LEADERBOARD_CACHE=True, CACHES=SHARED_CACHE)
+class BatchGradingTests(APITestCase):
+    url = "/api/submissions/set_grades/"
+
+    def setUp(self):
+        cache.clear()
+        self.User = get_user_model()
+        self.teacher_user = self.User.objects.create_user(username="teacher", role="teacher")
+        self.teacher = TeacherProfile.objects.create(user=self.teacher_user, subject="Math")
+        self.group = ClassGroup.objects.create(name="G", teacher=self.teacher)
+        self.students = [
+            StudentProfile.objects.create(
+                user=self.User.objects.create_user(username=f"s{i}", role="student"), group=self.group
+            )
+            for i in range(4)
+        ]
+        self.tasks = [Task.objects.create(name=f"T{i}", description="d", created_by=self.teacher) for i in range(2)]
+        for task in self.tasks:
+            task.assign_students(self.students)
+        self.client.force_authenticate(self.teacher_user)
+
+    def _submission(self, student, task):
+        return Submission.objects.get(student=student, task=self.tasks[task])
+
+    def _points(self, student):
+        student.refresh_from_db()
+        return Ranking.objects.get(student=student).points, student.points
+
+    def _post(self, items):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(self.url, {"grades": items}, format="json")
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_grades_update_each_ranking_once(self):
+        first = self._submission(self.students[0], 0)
+        first.grade = 2
+        first.save()
+        leaderboard.standings(self.group.id)
+
+        data = self._post([
+            {"submission_id": first.id, "grade": 5, "status": "approved", "feedback": "Dobrze"},
+            {"submission_id": self._submission(self.students[0], 1).id, "grade": 4},
+            {"submission_id": self._submission(self.students[1], 0).id, "grade": 6},
+            {"submission_id": self._submission(self.students[2], 0).id, "status": "submitted"},
+        ])
+
+        self.assertEqual(data["updated"], 4)
+        self.assertTrue(all(result["ok"] for result in data["results"]))
+        first.refresh_from_db()
+        self.assertEqual((first.grade, first.status, first.feedback), (5, "approved", "Dobrze"))
+        self.assertEqual(self._points(self.students[0]), (9, 9))
+        self.assertEqual(self._points(self.students[1]), (6, 6))
+        self.assertEqual(self._points(self.students[2]), (0, 0))
+        standings = leaderboard.standings(self.group.id)
+        self.assertEqual([entry["student"] for entry in standings.top(2)], [self.students[0].id, self.students[1].id])
+        self.assertEqual(
+            [e["type"] for e in events.since(f"submission:{first.id}", 0)], ["grade.set"]
+        )
+
+    def test_partial_failures_are_reported_per_item(self):
+        foreign_teacher = TeacherProfile.objects.create(
+            user=self.User.objects.create_user(username="other", role="teacher"), subject="Art"
+        )
+        foreign_task = Task.objects.create(name="X", description="d", created_by=foreign_teacher)
+        foreign_task.assign_students([self.students[0]])
+        foreign = Submission.objects.get(task=foreign_task)
+        good = self._submission(self.students[0], 0)
+
+        data = self._post([
+            {"submission_id": good.id, "grade": 3},
+            {"submission_id": foreign.id, "grade": 3},
+            {"submission_id": good.id, "grade": 1},
+            {"submission_id": self._submission(self.students[1], 0).id, "grade": 9},
+            {"submission_id": self._submission(self.students[2], 0).id, "status": "lost"},
+            {"submission_id": "abc", "grade": 1},
+            {"submission_id": self._submission(self.students[3], 0).id},
+            "5",
+        ])
+
+        self.assertEqual(data["updated"], 1)
+        self.assertEqual(
+            [result.get("error") for result in data["results"]],
+            [
+                None,
+                "Brak zgłoszenia",
+                "Zgłoszenie powtórzone w żądaniu",
+                "Ocena musi być liczbą z przedziału 0–6",
+                "Nieprawidłowy status",
+                "Nieprawidłowe ID zgłoszenia",
+                "Brak zmian",
+                "Nieprawidłowy element",
+            ],
+        )
+        foreign.refresh_from_db()
+        self.assertIsNone(foreign.grade)
+        self.assertEqual(self._points(self.students[0]), (3, 3))
+
+    def test_query_count_does_not_grow_with_items(self):
+        def grade(submissions, value):
+            items = [{"submission_id": s.id, "grade": value} for s in submissions]
+            with CaptureQueriesContext(connection) as ctx:
+                self._post(items)
+            return len(ctx.captured_queries)
+
+        small = grade([self._submission(self.students[0], 0)], 4)
+        large = grade([self._submission(s, t) for s in self.students for t in range(2)], 5)
+        self.assertEqual(small, large)
+        self.assertEqual(self._points(self.students[3]), (10, 10))
+
+    def test_rows_are_locked_in_id_order(self):
+        submissions = [self._submission(s, 0) for s in self.students]
+        items = [{"submission_id": s.id, "grade": 2} for s in reversed(submissions)]
+        with CaptureQueriesContext(connection) as ctx:
+            self._post(items)
+        load = next(q["sql"] for q in ctx.captured_queries if q["sql"].startswith("SELECT") and "IN (" in q["sql"])
+        self.assertRegex(load, r'ORDER BY "core_submission"\."id" ASC')
+
+    def test_only_teachers_and_lists(self):
+        self.assertEqual(self.client.post(self.url, {"grades": "x"}, format="json").status_code, 400)
+        self.client.force_authenticate(self.students[0].user)
+        self.assertEqual(self.client.post(self.url, {"grades": []}, format="json").status_code, 403)
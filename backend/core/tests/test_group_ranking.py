@@ -0,0 +1,87 @@
+import os
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+import django
+django.setup()
+
+import tempfile
+
+from django.core.cache import cache
+from django.test import override_settings
+from rest_framework.test import APITestCase
+from rest_framework import status
+from django.contrib.auth import get_user_model
+from core.models import (
+    StudentProfile,
+    TeacherProfile,
+    ClassGroup,
+    Ranking,
+)
+
+
+@override_settings(LEADERBOARD_CACHE=False)
+class GroupRankingTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        User = get_user_model()
+        teacher_user = User.objects.create_user(username="teacher", password="pass", role="teacher")
+        teacher = TeacherProfile.objects.create(user=teacher_user, subject="Math")
+        self.group = ClassGroup.objects.create(name="G1", teacher=teacher)
+        self.students = []
+        # points: 50, 40, 40, 30, 20, 10, 10, 5
+        for i, points in enumerate([50, 40, 40, 30, 20, 10, 10, 5]):
+            user = User.objects.create_user(username=f"s{i}", password="pass", role="student")
+            student = StudentProfile.objects.create(user=user, group=self.group)
+            Ranking.objects.filter(student=student).update(points=points)
+            self.students.append(student)
+        self.url = f"/api/ranking/group/{self.group.id}/"
+
+    def test_top_and_my_position_in_single_query(self):
+        self.client.force_authenticate(user=self.students[4].user)
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([r["points"] for r in response.data["top"]], [50, 40, 40])
+        self.assertEqual(response.data["my_position"]["rank"], 5)
+        self.assertEqual(response.data["my_position"]["data"]["student_name"], "s4")
+        self.assertNotIn("neighbourhood", response.data)
+
+    def test_ties_share_rank(self):
+        self.client.force_authenticate(user=self.students[6].user)
+        response = self.client.get(self.url)
+        self.assertEqual([r["rank"] for r in response.data["top"]], [1, 2, 2])
+        self.assertEqual([r["dense_rank"] for r in response.data["top"]], [1, 2, 2])
+        mine = response.data["my_position"]
+        self.assertEqual(mine["rank"], 6)
+        self.assertEqual(mine["data"]["dense_rank"], 5)
+
+    def test_neighbourhood_around_caller(self):
+        self.client.force_authenticate(user=self.students[4].user)
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, {"around": 2})
+        names = [r["student_name"] for r in response.data["neighbourhood"]]
+        self.assertEqual(names, ["s2", "s3", "s4", "s5", "s6"])
+
+    def test_caller_outside_group(self):
+        self.client.force_authenticate(user=self.group.teacher.user)
+        response = self.client.get(self.url, {"around": 2})
+        self.assertEqual(len(response.data["top"]), 3)
+        self.assertIsNone(response.data["my_position"]["rank"])
+        self.assertEqual(response.data["neighbourhood"], [])
+
+
+SHARED_CACHE = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": tempfile.mkdtemp(prefix="group-ranking-cache-"),
+    }
+}
+
+
+@override_settings(LEADERBOARD_CACHE=True, CACHES=SHARED_CACHE)
+class CachedGroupRankingTests(GroupRankingTests):
+    def test_top_and_my_position_in_single_query(self):
+        super().test_top_and_my_position_in_single_query()
+        # the board is cached now
+        self.client.force_authenticate(user=self.students[4].user)
+        with self.assertNumQueries(0):
+            self.client.get(self.url)
@@ -0,0 +1,131 @@
+import os
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+import django
+django.setup()
+
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from core import jobs
+from core.models import ClassGroup, Job, Ranking, StudentProfile, Submission, Task, TeacherProfile
+
+
+@override_settings(JOBS_EAGER=False, JOBS_MAX_ATTEMPTS=3, JOBS_RETRY_DELAY=10, JOBS_LEASE=300)
+class JobQueueTests(TestCase):
+    def setUp(self):
+        User = get_user_model()
+        self.teacher = TeacherProfile.objects.create(
+            user=User.objects.create_user(username="teacher", role="teacher"), subject="Math"
+        )
+        self.student = StudentProfile.objects.create(user=User.objects.create_user(username="s", role="student"))
+        self.task = Task.objects.create(name="T", description="d", created_by=self.teacher)
+        self.calls = []
+        patcher = mock.patch.dict(jobs.HANDLERS, {"test.flaky": self._flaky})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _flaky(self, fail):
+        self.calls.append(fail)
+        if fail:
+            raise RuntimeError("boom")
+
+    def test_dedupe_key_coalesces_queued_jobs(self):
+        for _ in range(3):
+            jobs.enqueue("ranking.recompute", {"student_id": self.student.id}, dedupe_key="ranking:1")
+        jobs.enqueue("ranking.recompute", {"student_id": self.student.id})
+        self.assertEqual(Job.objects.count(), 2)
+
+        # once claimed, new work for the key is queued again
+        jobs.claim("w1")
+        jobs.enqueue("ranking.recompute", {"student_id": self.student.id}, dedupe_key="ranking:1")
+        self.assertEqual(Job.objects.filter(status=Job.Status.QUEUED).count(), 2)
+
+    def test_unsaved_submission_recomputes_ranking_in_worker(self):
+        submission = Submission.objects.create(task=self.task, student=self.student)
+        Submission(
+            id=submission.id, task=self.task, student=self.student, grade=5, created_at=submission.created_at
+        ).save()
+        self.assertEqual(Ranking.objects.get(student=self.student).points, 0)
+        self.assertEqual(Job.objects.get().name, "ranking.recompute")
+
+        self.assertEqual(jobs.work("w1", burst=True), 1)
+        self.assertEqual(Ranking.objects.get(student=self.student).points, 5)
+        self.assertFalse(Job.objects.exists())
+
+    def test_failed_job_is_retried_with_backoff_then_failed(self):
+        jobs.enqueue("test.flaky", {"fail": True})
+        job = Job.objects.get()
+        for attempt in range(1, 4):
+            with self.assertLogs("core.jobs"):
+                self.assertEqual(jobs.work("w1", burst=True), 1)
+            job.refresh_from_db()
+            self.assertEqual(job.attempts, attempt)
+            self.assertIn("boom", job.last_error)
+            if attempt < 3:
+                self.assertEqual(job.status, Job.Status.QUEUED)
+                delay = (job.run_at - timezone.now()).total_seconds()
+                self.assertAlmostEqual(delay, 10 * 2 ** (attempt - 1), delta=2)
+                Job.objects.filter(id=job.id).update(run_at=timezone.now())
+        self.assertEqual(job.status, Job.Status.FAILED)
+        self.assertEqual(jobs.work("w1", burst=True), 0)
+
+    def test_retry_merges_into_job_queued_meanwhile(self):
+        jobs.enqueue("test.flaky", {"fail": True}, dedupe_key="k")
+        [job] = jobs.claim("w1")
+        jobs.enqueue("test.flaky", {"fail": False}, dedupe_key="k")
+        with self.assertLogs("core.jobs"):
+            jobs.execute(job)
+        self.assertEqual(list(Job.objects.values_list("payload", flat=True)), [{"fail": False}])
+
+    def test_claim_skips_jobs_locked_by_others_until_lease_expires(self):
+        jobs.enqueue("test.flaky", {"fail": False})
+        self.assertEqual(len(jobs.claim("w1")), 1)
+        self.assertEqual(jobs.claim("w2"), [])
+
+        Job.objects.update(locked_at=timezone.now() - timedelta(seconds=301))
+        [job] = jobs.claim("w2")
+        self.assertEqual((job.locked_by, job.attempts), ("w2", 2))
+
+    def test_future_jobs_wait(self):
+        jobs.enqueue("test.flaky", {"fail": False}, delay=60)
+        self.assertEqual(jobs.work("w1", burst=True), 0)
+        self.assertEqual(self.calls, [])
+
+    def test_run_jobs_command(self):
+        jobs.enqueue("test.flaky", {"fail": False})
+        jobs.enqueue("test.flaky", {"fail": False})
+        out = StringIO()
+        call_command("run_jobs", burst=True, batch=5, stdout=out)
+        self.assertIn("Processed 2 jobs", out.getvalue())
+        self.assertEqual(self.calls, [False, False])
+
+
+@override_settings(JOBS_EAGER=False)
+class TaskAssignJobTests(APITestCase):
+    def test_students_are_assigned_by_worker(self):
+        User = get_user_model()
+        teacher_user = User.objects.create_user(username="teacher", role="teacher")
+        teacher = TeacherProfile.objects.create(user=teacher_user, subject="Math")
+        group = ClassGroup.objects.create(name="G", teacher=teacher)
+        for i in range(3):
+            StudentProfile.objects.create(user=User.objects.create_user(username=f"s{i}", role="student"), group=group)
+        self.client.force_authenticate(teacher_user)
+
+        response = self.client.post(
+            "/api/teacher/tasks/create/", {"name": "T", "description": "d", "group": group.id}
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.data["students"]), 3)
+        self.assertFalse(Submission.objects.exists())
+
+        jobs.work("w1", burst=True)
+        task = Task.objects.get(id=response.data["task_id"])
+        self.assertEqual(task.assigned_students.count(), 3)
+        self.assertEqual(Submission.objects.filter(task=task, status="pending").count(), 3)
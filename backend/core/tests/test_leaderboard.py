@@ -0,0 +1,167 @@
+import os
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+import django
+django.setup()
+
+import tempfile
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from rest_framework.test import APIClient
+from core import leaderboard
+from core.models import (
+    StudentProfile,
+    TeacherProfile,
+    ClassGroup,
+    Task,
+    Submission,
+    Ranking,
+)
+
+
+SHARED_CACHE = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": tempfile.mkdtemp(prefix="leaderboard-cache-"),
+    }
+}
+
+
+@override_settings(LEADERBOARD_CACHE=True, CACHES=SHARED_CACHE)
+class LeaderboardTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        User = get_user_model()
+        teacher_user = User.objects.create_user(username="teacher", role="teacher")
+        self.teacher = TeacherProfile.objects.create(user=teacher_user, subject="Math")
+        self.group = ClassGroup.objects.create(name="G1", teacher=self.teacher)
+        self.other_group = ClassGroup.objects.create(name="G2", teacher=self.teacher)
+        self.task = Task.objects.create(name="T", description="d", created_by=self.teacher)
+        self.students = []
+        for i in range(3):
+            user = User.objects.create_user(username=f"s{i}", role="student")
+            self.students.append(StudentProfile.objects.create(user=user, group=self.group))
+
+    def _grade(self, student, grade):
+        with self.captureOnCommitCallbacks(execute=True):
+            Submission.objects.create(task=self.task, student=student, grade=grade)
+
+    def _students(self, entries):
+        return [entry["student"] for entry in entries]
+
+    def test_boards_follow_grades(self):
+        self.assertEqual(len(leaderboard.standings(self.group.id)), 3)
+
+        self._grade(self.students[2], 5)
+        self._grade(self.students[0], 3)
+        standings = leaderboard.standings(self.group.id)
+        with self.assertNumQueries(0):
+            self.assertEqual(len(leaderboard.standings(self.group.id)), 3)
+        self.assertEqual(self._students(standings.top(2)), [self.students[2].id, self.students[0].id])
+        self.assertEqual(standings.entry(standings.index_of_user(self.students[1].user_id))["rank"], 3)
+        self.assertEqual(leaderboard.top(1)[0]["points"], 5)
+
+    def test_changes_move_entries_without_rebuilding(self):
+        leaderboard.standings(self.group.id)
+        leaderboard.top(10)
+        with mock.patch.object(leaderboard, "_build", side_effect=AssertionError("rebuilt")):
+            self._grade(self.students[1], 2)
+            # the batch path applies its deltas with Ranking.apply_deltas
+            with self.captureOnCommitCallbacks(execute=True):
+                Ranking.apply_deltas({self.students[0].id: 4, self.students[1].id: 1})
+            board = leaderboard.standings(self.group.id)
+            self.assertEqual([(e["student"], e["points"]) for e in board.top(3)], [
+                (self.students[0].id, 4), (self.students[1].id, 3), (self.students[2].id, 0),
+            ])
+            self.assertEqual(leaderboard.top(1)[0]["student"], self.students[0].id)
+
+    def test_ties_and_dense_rank(self):
+        self._grade(self.students[0], 4)
+        self._grade(self.students[1], 4)
+        ranks = [(e["rank"], e["dense_rank"]) for e in leaderboard.standings(self.group.id).top(3)]
+        self.assertEqual(ranks, [(1, 1), (1, 1), (3, 2)])
+
+    def test_group_change_moves_student_between_boards(self):
+        leaderboard.standings(self.group.id)
+        leaderboard.standings(self.other_group.id)
+        student = StudentProfile.objects.get(pk=self.students[0].pk)
+        student.group = self.other_group
+        with self.captureOnCommitCallbacks(execute=True):
+            student.save()
+        self.assertEqual(len(leaderboard.standings(self.group.id)), 2)
+        self.assertEqual(self._students(leaderboard.standings(self.other_group.id).top(1)), [student.id])
+
+    def test_deleted_ranking_leaves_boards(self):
+        leaderboard.standings(self.group.id)
+        leaderboard.top(10)
+        with self.captureOnCommitCallbacks(execute=True):
+            Ranking.objects.get(student=self.students[0]).delete()
+        self.assertEqual(len(leaderboard.standings(self.group.id)), 2)
+        self.assertEqual(len(leaderboard.top(10)), 2)
+
+    @override_settings(LEADERBOARD_GLOBAL_SIZE=2)
+    def test_global_board_keeps_the_best(self):
+        self._grade(self.students[0], 5)
+        self._grade(self.students[1], 4)
+        self._grade(self.students[2], 3)
+        self.assertEqual(self._students(leaderboard.top(10)), [self.students[0].id, self.students[1].id])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Ranking.apply_delta(self.students[2].id, 3)
+        self.assertEqual(self._students(leaderboard.top(10)), [self.students[2].id, self.students[0].id])
+        # falls below the best student not on the board: the board is refilled from the database
+        with self.captureOnCommitCallbacks(execute=True):
+            Ranking.apply_delta(self.students[2].id, -6)
+        self.assertEqual(self._students(leaderboard.top(10)), [self.students[0].id, self.students[1].id])
+
+    def test_readers_wait_for_the_board_being_built(self):
+        cache.add(leaderboard._lock_key(self.group.id), "other", timeout=10)
+
+        def sleep(seconds):
+            # the other request stores its board and releases the lock
+            cache.set(leaderboard._key(self.group.id), built)
+            cache.delete(leaderboard._lock_key(self.group.id))
+
+        built = leaderboard._build(self.group.id)
+        with mock.patch.object(leaderboard.time, "sleep", side_effect=sleep), self.assertNumQueries(0):
+            self.assertEqual(len(leaderboard.standings(self.group.id)), 3)
+
+    def test_update_waits_for_the_board_being_built(self):
+        leaderboard.standings(self.group.id)
+        cache.add(leaderboard._lock_key(self.group.id), "other", timeout=10)
+
+        def sleep(seconds):
+            cache.delete(leaderboard._lock_key(self.group.id))
+
+        with mock.patch.object(leaderboard.time, "sleep", side_effect=sleep) as slept:
+            self._grade(self.students[1], 6)
+        slept.assert_called()
+        self.assertEqual(leaderboard.standings(self.group.id).top(1)[0]["student"], self.students[1].id)
+
+    def test_rebuild_all_populates_the_boards(self):
+        Ranking.objects.filter(student=self.students[1]).update(points=9)
+        self.assertEqual(leaderboard.rebuild_all(), 3)
+        with self.assertNumQueries(0):
+            self.assertEqual(leaderboard.standings(self.group.id).top(1)[0]["points"], 9)
+            self.assertEqual(len(leaderboard.standings(self.other_group.id)), 0)
+            self.assertEqual(leaderboard.top(1)[0]["points"], 9)
+
+    def test_process_local_cache(self):
+        with override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}):
+            self.assertTrue(leaderboard.enabled())
+            leaderboard.standings(self.group.id)
+            self._grade(self.students[2], 2)
+            with self.assertNumQueries(0):
+                self.assertEqual(leaderboard.standings(self.group.id).top(1)[0]["student"], self.students[2].id)
+
+    def test_top_ranking_has_the_same_shape_with_and_without_cache(self):
+        self._grade(self.students[0], 4)
+        self._grade(self.students[2], 4)
+        client = APIClient()
+        client.force_authenticate(self.students[1].user)
+        cached = client.get("/api/top-ranking/").json()
+        with override_settings(LEADERBOARD_CACHE=False):
+            self.assertEqual(client.get("/api/top-ranking/").json(), cached)
+        self.assertEqual([(e["rank"], e["dense_rank"]) for e in cached], [(1, 1), (1, 1), (3, 2)])
@@ -0,0 +1,122 @@
+import os
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+import django
+django.setup()
+
+import shutil
+import tempfile
+
+from django.core.files.base import ContentFile
+from django.test import override_settings
+from rest_framework.test import APITestCase
+from rest_framework import status
+from django.contrib.auth import get_user_model
+from core import media
+from core.models import (
+    StudentProfile,
+    TeacherProfile,
+    ParentProfile,
+    ParentChildRelation,
+    Task,
+    Submission,
+)
+
+CONTENT = bytes(range(256)) * 4
+
+
+class MediaViewTests(APITestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.tmp)
+        self.settings_override.enable()
+        User = get_user_model()
+        self.student_user = User.objects.create_user(username="student", role="student")
+        self.student = StudentProfile.objects.create(user=self.student_user)
+        self.other_user = User.objects.create_user(username="other", role="student")
+        StudentProfile.objects.create(user=self.other_user)
+        teacher_user = User.objects.create_user(username="teacher", role="teacher")
+        self.teacher = TeacherProfile.objects.create(user=teacher_user, subject="Math")
+        self.parent_user = User.objects.create_user(username="parent", role="parent")
+        parent = ParentProfile.objects.create(user=self.parent_user)
+        ParentChildRelation.objects.create(parent=parent, child=self.student)
+
+        self.task = Task.objects.create(name="T", description="d", created_by=self.teacher)
+        self.task.assign_students([self.student])
+        self.submission = Submission.objects.get(student=self.student, task=self.task)
+        self.submission.file.save("answer.bin", ContentFile(CONTENT))
+        self.url = f"/media/{self.submission.file.name}"
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def _get(self, user, url=None, **headers):
+        if user is not None:
+            self.client.force_authenticate(user=user)
+        return self.client.get(url or self.url, **headers)
+
+    def test_owner_teacher_and_parent_can_read(self):
+        for user in (self.student_user, self.teacher.user, self.parent_user):
+            response = self._get(user)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(b"".join(response.streaming_content), CONTENT)
+            self.assertEqual(response["Accept-Ranges"], "bytes")
+            self.assertIn("private", response["Cache-Control"])
+
+    def test_other_users_are_rejected(self):
+        self.assertEqual(self._get(self.other_user).status_code, status.HTTP_403_FORBIDDEN)
+        self.client.force_authenticate(user=None)
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_token_in_url_grants_access_to_that_file_only(self):
+        token = media.token(self.student_user.pk, self.submission.file.name)
+        self.assertEqual(self.client.get(f"{self.url}?token={token}").status_code, status.HTTP_200_OK)
+        forged = media.token(self.student_user.pk, "submissions/x.bin")
+        self.assertEqual(self.client.get(f"{self.url}?token={forged}").status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_expired_token_is_forbidden(self):
+        token = media.token(self.student_user.pk, self.submission.file.name)
+        with override_settings(MEDIA_TOKEN_MAX_AGE=-1):
+            response = self.client.get(f"{self.url}?token={token}")
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(response.data, {"error": "Link do pliku wygasł"})
+
+    def test_serialized_file_url_is_openable(self):
+        self.client.force_authenticate(user=self.student_user)
+        url = self.client.get(f"/api/submissions/{self.submission.id}/").data["file"]
+        self.client.force_authenticate(user=None)
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_200_OK)
+
+    def test_range_requests(self):
+        response = self._get(self.student_user, HTTP_RANGE="bytes=10-19")
+        self.assertEqual(response.status_code, status.HTTP_206_PARTIAL_CONTENT)
+        self.assertEqual(b"".join(response.streaming_content), CONTENT[10:20])
+        self.assertEqual(response["Content-Range"], f"bytes 10-19/{len(CONTENT)}")
+
+        response = self._get(self.student_user, HTTP_RANGE="bytes=-5")
+        self.assertEqual(b"".join(response.streaming_content), CONTENT[-5:])
+
+        response = self._get(self.student_user, HTTP_RANGE=f"bytes={len(CONTENT)}-")
+        self.assertEqual(response.status_code, status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE)
+
+    def test_conditional_requests(self):
+        first = self._get(self.student_user)
+        response = self._get(self.student_user, HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        response = self._get(self.student_user, HTTP_IF_MODIFIED_SINCE=first["Last-Modified"])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        response = self._get(self.student_user, HTTP_RANGE="bytes=0-1", HTTP_IF_RANGE='"stale"')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    @override_settings(MEDIA_SENDFILE="x-accel-redirect")
+    def test_hands_off_to_proxy(self):
+        response = self._get(self.student_user)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["X-Accel-Redirect"], f"/protected-media/{self.submission.file.name}")
+        self.assertEqual(response.content, b"")
+
+    def test_task_file_for_assigned_students(self):
+        self.task.file.save("task.bin", ContentFile(b"task"))
+        url = f"/media/{self.task.file.name}"
+        self.assertEqual(self._get(self.student_user, url).status_code, status.HTTP_200_OK)
+        self.assertEqual(self._get(self.other_user, url).status_code, status.HTTP_403_FORBIDDEN)
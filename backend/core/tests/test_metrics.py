@@ -0,0 +1,96 @@
+import os
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+import django
+django.setup()
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.http import HttpResponse
+from django.test import AsyncRequestFactory, TransactionTestCase, override_settings
+from rest_framework_simplejwt.tokens import AccessToken
+from rest_framework.test import APITestCase
+from rest_framework import status
+from django.contrib.auth import get_user_model
+from core import metrics
+from core.models import StudentProfile
+
+
+@override_settings(METRICS_ALLOWED_IPS=["127.0.0.1"])
+class MetricsTests(APITestCase):
+    def setUp(self):
+        for metric in metrics.REGISTRY:
+            metric.values.clear()
+        self.user = get_user_model().objects.create_user(username="student", role="student")
+        StudentProfile.objects.create(user=self.user)
+        self.client.force_authenticate(user=self.user)
+
+    def _scrape(self):
+        response = self.client.get("/metrics")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response["Content-Type"].startswith("text/plain; version=0.0.4"))
+        return response.content.decode()
+
+    def test_requests_are_recorded_per_route_template(self):
+        self.client.get("/api/users/1/")
+        self.client.get(f"/api/users/{self.user.id}/")
+        self.client.get("/api/my-tasks/")
+        self.client.get("/no/such/page/")
+        body = self._scrape()
+
+        user_route = next(label for label, _ in metrics.LATENCY.values if "users" in label)
+        self.assertNotIn(str(self.user.id), user_route)
+        self.assertIn(f'http_request_duration_seconds_count{{route="{user_route}",method="GET"}} 2', body)
+        self.assertIn('http_requests_total{route="api/my-tasks/",method="GET",status="200"} 1', body)
+        self.assertIn('http_requests_total{route="<unmatched>",method="GET",status="404"} 1', body)
+        self.assertIn('http_request_db_queries_bucket{route="api/my-tasks/",method="GET",le="+Inf"} 1', body)
+        self.assertIn('http_response_size_bytes_count{route="api/my-tasks/",method="GET"} 1', body)
+
+    def test_query_count_is_measured(self):
+        self.client.get("/api/my-tasks/")
+        (counts, total), = [v for k, v in metrics.DB_QUERIES.values.items() if k[0] == "api/my-tasks/"]
+        self.assertGreater(total, 0)
+
+    async def test_queries_are_measured_under_asgi(self):
+        self.assertTrue(iscoroutinefunction(metrics.MetricsMiddleware(self._async_view)))
+        response = await self.async_client.get(
+            "/api/my-tasks/", headers={"Authorization": f"Bearer {AccessToken.for_user(self.user)}"}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        (counts, total), = [v for k, v in metrics.DB_QUERIES.values.items() if k[0] == "api/my-tasks/"]
+        self.assertEqual(sum(counts), 1)
+        self.assertGreater(total, 0)
+
+    @staticmethod
+    async def _async_view(request):
+        pass
+
+    @override_settings(METRICS_TOKEN="sekret", METRICS_ALLOWED_IPS=[])
+    def test_token_protects_endpoint(self):
+        self.assertEqual(self.client.get("/metrics").status_code, status.HTTP_403_FORBIDDEN)
+        response = self.client.get("/metrics", HTTP_AUTHORIZATION="Bearer sekret")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    @override_settings(METRICS_TOKEN="", METRICS_ALLOWED_IPS=[])
+    def test_closed_without_configuration(self):
+        self.assertEqual(self.client.get("/metrics").status_code, status.HTTP_403_FORBIDDEN)
+        response = self.client.get("/metrics", HTTP_AUTHORIZATION="Bearer ")
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        response = self.client.get("/metrics", REMOTE_ADDR="10.0.0.5")
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class AsyncMetricsTests(TransactionTestCase):
+    def setUp(self):
+        for metric in metrics.REGISTRY:
+            metric.values.clear()
+
+    async def test_queries_in_other_threads_count_for_the_request(self):
+        async def view(request):
+            # one query in a fresh worker thread, one on the thread-sensitive executor
+            await sync_to_async(lambda: list(StudentProfile.objects.all()), thread_sensitive=False)()
+            await StudentProfile.objects.acount()
+            return HttpResponse()
+
+        request = AsyncRequestFactory().get("/no/such/page/")
+        await metrics.MetricsMiddleware(view)(request)
+        (counts, total), = metrics.DB_QUERIES.values.values()
+        self.assertEqual(total, 2)
@@ -0,0 +1,79 @@
+import os
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+import django
+django.setup()
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+from rest_framework import status
+from django.contrib.auth import get_user_model
+from core.models import (
+    StudentProfile,
+    TeacherProfile,
+    Task,
+    Submission,
+)
+
+
+class MyTasksQueryCountTests(APITestCase):
+    def setUp(self):
+        User = get_user_model()
+        self.user = User.objects.create_user(username="student", password="pass", role="student")
+        self.student_profile = StudentProfile.objects.create(user=self.user)
+        teacher_user = User.objects.create_user(username="teacher", password="pass", role="teacher")
+        self.teacher_profile = TeacherProfile.objects.create(user=teacher_user, subject="Math")
+        self.client.force_authenticate(user=self.user)
+
+    def _add_tasks(self, count, submitted):
+        for i in range(count):
+            task = Task.objects.create(name=f"T{i}", description="d", created_by=self.teacher_profile)
+            task.assigned_students.add(self.student_profile)
+            if submitted:
+                Submission.objects.create(task=task, student=self.student_profile, file="f.txt")
+
+    def _count_queries(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get("/api/my-tasks/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return len(ctx.captured_queries), response
+
+    def test_my_tasks_runs_constant_number_of_queries(self):
+        self._add_tasks(2, submitted=True)
+        small, _ = self._count_queries()
+
+        self._add_tasks(20, submitted=True)
+        self._add_tasks(5, submitted=False)
+        large, response = self._count_queries()
+
+        self.assertEqual(len(response.data), 27)
+        self.assertEqual(small, large)
+
+    def test_my_tasks_reports_submission_per_task(self):
+        self._add_tasks(1, submitted=False)
+        self._add_tasks(1, submitted=True)
+        _, response = self._count_queries()
+
+        submitted, pending = response.data
+        submission = Submission.objects.get(student=self.student_profile)
+        self.assertTrue(submitted["status"])
+        self.assertEqual(submitted["submission_id"], submission.id)
+        self.assertEqual(submitted["submission"]["task"], submitted["id"])
+        self.assertFalse(pending["status"])
+        self.assertIsNone(pending["submission_id"])
+        self.assertIsNone(pending["submission"])
+
+    def test_task_list_runs_constant_number_of_queries(self):
+        def count():
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.get("/api/tasks/")
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            return len(ctx.captured_queries), response
+
+        self._add_tasks(2, submitted=True)
+        small, _ = count()
+        self._add_tasks(10, submitted=True)
+        large, response = count()
+
+        self.assertEqual(small, large)
+        self.assertTrue(all(task["status"] for task in response.data["results"]))
@@ -0,0 +1,65 @@
+import os
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+import django
+django.setup()
+
+from datetime import timedelta
+
+from django.utils import timezone
+from rest_framework.test import APITestCase
+from rest_framework import status
+from django.contrib.auth import get_user_model
+from core.models import (
+    StudentProfile,
+    TeacherProfile,
+    ClassGroup,
+    Task,
+)
+
+
+class KeysetPaginationTests(APITestCase):
+    def setUp(self):
+        User = get_user_model()
+        teacher_user = User.objects.create_user(username="teacher", role="teacher")
+        self.teacher = TeacherProfile.objects.create(user=teacher_user, subject="Math")
+        self.client.force_authenticate(user=teacher_user)
+        now = timezone.now()
+        tasks = [Task.objects.create(name=f"T{i}", description="d", created_by=self.teacher) for i in range(7)]
+        # several tasks share created_at to exercise the id tie-breaker
+        for i, task in enumerate(tasks):
+            Task.objects.filter(pk=task.pk).update(created_at=now - timedelta(seconds=i // 3))
+
+    def _walk(self, url):
+        ids, pages = [], 0
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            ids += [t["id"] for t in response.data["results"]]
+            url = response.data["next"]
+            pages += 1
+        return ids, pages
+
+    def test_walks_all_rows_once_in_stable_order(self):
+        ids, pages = self._walk("/api/tasks/?page_size=2")
+        expected = list(Task.objects.order_by("-created_at", "-id").values_list("id", flat=True))
+        self.assertEqual(ids, expected)
+        self.assertEqual(pages, 4)
+
+    def test_default_page_size_and_cap(self):
+        response = self.client.get("/api/tasks/?page_size=100000")
+        self.assertEqual(len(response.data["results"]), 7)
+        self.assertIsNone(response.data["next"])
+
+    def test_invalid_cursor(self):
+        response = self.client.get("/api/tasks/?cursor=bm90LWpzb24")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_related_field_ordering(self):
+        User = get_user_model()
+        group = ClassGroup.objects.create(name="G", teacher=self.teacher)
+        for name in ["Cecylia", "Adam", "Bartek", "Adam"]:
+            user = User.objects.create_user(username=f"{name}{User.objects.count()}", first_name=name, role="student")
+            StudentProfile.objects.create(user=user, group=group)
+        ids, _ = self._walk("/api/teacher/my-students/?page_size=1")
+        names = [StudentProfile.objects.get(id=i).user.first_name for i in ids]
+        self.assertEqual(names, ["Adam", "Adam", "Bartek", "Cecylia"])
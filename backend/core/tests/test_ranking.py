@@ -0,0 +1,110 @@
+import os
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+import django
+django.setup()
+
+from unittest import mock
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth import get_user_model
+from rest_framework.test import APITestCase
+from core.models import (
+    StudentProfile,
+    TeacherProfile,
+    Task,
+    Submission,
+    Ranking,
+)
+from core.views import SubmissionViewSet
+
+
+class RankingDeltaTests(TestCase):
+    def setUp(self):
+        User = get_user_model()
+        user = User.objects.create_user(username="student", password="pass", role="student")
+        self.student = StudentProfile.objects.create(user=user)
+        teacher_user = User.objects.create_user(username="teacher", password="pass", role="teacher")
+        teacher = TeacherProfile.objects.create(user=teacher_user, subject="Math")
+        self.task = Task.objects.create(name="T1", description="d", created_by=teacher)
+        self.task2 = Task.objects.create(name="T2", description="d", created_by=teacher)
+
+    def _points(self):
+        self.student.refresh_from_db()
+        return Ranking.objects.get(student=self.student).points, self.student.points
+
+    def test_ranking_created_with_student(self):
+        self.assertEqual(self._points(), (0, 0))
+
+    def test_grade_changes_apply_delta(self):
+        submission = Submission.objects.create(task=self.task, student=self.student, grade=4)
+        Submission.objects.create(task=self.task2, student=self.student, grade=5)
+        self.assertEqual(self._points(), (9, 9))
+
+        submission = Submission.objects.get(pk=submission.pk)
+        submission.grade = 2
+        submission.save()
+        self.assertEqual(self._points(), (7, 7))
+
+        submission.grade = None
+        submission.save()
+        self.assertEqual(self._points(), (5, 5))
+
+    def test_save_without_grade_change_skips_ranking(self):
+        submission = Submission.objects.create(task=self.task, student=self.student, grade=3)
+        submission = Submission.objects.get(pk=submission.pk)
+        submission.status = "approved"
+        with CaptureQueriesContext(connection) as ctx:
+            submission.save()
+        self.assertEqual(len(ctx.captured_queries), 1)
+        self.assertEqual(self._points(), (3, 3))
+
+    def test_delete_subtracts_grade(self):
+        submission = Submission.objects.create(task=self.task, student=self.student, grade=6)
+        Submission.objects.create(task=self.task2, student=self.student, grade=1)
+        submission.delete()
+        self.assertEqual(self._points(), (1, 1))
+
+    def test_missing_ranking_is_rebuilt_from_submissions(self):
+        Submission.objects.create(task=self.task, student=self.student, grade=2)
+        Ranking.objects.filter(student=self.student).delete()
+        Submission.objects.create(task=self.task2, student=self.student, grade=3)
+        self.assertEqual(self._points(), (5, 5))
+
+    def test_apply_deltas_updates_many_students(self):
+        other = StudentProfile.objects.create(user=get_user_model().objects.create_user(username="other"))
+        Submission.objects.bulk_create([
+            Submission(task=self.task, student=self.student, grade=4),
+            Submission(task=self.task, student=other, grade=2),
+        ])
+        Ranking.objects.filter(student=other).delete()
+        Ranking.apply_deltas({self.student.id: 4, other.id: 2})
+        self.assertEqual(self._points(), (4, 4))
+        self.assertEqual(Ranking.objects.get(student=other).points, 2)
+
+
+class ConcurrentGradingTests(APITestCase):
+    def setUp(self):
+        User = get_user_model()
+        self.student = StudentProfile.objects.create(user=User.objects.create_user(username="student", role="student"))
+        self.teacher_user = User.objects.create_user(username="teacher", role="teacher")
+        teacher = TeacherProfile.objects.create(user=self.teacher_user, subject="Math")
+        task = Task.objects.create(name="T1", description="d", created_by=teacher)
+        other = Task.objects.create(name="T2", description="d", created_by=teacher)
+        self.submission = Submission.objects.create(task=task, student=self.student, grade=2)
+        Submission.objects.create(task=other, student=self.student, grade=1)
+        self.client.force_authenticate(self.teacher_user)
+
+    def test_gradings_from_stale_instances_keep_points_consistent(self):
+        # both requests looked the submission up before either saved
+        stale = [Submission.objects.get(pk=self.submission.pk) for _ in range(2)]
+        with mock.patch.object(SubmissionViewSet, "get_object", side_effect=stale):
+            for grade in (5, 6):
+                response = self.client.patch(f"/api/submissions/{self.submission.pk}/set_grade/", {"grade": grade})
+                self.assertEqual(response.status_code, 200)
+
+        self.student.refresh_from_db()
+        total = sum(Submission.objects.filter(student=self.student).values_list("grade", flat=True))
+        self.assertEqual(total, 7)
+        self.assertEqual((Ranking.objects.get(student=self.student).points, self.student.points), (total, total))
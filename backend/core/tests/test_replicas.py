@@ -0,0 +1,146 @@
+import os
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+import django
+django.setup()
+
+from unittest import mock, skipUnless
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import OperationalError, connections
+from django.test import SimpleTestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient, APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
+
+from core import replicas
+from core.models import ClassGroup, Ranking, StudentProfile, Submission, Task, TeacherProfile
+
+
+@override_settings(REPLICA_DATABASES=["replica1", "replica2"], REPLICA_HEALTH_INTERVAL=10)
+class ReplicaRouterTests(SimpleTestCase):
+    def setUp(self):
+        replicas._health.clear()
+        self.router = replicas.ReplicaRouter()
+
+    def test_reads_use_replicas_only_when_asked(self):
+        with mock.patch.object(replicas, "healthy", return_value=True):
+            self.assertEqual(self.router.db_for_read(Ranking), "default")
+            with replicas.reads():
+                self.assertIn(self.router.db_for_read(Ranking), {"replica1", "replica2"})
+                self.assertEqual(self.router.db_for_write(Ranking), "default")
+                with replicas.primary():
+                    self.assertEqual(self.router.db_for_read(Ranking), "default")
+            self.assertEqual(self.router.db_for_read(Ranking), "default")
+
+    def test_unhealthy_replicas_fall_back_to_primary(self):
+        with mock.patch.object(replicas, "healthy", side_effect=lambda alias: alias == "replica2"):
+            with replicas.reads():
+                self.assertEqual({self.router.db_for_read(Ranking) for _ in range(10)}, {"replica2"})
+        with mock.patch.object(replicas, "healthy", return_value=False):
+            with replicas.reads():
+                self.assertEqual(self.router.db_for_read(Ranking), "default")
+
+    def test_health_is_checked_once_per_interval(self):
+        broken = mock.Mock(connection=None)
+        broken.ensure_connection.side_effect = OperationalError("down")
+        with mock.patch.object(replicas, "connections", {"replica1": broken}), self.assertLogs("core.replicas"):
+            self.assertFalse(replicas.healthy("replica1"))
+            self.assertFalse(replicas.healthy("replica1"))
+        self.assertEqual(broken.ensure_connection.call_count, 1)
+
+    def test_replicas_are_not_migrated(self):
+        self.assertFalse(self.router.allow_migrate("replica1", "core"))
+        self.assertTrue(self.router.allow_migrate("default", "core"))
+
+
+@override_settings(REPLICA_DATABASES=["replica1"], REPLICA_STICKY_SECONDS=5, LEADERBOARD_CACHE=False)
+class ReplicaViewsTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        User = get_user_model()
+        teacher = TeacherProfile.objects.create(
+            user=User.objects.create_user(username="teacher", role="teacher"), subject="Math"
+        )
+        self.group = ClassGroup.objects.create(name="G1", teacher=teacher)
+        self.user = User.objects.create_user(username="student", role="student")
+        student = StudentProfile.objects.create(user=self.user, group=self.group)
+        task = Task.objects.create(name="T", description="d", created_by=teacher)
+        task.assigned_students.add(student)
+        self.submission = Submission.objects.create(task=task, student=student)
+        self.client.force_authenticate(self.user)
+        # there is no second database here; count the replica reads and serve them from "default"
+        patcher = mock.patch.object(replicas, "choose", return_value="default")
+        self.choose = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_read_only_endpoints_read_from_replica(self):
+        for url in ("/api/top-ranking/", f"/api/ranking/group/{self.group.id}/", "/api/my-tasks/", "/api/rankings/"):
+            self.choose.reset_mock()
+            self.assertEqual(self.client.get(url).status_code, 200, url)
+            self.assertTrue(self.choose.called, url)
+
+    def test_other_endpoints_read_from_primary(self):
+        self.assertEqual(self.client.get(f"/api/submissions/{self.submission.id}/comments/").status_code, 200)
+        self.assertFalse(self.choose.called)
+
+    def test_writer_is_pinned_to_primary(self):
+        response = self.client.post(f"/api/submissions/{self.submission.id}/add_comment/", {"text": "Hej"})
+        self.assertEqual(response.status_code, 201)
+        self.choose.reset_mock()
+
+        self.assertEqual(self.client.get("/api/top-ranking/").status_code, 200)
+        self.assertFalse(self.choose.called)
+
+        cache.delete(replicas._pin_key(self.user.pk))
+        self.client.get("/api/top-ranking/")
+        self.assertTrue(self.choose.called)
+
+    async def test_writer_is_pinned_under_asgi(self):
+        self.assertTrue(iscoroutinefunction(replicas.ReplicaPinMiddleware(self._async_view)))
+        token = await sync_to_async(AccessToken.for_user)(self.user)
+        response = await self.async_client.post(
+            f"/api/submissions/{self.submission.id}/add_comment/",
+            {"text": "Hej"},
+            content_type="application/json",
+            headers={"Authorization": f"Bearer {token}"},
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertFalse(await replicas.aallowed(self.user))
+
+    @staticmethod
+    async def _async_view(request):
+        pass
+
+    def test_failed_writes_do_not_pin(self):
+        response = self.client.post(f"/api/submissions/{self.submission.id}/add_comment/", {"text": ""})
+        self.assertEqual(response.status_code, 400)
+        self.assertTrue(replicas.allowed(self.user))
+
+
+@skipUnless(settings.REPLICA_DATABASES, "set DATABASE_REPLICA_HOSTS to run against a replica alias")
+@override_settings(LEADERBOARD_CACHE=False)
+class ReplicaDatabaseTests(TransactionTestCase):
+    """Runs against a real second alias, e.g. ``DATABASE_REPLICA_HOSTS=db manage.py test core.tests.test_replicas``."""
+
+    databases = "__all__"
+
+    def test_reads_and_pinning(self):
+        cache.clear()
+        replicas._health.clear()
+        user = get_user_model().objects.create_user(username="student", role="student")
+        StudentProfile.objects.create(user=user)
+        client = APIClient()
+        client.force_authenticate(user)
+        replica = connections[settings.REPLICA_DATABASES[0]]
+
+        with CaptureQueriesContext(replica) as queries:
+            self.assertEqual(client.get("/api/top-ranking/").status_code, 200)
+        self.assertTrue(queries)
+
+        replicas.pin(user)
+        with CaptureQueriesContext(replica) as queries:
+            self.assertEqual(client.get("/api/top-ranking/").status_code, 200)
+        self.assertFalse(queries)
@@ -0,0 +1,111 @@
+import os
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+import django
+django.setup()
+
+from django.contrib.auth import get_user_model
+from rest_framework.test import APITestCase
+
+from core.models import (
+    ClassGroup,
+    Comment,
+    ParentChildRelation,
+    ParentProfile,
+    StudentProfile,
+    Submission,
+    Task,
+    TeacherProfile,
+)
+
+
+class SearchTests(APITestCase):
+    url = "/api/search/"
+
+    def setUp(self):
+        User = get_user_model()
+        self.teacher_user = User.objects.create_user(username="teacher", role="teacher")
+        self.teacher = TeacherProfile.objects.create(user=self.teacher_user, subject="Biologia")
+        other_teacher = TeacherProfile.objects.create(
+            user=User.objects.create_user(username="other", role="teacher"), subject="Chemia"
+        )
+        group = ClassGroup.objects.create(name="G", teacher=self.teacher)
+        self.student_user = User.objects.create_user(username="ola", first_name="Ola", role="student")
+        self.student = StudentProfile.objects.create(user=self.student_user, group=group)
+        classmate = StudentProfile.objects.create(user=User.objects.create_user(username="jan", role="student"))
+        self.parent_user = User.objects.create_user(username="mama", role="parent")
+        ParentChildRelation.objects.create(
+            parent=ParentProfile.objects.create(user=self.parent_user), child=self.student
+        )
+
+        self.task = Task.objects.create(
+            name="Fotosynteza", description="Opisz, jak fotosyntezę prowadzą <b>rośliny</b>", created_by=self.teacher
+        )
+        self.task.assign_students([self.student, classmate])
+        Task.objects.create(name="Fotosynteza w chemii", description="Reakcje", created_by=other_teacher)
+        Submission.upsert(self.student, self.task, comment="Moja praca: rośliny i fotosynteza")
+        self.submission = Submission.objects.get(student=self.student, task=self.task)
+        Comment.objects.create(
+            submission=self.submission, author=self.teacher_user, text="Dobrze opisane rośliny", role="teacher"
+        )
+        Submission.upsert(classmate, self.task, comment="Rośliny zielone")
+
+    def _search(self, user, **params):
+        self.client.force_authenticate(user)
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def _found(self, data):
+        return {(result["type"], result["id"]) for result in data["results"]}
+
+    def test_results_are_scoped_to_the_caller(self):
+        data = self._search(self.teacher_user, q="fotosynteza")
+        # the other teacher's task is left out
+        self.assertEqual(self._found(data), {("task", self.task.id), ("submission", self.submission.id)})
+
+        classmate_submission = Submission.objects.exclude(student=self.student).get().id
+        self.assertIn(("submission", classmate_submission), self._found(self._search(self.teacher_user, q="rośliny")))
+        for user in (self.student_user, self.parent_user):
+            found = self._found(self._search(user, q="rośliny"))
+            self.assertEqual(
+                found,
+                {("task", self.task.id), ("submission", self.submission.id), ("comment", Comment.objects.get().id)},
+            )
+
+    def test_ranking_highlights_and_types(self):
+        results = self._search(self.teacher_user, q="rośliny", type="task,comment")["results"]
+        self.assertEqual({r["type"] for r in results}, {"task", "comment"})
+        self.assertEqual(results, sorted(results, key=lambda r: r["rank"], reverse=True))
+        task = next(r for r in results if r["type"] == "task")
+        self.assertIn("&lt;b&gt;<mark>rośliny</mark>&lt;/b&gt;", task["highlights"]["description"])
+        comment = next(r for r in results if r["type"] == "comment")
+        self.assertEqual(comment["highlights"]["text"], "Dobrze opisane <mark>rośliny</mark>")
+        self.assertEqual(comment["task"]["name"], "Fotosynteza")
+
+    def test_index_follows_updates_and_deletes(self):
+        self.submission.feedback = "Brakuje wniosków"
+        self.submission.save()
+        found = self._found(self._search(self.student_user, q="wniosków"))
+        self.assertEqual(found, {("submission", self.submission.id)})
+
+        self.task.name = "Oddychanie"
+        self.task.save()
+        self.assertEqual(self._search(self.teacher_user, q="Fotosynteza", type="task")["results"], [])
+        Comment.objects.all().delete()
+        self.assertEqual(self._search(self.student_user, q="opisane")["results"], [])
+
+    def test_pagination(self):
+        for i in range(5):
+            Task.objects.create(name=f"Mitoza {i}", description="d", created_by=self.teacher)
+        first = self._search(self.teacher_user, q="mitoza", page_size=3)
+        self.assertEqual(len(first["results"]), 3)
+        second = self._search(self.teacher_user, q="mitoza", page_size=3, page=2)
+        self.assertIsNone(second["next"])
+        self.assertEqual(len(self._found(first) | self._found(second)), 5)
+
+    def test_invalid_queries(self):
+        self.client.force_authenticate(self.teacher_user)
+        self.assertEqual(self.client.get(self.url, {"q": " ?! "}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {"q": "a", "type": "user"}).status_code, 400)
+        # FTS5 operators are searched for as plain words
+        self.assertEqual(self.client.get(self.url, {"q": 'NOT "fotosynteza* OR'}).status_code, 200)
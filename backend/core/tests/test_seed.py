@@ -0,0 +1,94 @@
+import os
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+import django
+django.setup()
+
+import datetime
+import json
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db.models import Sum
+from django.test import TestCase
+from django.utils import timezone
+
+from core.models import (
+    Comment, ParentChildRelation, Ranking, StudentProfile, Submission, Task, UploadSession, User,
+)
+
+
+class SeedWorldTests(TestCase):
+    def seed(self, **options):
+        options = {
+            "schools": 1,
+            "groups_per_school": 2,
+            "teachers_per_school": 1,
+            "students_per_group": 3,
+            "tasks_per_group": 2,
+            "no_files": True,
+            "stdout": StringIO(),
+            **options,
+        }
+        call_command("seed_world", **options)
+
+    def test_creates_consistent_world(self):
+        self.seed()
+
+        self.assertEqual(StudentProfile.objects.count(), 6)
+        self.assertEqual(ParentChildRelation.objects.count(), 6)
+        self.assertEqual(Task.objects.count(), 4)
+        self.assertEqual(Submission.objects.count(), 12)
+        self.assertEqual(Task.assigned_students.through.objects.count(), 12)
+        self.assertFalse(Comment.objects.filter(submission__status="pending").exists())
+        for student in StudentProfile.objects.all():
+            graded = Submission.objects.filter(student=student, status="approved").aggregate(s=Sum("grade"))["s"]
+            self.assertEqual(student.points, graded or 0)
+            self.assertEqual(Ranking.objects.get(student=student).points, graded or 0)
+
+    def test_dates(self):
+        started = timezone.now()
+        self.seed(submission_rate=1)
+        for deadline in Task.objects.values_list("deadline", flat=True):
+            self.assertIs(type(deadline), datetime.date)
+        self.assertFalse(Submission.objects.filter(submitted_at__gt=timezone.now()).exists())
+        self.assertTrue(Submission.objects.filter(submitted_at__lte=started).exists())
+
+    def test_refuses_used_prefix(self):
+        self.seed()
+        with self.assertRaises(CommandError):
+            self.seed()
+        self.seed(prefix="other")
+        self.assertEqual(User.objects.filter(username__startswith="other_s").count(), 6)
+
+
+class BenchmarkEndpointsTests(TestCase):
+    def test_baseline_roundtrip(self):
+        call_command(
+            "seed_world", groups_per_school=1, teachers_per_school=1, students_per_group=3,
+            tasks_per_group=2, submission_rate=1, no_files=True, stdout=StringIO(),
+        )
+        before = list(Submission.objects.order_by("id").values_list("grade", "status"))
+        with tempfile.NamedTemporaryFile("w+", suffix=".json") as f:
+            options = {"requests": 2, "warmup": 1, "stdout": StringIO()}
+            call_command("benchmark_endpoints", save_baseline=f.name, **options)
+            baseline = json.load(f)
+            self.assertIn("gradebook", baseline)
+            self.assertIn("parent_dashboard", baseline)
+            self.assertGreater(baseline["set_grades"]["queries"], 0)
+            self.assertGreater(baseline["upload_chunk"]["queries"], 0)
+            # writes are rolled back
+            self.assertFalse(Comment.objects.filter(text="Benchmark").exists())
+            self.assertEqual(list(Submission.objects.order_by("id").values_list("grade", "status")), before)
+            self.assertFalse(UploadSession.objects.exists())
+            self.assertGreater(baseline["my_tasks"]["queries"], 0)
+
+            call_command("benchmark_endpoints", baseline=f.name, min_slowdown_ms=1000, **options)
+
+            f.seek(0)
+            f.truncate()
+            json.dump({name: {**result, "queries": 0} for name, result in baseline.items()}, f)
+            f.flush()
+            with self.assertRaisesMessage(CommandError, "queries (baseline 0)"):
+                call_command("benchmark_endpoints", baseline=f.name, **options)
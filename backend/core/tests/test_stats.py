@@ -0,0 +1,114 @@
+import os
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+import django
+django.setup()
+
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.forms.models import model_to_dict
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from core import stats
+from core.models import ClassGroup, GradeStats, StudentProfile, Submission, Task, TeacherProfile
+
+
+class GradeStatsTests(APITestCase):
+    def setUp(self):
+        self.User = get_user_model()
+        self.teacher_user = self.User.objects.create_user(username="teacher", role="teacher")
+        self.teacher = TeacherProfile.objects.create(user=self.teacher_user, subject="Math")
+        self.group = ClassGroup.objects.create(name="G", teacher=self.teacher)
+        self.other_group = ClassGroup.objects.create(name="H", teacher=self.teacher)
+        self.students = [
+            StudentProfile.objects.create(
+                user=self.User.objects.create_user(username=f"s{i}", role="student"), group=self.group
+            )
+            for i in range(4)
+        ]
+        yesterday = timezone.localdate() - timedelta(days=1)
+        self.task = Task.objects.create(name="T", description="d", created_by=self.teacher, deadline=yesterday)
+        self.task.assign_students(self.students)
+        self.client.force_authenticate(self.teacher_user)
+
+    def _submission(self, i):
+        return Submission.objects.get(student=self.students[i], task=self.task)
+
+    def _rows(self):
+        return {
+            (row.task_id, row.group_id): model_to_dict(row, exclude=["id"])
+            for row in GradeStats.objects.all()
+        }
+
+    def assertMatchesRebuild(self):
+        incremental = self._rows()
+        stats.rebuild()
+        rebuilt = self._rows()
+        self.assertEqual(incremental, {scope: rebuilt[scope] for scope in incremental})
+
+    def test_counters_follow_changes(self):
+        Submission.upsert(self.students[0], self.task)
+        late = self._submission(1)
+        late.status, late.submitted_at = "submitted", timezone.now() - timedelta(days=3)
+        late.save()
+        late.grade = 5
+        late.save()
+        self.client.post(
+            "/api/submissions/set_grades/",
+            {"grades": [{"submission_id": self._submission(0).id, "grade": 3, "status": "approved"}]},
+            format="json",
+        )
+        self._submission(3).delete()
+
+        task_stats = stats.summary(GradeStats.objects.get(task=self.task))
+        self.assertEqual((task_stats["assigned"], task_stats["submitted"], task_stats["on_time"]), (3, 2, 1))
+        self.assertEqual(task_stats["average_grade"], 4)
+        self.assertEqual(task_stats["histogram"], [0, 0, 0, 1, 0, 1, 0])
+        self.assertMatchesRebuild()
+
+    def test_deadline_and_group_changes_rebuild(self):
+        Submission.upsert(self.students[0], self.task)
+        self.assertEqual(GradeStats.objects.get(task=self.task).on_time, 0)
+
+        self.task.deadline = timezone.localdate() + timedelta(days=1)
+        self.task.save()
+        self.assertEqual(GradeStats.objects.get(task=self.task).on_time, 1)
+
+        student = StudentProfile.objects.get(pk=self.students[0].pk)
+        student.group = self.other_group
+        student.save()
+        self.assertEqual(GradeStats.objects.get(group=self.group).submitted, 0)
+        self.assertEqual(GradeStats.objects.get(group=self.other_group).submitted, 1)
+        self.assertMatchesRebuild()
+
+    def test_deleting_task_or_group(self):
+        self.task.delete()
+        self.assertEqual(GradeStats.objects.get(group=self.group).assigned, 0)
+        self.group.delete()
+        self.assertFalse(GradeStats.objects.exists())
+
+    def test_api(self):
+        GradeStats.objects.all().delete()
+        response = self.client.get(f"/api/teacher/tasks/{self.task.id}/stats/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["assigned"], 4)
+        self.assertIsNone(response.data["average_grade"])
+        self.assertEqual(response.data["submission_rate"], 0)
+
+        response = self.client.get(f"/api/teacher/groups/{self.group.id}/stats/")
+        self.assertEqual(response.data["group"]["name"], "G")
+
+        other = TeacherProfile.objects.create(
+            user=self.User.objects.create_user(username="other", role="teacher"), subject="Art"
+        )
+        self.client.force_authenticate(other.user)
+        self.assertEqual(self.client.get(f"/api/teacher/tasks/{self.task.id}/stats/").status_code, 404)
+
+    def test_rebuild_command(self):
+        GradeStats.objects.all().delete()
+        call_command("rebuild_grade_stats", stdout=StringIO())
+        self.assertEqual(GradeStats.objects.count(), 3)
+        self.assertEqual(GradeStats.objects.get(task=self.task).assigned, 4)
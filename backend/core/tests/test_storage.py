@@ -0,0 +1,118 @@
+import os
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+import django
+django.setup()
+
+import hashlib
+import shutil
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from core.models import Task, TeacherProfile
+from core.storage import DeduplicatingStorage
+
+
+class DeduplicatingStorageTests(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.tmp)
+        self.settings_override.enable()
+        self.storage = DeduplicatingStorage()
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def _blobs(self):
+        return list(self.storage.iter_blobs())
+
+    def test_identical_content_is_stored_once(self):
+        a = self.storage.save("submissions/1/a.pdf", ContentFile(b"same"))
+        b = self.storage.save("submissions/2/b.pdf", ContentFile(b"same"))
+        self.storage.save("task_files/c.pdf", ContentFile(b"other"))
+
+        self.assertEqual(len(self._blobs()), 2)
+        self.assertTrue(os.path.samefile(self.storage.path(a), self.storage.path(b)))
+        self.assertEqual(self.storage.refcount(a), 2)
+        self.assertEqual(self.storage.url(a), "/media/submissions/1/a.pdf")
+        with self.storage.open(b) as f:
+            self.assertEqual(f.read(), b"same")
+
+    def test_taken_name_gets_alternative(self):
+        first = self.storage.save("task_files/a.pdf", ContentFile(b"one"))
+        second = self.storage.save("task_files/a.pdf", ContentFile(b"two"))
+
+        self.assertNotEqual(first, second)
+        with self.storage.open(first) as f:
+            self.assertEqual(f.read(), b"one")
+
+    def test_gc_removes_only_unreferenced_blobs(self):
+        a = self.storage.save("a.txt", ContentFile(b"shared"))
+        b = self.storage.save("b.txt", ContentFile(b"shared"))
+        self.storage.delete(a)
+        self.assertEqual(self.storage.collect_garbage(), (0, 0))
+
+        self.storage.delete(b)
+        self.assertEqual(self.storage.collect_garbage(dry_run=True), (1, 6))
+        self.assertEqual(len(self._blobs()), 1)
+        self.assertEqual(self.storage.collect_garbage(), (1, 6))
+        self.assertEqual(self._blobs(), [])
+
+    def test_existing_blob_keeps_its_inode(self):
+        a = self.storage.save("a.txt", ContentFile(b"same"))
+        blob = self.storage.blob_path(hashlib.sha256(b"same").hexdigest())
+        inode = os.stat(blob).st_ino
+        b = self.storage.save("b.txt", ContentFile(b"same"))
+
+        self.assertEqual(os.stat(blob).st_ino, inode)
+        self.assertEqual(self.storage.refcount(a), 2)
+        self.assertTrue(os.path.samefile(self.storage.path(b), blob))
+
+    def test_gc_blobs_drops_files_no_row_refers_to(self):
+        teacher = TeacherProfile.objects.create(
+            user=get_user_model().objects.create_user(username="t", role="teacher"), subject="Math"
+        )
+        task = Task.objects.create(name="T", description="d", created_by=teacher)
+        task.file.save("old.pdf", ContentFile(b"old"))
+        old_name = task.file.name
+        # replacing the file leaves the old name on disk
+        task.file.save("new.pdf", ContentFile(b"new"))
+        shared = Task.objects.create(name="U", description="d", created_by=teacher)
+        shared.file.save("copy.pdf", ContentFile(b"new"))
+        shared.delete()
+        self.assertTrue(self.storage.exists(old_name))
+
+        out = StringIO()
+        call_command("gc_blobs", "--dry-run", "--min-age=0", stdout=out)
+        self.assertIn("Would remove 2 unreferenced files and 1 blobs (3 bytes)", out.getvalue())
+        self.assertTrue(self.storage.exists(old_name))
+
+        call_command("gc_blobs", stdout=StringIO())
+        self.assertTrue(self.storage.exists(old_name), "recent files are kept")
+        call_command("gc_blobs", "--min-age=0", stdout=StringIO())
+        self.assertFalse(self.storage.exists(old_name))
+        self.assertEqual(os.listdir(self.storage.path("task_files")), ["new.pdf"])
+        self.assertEqual(self.storage.refcount(task.file.name), 1)
+        self.assertEqual(len(self._blobs()), 1)
+
+    def test_dedupe_media_converts_existing_tree(self):
+        for name in ("submissions/1/x.pdf", "submissions/2/y.pdf"):
+            os.makedirs(os.path.dirname(os.path.join(self.tmp, name)), exist_ok=True)
+            with open(os.path.join(self.tmp, name), "wb") as f:
+                f.write(b"legacy")
+
+        out = StringIO()
+        call_command("dedupe_media", stdout=out)
+
+        self.assertIn("Saved 6 bytes", out.getvalue())
+        x, y = (os.path.join(self.tmp, "submissions", n) for n in ("1/x.pdf", "2/y.pdf"))
+        self.assertTrue(os.path.samefile(x, y))
+        self.assertEqual(default_storage.refcount("submissions/1/x.pdf"), 2)
+        call_command("gc_blobs", stdout=StringIO())
+        self.assertEqual(len(self._blobs()), 1)
@@ -0,0 +1,89 @@
+import os
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+import django
+django.setup()
+
+import threading
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import IntegrityError, connection, transaction
+from django.test import TransactionTestCase, override_settings
+from rest_framework.test import APITestCase
+from rest_framework import status
+from django.contrib.auth import get_user_model
+from core.models import (
+    StudentProfile,
+    TeacherProfile,
+    Task,
+    Submission,
+)
+
+
+def _make_world(test):
+    User = get_user_model()
+    test.user = User.objects.create_user(username="student", role="student")
+    test.student = StudentProfile.objects.create(user=test.user)
+    teacher_user = User.objects.create_user(username="teacher", role="teacher")
+    teacher = TeacherProfile.objects.create(user=teacher_user, subject="Math")
+    test.task = Task.objects.create(name="T", description="d", created_by=teacher)
+    test.task.assign_students([test.student])
+
+
+@override_settings(MEDIA_ROOT="/tmp/edukacja-test-media")
+class SubmissionUpsertTests(APITestCase):
+    def setUp(self):
+        _make_world(self)
+        self.client.force_authenticate(user=self.user)
+
+    def test_upload_updates_pending_submission(self):
+        upload = SimpleUploadedFile("answer.txt", b"42")
+        response = self.client.post("/api/submit-task/", {"task": self.task.id, "file": upload})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        submission = Submission.objects.get(student=self.student, task=self.task)
+        self.assertEqual(submission.status, "submitted")
+        self.assertTrue(submission.file.name.endswith(".txt"))
+
+    def test_create_then_resubmit(self):
+        Submission.objects.all().delete()
+        response = self.client.post("/api/submissions/", {"task_id": self.task.id}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        response = self.client.post("/api/submissions/", {"task_id": self.task.id}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(Submission.objects.filter(student=self.student, task=self.task).count(), 1)
+
+    def test_constraint_rejects_duplicates(self):
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Submission.objects.create(student=self.student, task=self.task)
+
+
+class SubmissionUpsertConcurrencyTests(TransactionTestCase):
+    workers = 8
+
+    def setUp(self):
+        _make_world(self)
+        Submission.objects.all().delete()
+
+    def test_concurrent_upserts_leave_one_row(self):
+        if connection.vendor == "sqlite" and connection.is_in_memory_db():
+            self.skipTest("in-memory SQLite can't be shared between threads")
+        barrier = threading.Barrier(self.workers)
+        results, errors = [], []
+
+        def submit():
+            try:
+                barrier.wait()
+                results.append(Submission.upsert(self.student, self.task)[1])
+            except Exception as exc:  # pragma: no cover - reported below
+                errors.append(exc)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=submit) for _ in range(self.workers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(Submission.objects.filter(student=self.student, task=self.task).count(), 1)
+        self.assertEqual(results.count(True), 1)
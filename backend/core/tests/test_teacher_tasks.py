@@ -0,0 +1,69 @@
+import os
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+import django
+django.setup()
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+from rest_framework import status
+from django.contrib.auth import get_user_model
+from core.models import (
+    StudentProfile,
+    TeacherProfile,
+    ClassGroup,
+    Task,
+    Submission,
+)
+
+
+class TeacherTaskCreateTests(APITestCase):
+    url = "/api/teacher/tasks/create/"
+
+    def setUp(self):
+        self.User = get_user_model()
+        teacher_user = self.User.objects.create_user(username="teacher", password="pass", role="teacher")
+        self.teacher = TeacherProfile.objects.create(user=teacher_user, subject="Math")
+        self.client.force_authenticate(user=teacher_user)
+
+    def _group(self, name, size):
+        group = ClassGroup.objects.create(name=name, teacher=self.teacher)
+        for i in range(size):
+            user = self.User.objects.create_user(username=f"{name}_{i}", password="pass", role="student")
+            StudentProfile.objects.create(user=user, group=group)
+        return group
+
+    def _create(self, data):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post(self.url, data)
+        return response, len(ctx.captured_queries)
+
+    def test_creates_pending_submissions_for_every_student(self):
+        group = self._group("a", 3)
+        response, _ = self._create({"name": "T", "description": "d", "group": group.id})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        task = Task.objects.get(id=response.data["task_id"])
+        self.assertEqual(task.assigned_students.count(), 3)
+        self.assertEqual(Submission.objects.filter(task=task, status="pending").count(), 3)
+        self.assertEqual(len(response.data["students"]), 3)
+
+    def test_assigns_task_to_several_groups(self):
+        a, b = self._group("a", 2), self._group("b", 3)
+        response, _ = self._create({"name": "T", "description": "d", "groups": [a.id, b.id]})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Submission.objects.filter(task_id=response.data["task_id"]).count(), 5)
+
+    def test_query_count_does_not_grow_with_group_size(self):
+        small, large = self._group("small", 2), self._group("large", 25)
+        _, small_queries = self._create({"name": "T", "description": "d", "group": small.id})
+        _, large_queries = self._create({"name": "T", "description": "d", "group": large.id})
+        self.assertEqual(small_queries, large_queries)
+
+    def test_foreign_group_is_rejected(self):
+        other_user = self.User.objects.create_user(username="other", password="pass", role="teacher")
+        other = TeacherProfile.objects.create(user=other_user, subject="Art")
+        mine = self._group("mine", 1)
+        foreign = ClassGroup.objects.create(name="foreign", teacher=other)
+        response, _ = self._create({"name": "T", "description": "d", "groups": [mine.id, foreign.id]})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertFalse(Task.objects.exists())
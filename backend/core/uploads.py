@@ -0,0 +1,242 @@
+"""Resumable, chunked submission uploads.
+
+Protocol (see the ``ChunkedUpload*`` views):
+
+1. ``init``: the client declares task, filename, size and optionally the
+   SHA-256 of the whole file; an ``UploadSession`` is created. A student
+   may have at most ``CHUNKED_UPLOAD_MAX_SESSIONS`` unfinished sessions.
+2. ``append``: raw bytes are sent with ``PUT`` and an ``Upload-Offset``
+   header. ``receive`` streams the body into a temporary file, so a chunk
+   never sits in memory, computing its SHA-256 on the way (checked against
+   an optional ``Upload-Checksum`` header); the first bytes are checked
+   against the allowed file signatures. Only then is the session locked,
+   for the offset check and the local copy onto its part file (``append``).
+   If the connection drops, the bytes that did arrive are kept; ``GET`` on
+   the session returns the offset to resume from.
+3. ``finalize``: once every byte is there, the whole-file hash is checked
+   (``verify``, before any lock), then the session is locked and the file is
+   attached to the student's submission in a single upsert (``finalize``).
+
+A session that gets no chunk for ``CHUNKED_UPLOAD_EXPIRY`` seconds expires.
+``manage.py cleanup_uploads`` deletes expired sessions; deleting a session
+removes its part file (``core.signals``).
+"""
+import hashlib
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Submission, UploadSession
+
+READ_SIZE = 64 * 1024
+
+# (offset, magic bytes, content type) of the file types students may upload
+SIGNATURES = [
+    (0, b"%PDF-", "application/pdf"),
+    (0, b"\x89PNG\r\n\x1a\n", "image/png"),
+    (0, b"\xff\xd8\xff", "image/jpeg"),
+    (0, b"GIF87a", "image/gif"),
+    (0, b"GIF89a", "image/gif"),
+    (0, b"II*\x00", "image/tiff"),
+    (0, b"MM\x00*", "image/tiff"),
+    (0, b"PK\x03\x04", "application/zip"),
+    (0, b"\x1a\x45\xdf\xa3", "video/webm"),
+    (4, b"ftyp", "video/mp4"),
+]
+# enough leading bytes to recognise any of the signatures above
+SNIFF_SIZE = max(offset + len(magic) for offset, magic, _ in SIGNATURES)
+
+
+class UploadError(Exception):
+    """A chunk or session was rejected; ``status`` is the HTTP status to answer with."""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+def sniff(head):
+    """Return the content type recognised from the leading bytes, or None."""
+    for offset, magic, content_type in SIGNATURES:
+        if head[offset:offset + len(magic)] == magic:
+            return content_type
+    return None
+
+
+def part_path(session):
+    return os.path.join(settings.CHUNKED_UPLOAD_DIR, f"{session.id}.part")
+
+
+def remove_part(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def max_size():
+    return settings.CHUNKED_UPLOAD_MAX_SIZE
+
+
+def expires_at(session):
+    return session.updated_at + timedelta(seconds=settings.CHUNKED_UPLOAD_EXPIRY)
+
+
+def _cutoff(now=None):
+    return (now or timezone.now()) - timedelta(seconds=settings.CHUNKED_UPLOAD_EXPIRY)
+
+
+def expired(now=None):
+    """Unfinished sessions that got no chunk for ``CHUNKED_UPLOAD_EXPIRY`` seconds."""
+    return UploadSession.objects.filter(completed_at__isnull=True, updated_at__lt=_cutoff(now))
+
+
+def open_sessions(student):
+    """``student``'s unfinished sessions that haven't expired."""
+    return UploadSession.objects.filter(student=student, completed_at__isnull=True, updated_at__gte=_cutoff())
+
+
+def _check(session, offset):
+    if session.completed_at:
+        raise UploadError("Przesyłanie zostało już zakończone", status=409)
+    if timezone.now() >= expires_at(session):
+        raise UploadError("Sesja przesyłania wygasła", status=410)
+    if offset != session.received:
+        raise UploadError(f"Oczekiwano przesunięcia {session.received}", status=409)
+
+
+class Chunk:
+    """A chunk read into a temporary file (deleted on close) by ``receive``."""
+
+    def __init__(self, file, content_type):
+        self.file = file
+        self.content_type = content_type
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.file.close()
+
+
+def receive(session, stream, offset, checksum=None):
+    """Read one chunk from ``stream`` into a temporary ``Chunk``, without any lock.
+
+    ``session`` is an unlocked copy, used to reject the chunk early; ``append``
+    checks it again under the lock. Raises ``UploadError`` on a bad chunk.
+    """
+    _check(session, offset)
+    os.makedirs(settings.CHUNKED_UPLOAD_DIR, exist_ok=True)
+    chunk = tempfile.TemporaryFile(dir=settings.CHUNKED_UPLOAD_DIR)
+    try:
+        digest = hashlib.sha256()
+        size = 0
+        try:
+            while True:
+                data = stream.read(READ_SIZE) if stream is not None else b""
+                if not data:
+                    break
+                if offset + size + len(data) > session.size:
+                    raise UploadError("Plik jest większy niż zadeklarowano", status=413)
+                chunk.write(data)
+                digest.update(data)
+                size += len(data)
+        except OSError:
+            # connection dropped mid-chunk; keep what arrived so it can be resumed
+            checksum = None
+        if checksum and checksum.lower() != digest.hexdigest():
+            raise UploadError("Suma kontrolna fragmentu się nie zgadza")
+
+        content_type = ""
+        if offset == 0 and size:
+            chunk.seek(0)
+            head = chunk.read(SNIFF_SIZE)
+            if len(head) < SNIFF_SIZE and size < session.size:
+                raise UploadError(f"Pierwszy fragment musi mieć co najmniej {SNIFF_SIZE} B")
+            content_type = sniff(head)
+            if not content_type:
+                raise UploadError("Niedozwolony typ pliku", status=415)
+        chunk.seek(0)
+        return Chunk(chunk, content_type)
+    except BaseException:
+        chunk.close()
+        raise
+
+
+def append(session, chunk, offset):
+    """Copy a received ``chunk`` onto the session's part file.
+
+    ``session`` must be locked (``select_for_update``) by the caller. Saves
+    and returns the new offset; raises ``UploadError`` if the session moved on.
+    """
+    _check(session, offset)
+    path = part_path(session)
+    with open(path, "r+b" if os.path.exists(path) else "wb") as part:
+        part.seek(session.received)
+        part.truncate()
+        shutil.copyfileobj(chunk.file, part, READ_SIZE)
+        session.received = part.tell()
+    if chunk.content_type:
+        session.content_type = chunk.content_type
+    session.save(update_fields=["received", "content_type", "updated_at"])
+    return session.received
+
+
+def verify(session):
+    """Check that every byte of ``session`` arrived and matches the declared hash; return the SHA-256.
+
+    Reads the whole part file, so it runs before the session is locked: once
+    it is complete, no chunk can change it any more.
+    """
+    _check(session, session.received)
+    if session.received != session.size:
+        raise UploadError(f"Brakuje danych: odebrano {session.received} z {session.size} B", status=409)
+
+    digest = hashlib.sha256()
+    with open(part_path(session), "rb") as part:
+        for data in iter(lambda: part.read(READ_SIZE), b""):
+            digest.update(data)
+    if session.sha256 and session.sha256.lower() != digest.hexdigest():
+        raise UploadError("Suma kontrolna pliku się nie zgadza")
+    return digest.hexdigest()
+
+
+def finalize(session, sha256):
+    """Attach the ``verify``-ed file to the submission atomically.
+
+    ``session`` must be locked (``select_for_update``) by the caller. The
+    part file is removed once the transaction commits.
+    """
+    _check(session, session.received)
+    path = part_path(session)
+    with open(path, "rb") as part:
+        submission, _ = Submission.upsert(
+            session.student, session.task, file=File(part, name=session.filename)
+        )
+    session.completed_at = timezone.now()
+    session.sha256 = sha256
+    session.save(update_fields=["completed_at", "sha256"])
+    transaction.on_commit(lambda: remove_part(path))
+    return submission
+
+
+def cleanup(now=None):
+    """Delete expired sessions, and part files no session owns; return ``(sessions, files)`` deleted."""
+    sessions, _ = expired(now).delete()
+    files = 0
+    if os.path.isdir(settings.CHUNKED_UPLOAD_DIR):
+        cutoff = _cutoff(now).timestamp()
+        known = {f"{pk}.part" for pk in UploadSession.objects.values_list("pk", flat=True)}
+        for filename in os.listdir(settings.CHUNKED_UPLOAD_DIR):
+            path = os.path.join(settings.CHUNKED_UPLOAD_DIR, filename)
+            if filename.endswith(".part") and filename not in known and os.path.getmtime(path) < cutoff:
+                os.remove(path)
+                files += 1
+    return sessions, files
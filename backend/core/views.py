@@ -1,3 +1,7 @@
+import itertools
+import json
+import os
+
 from rest_framework import viewsets, generics, status
 from .models import (
     Task,
@@ -10,13 +14,22 @@ from .models import (
     ParentProfile,
     ParentChildRelation,
     ClassGroup,
+    UploadSession,
 )
-from django.db import models
+from django.conf import settings
+from django.core import signing
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models, transaction
+from django.db.models import Count, Max
+from django.http import StreamingHttpResponse
+from django.utils.http import parse_etags, quote_etag
+from rest_framework.utils.urls import replace_query_param
 from .serializers import (
     TaskSerializer,
     SubmissionSerializer,
     CommentSerializer,
     RankingSerializer,
+    RankedRankingSerializer,
     UserSerializer,
     StudentProfileSerializer,
     TeacherProfileSerializer,
@@ -24,41 +37,109 @@ from .serializers import (
     ParentChildRelationSerializer,
     StudentBriefSerializer,
     GroupSerializer,
+    index_submissions_by_task,
 )
+from . import dashboard, events, exports, grading, jobs, leaderboard, media, search, stats, uploads
+from .replicas import ReplicaReadsMixin, replica_reads
+from .pagination import KeysetPagination
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.decorators import api_view, permission_classes, action
 from rest_framework.parsers import MultiPartParser, FormParser
 
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
+@replica_reads
 def my_tasks(request):
     student_profile = getattr(request.user, "studentprofile", None)
     if not student_profile:
         return Response({"error": "Brak profilu ucznia"}, status=403)
 
-    tasks = (
-        Task.objects.filter(assigned_students=student_profile)
+    tasks = list(
+        TaskSerializer.optimize_queryset(Task.objects.filter(assigned_students=student_profile), request)
         .order_by("-created_at")
     )
-    serializer = TaskSerializer(tasks, many=True, context={"request": request})
+    context = {
+        "request": request,
+        "submissions_by_task": index_submissions_by_task(student_profile, tasks),
+    }
+    serializer = TaskSerializer(tasks, many=True, context=context)
     return Response(serializer.data)
-class TaskViewSet(viewsets.ModelViewSet):
+class ExpandableQuerysetMixin:
+    """Apply the select/prefetch_related needed for the requested ``?expand=``."""
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        return self.get_serializer_class().optimize_queryset(queryset, self.request)
+
+
+COMMENT_FEED_STATE = {"count": Count("id"), "last": Max("id"), "updated": Max("updated_at")}
+
+
+def comment_feed_etag(submission_id, state, since):
+    updated = state["updated"].timestamp() if state["updated"] else 0
+    return quote_etag(f"{submission_id}-{state['count']}-{state['last'] or 0}-{updated}-{since}")
+
+
+def etag_matches(request, etag):
+    if_none_match = parse_etags(request.headers.get("If-None-Match", ""))
+    return etag in if_none_match or "*" in if_none_match
+
+
+def comment_feed(request, submission):
+    """Comments of ``submission`` newer than ``?since=<comment id>`` (all by default).
+
+    The ETag is derived from one aggregate over the thread, so a poll whose
+    ``If-None-Match`` still matches is answered with 304 without loading or
+    serializing any comment.
+    """
+    try:
+        since = int(request.query_params.get("since", 0))
+    except ValueError:
+        return Response({"error": "Parametr since musi być liczbą"}, status=400)
+
+    state = submission.comments.aggregate(**COMMENT_FEED_STATE)
+    etag = comment_feed_etag(submission.id, state, since)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+    if etag_matches(request, etag):
+        return Response(status=304, headers=headers)
+
+    comments = (
+        submission.comments.filter(id__gt=since)
+        .select_related("author")
+        .order_by("created_at", "id")
+    )
+    return Response(CommentSerializer(comments, many=True).data, headers=headers)
+
+
+class TaskViewSet(ExpandableQuerysetMixin, viewsets.ModelViewSet):
     queryset = Task.objects.all()
     serializer_class = TaskSerializer
 
-class SubmissionViewSet(viewsets.ModelViewSet):
-    queryset = Submission.objects.all()
+    def get_serializer(self, *args, **kwargs):
+        student = getattr(self.request.user, "studentprofile", None)
+        if student and kwargs.get("many") and args:
+            # a page of tasks: load the student's submissions to all of them at once, as my_tasks does
+            kwargs["context"] = {
+                **self.get_serializer_context(),
+                "submissions_by_task": index_submissions_by_task(student, args[0]),
+            }
+        return super().get_serializer(*args, **kwargs)
+
+class SubmissionViewSet(ExpandableQuerysetMixin, viewsets.ModelViewSet):
+    queryset = Submission.objects.select_related("task")
     serializer_class = SubmissionSerializer
     permission_classes = [IsAuthenticated]
 
     def _has_access(self, user, submission):
-        if hasattr(user, "studentprofile") and submission.student == user.studentprofile:
+        # profiles come preloaded with the user (core.authentication), compare ids only
+        student = getattr(user, "studentprofile", None)
+        if student and submission.student_id == student.id:
             return True
-        if hasattr(user, "teacherprofile") and submission.task.created_by == user.teacherprofile:
-            return True
-        return False
+        teacher = getattr(user, "teacherprofile", None)
+        return bool(teacher) and submission.task.created_by_id == teacher.id
 
     @action(detail=True, methods=["patch"], permission_classes=[IsAuthenticated])
     def set_grade(self, request, pk=None):
@@ -71,19 +152,35 @@ class SubmissionViewSet(viewsets.ModelViewSet):
         if grade is None or not (0 <= int(grade) <= 6):
             return Response({"error": "Ocena musi być liczbą z przedziału 0–6"}, status=400)
 
-        submission.grade = int(grade)
-        submission.save()
+        with transaction.atomic():
+            # the ranking signal applies the change from the grade read here, so
+            # concurrent gradings of the submission must not read the same one
+            submission = Submission.objects.select_for_update().get(pk=submission.pk)
+            submission.grade = int(grade)
+            submission.save()
+            events.grade_set(submission)
 
         return Response({"message": "Ocena została zapisana", "grade": submission.grade}, status=200)
 
+    @action(detail=False, methods=["post"], permission_classes=[IsAuthenticated])
+    def set_grades(self, request):
+        """Grade many submissions at once; see ``core.grading``."""
+        teacher = getattr(request.user, "teacherprofile", None)
+        if not teacher:
+            return Response({"error": "Tylko nauczyciel może oceniać"}, status=403)
+        items = request.data.get("grades") if isinstance(request.data, dict) else request.data
+        if not isinstance(items, list):
+            return Response({"error": "Oczekiwano listy ocen"}, status=400)
+        if len(items) > grading.MAX_ITEMS:
+            return Response({"error": f"Maksymalnie {grading.MAX_ITEMS} ocen naraz"}, status=400)
+        return Response(grading.apply(teacher, items))
+
     @action(detail=True, methods=["get"], permission_classes=[IsAuthenticated])
     def comments(self, request, pk=None):
         submission = self.get_object()
         if not self._has_access(request.user, submission):
             return Response(status=403)
-        comments = submission.comments.order_by("created_at")
-        serializer = CommentSerializer(comments, many=True)
-        return Response(serializer.data)
+        return comment_feed(request, submission)
 
     @action(detail=True, methods=["patch", "post"], permission_classes=[IsAuthenticated])
     def add_comment(self, request, pk=None):
@@ -99,28 +196,17 @@ class SubmissionViewSet(viewsets.ModelViewSet):
             text=text,
             role="teacher" if hasattr(request.user, "teacherprofile") else "student",
         )
-        comments = submission.comments.order_by("created_at")
-        serializer = CommentSerializer(comments, many=True)
-        return Response(serializer.data, status=201)
+        data = CommentSerializer(comment).data
+        events.comment_created(comment, data)
+        return Response(data, status=201)
     
-    def perform_create(self, serializer):
-        serializer.save(student=self.request.user.studentprofile)
-
     def create(self, request, *args, **kwargs):
-        student = request.user.studentprofile
-        task_id = request.data.get('task')
-        submission = Submission.objects.filter(student=student, task_id=task_id).first()
-        print('student:', student)
-        print('task_id:', task_id)
-        print('existing submission:', submission)
-        if submission:
-            serializer = self.get_serializer(submission, data=request.data, partial=True)
-        else:
-            serializer = self.get_serializer(data=request.data)
-
+        if not hasattr(request.user, "studentprofile"):
+            return Response({"error": "Brak profilu ucznia"}, status=403)
+        serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        self.perform_create(serializer) if not submission else serializer.save()
-        return Response(serializer.data, status=status.HTTP_200_OK if submission else status.HTTP_201_CREATED)
+        serializer.save()
+        return Response(serializer.data, status=status.HTTP_201_CREATED if serializer.created else status.HTTP_200_OK)
 
     def get_queryset(self):
         qs = super().get_queryset()
@@ -129,30 +215,35 @@ class SubmissionViewSet(viewsets.ModelViewSet):
             qs = qs.filter(student_id=student_id)
         return qs
 
-class CommentViewSet(viewsets.ModelViewSet):
-    queryset = Comment.objects.all()
+class CommentViewSet(ExpandableQuerysetMixin, viewsets.ModelViewSet):
+    queryset = Comment.objects.select_related("author")
     serializer_class = CommentSerializer
     permission_classes = [IsAuthenticated]
 
-class RankingViewSet(viewsets.ReadOnlyModelViewSet):
-    queryset = Ranking.objects.all().order_by('-points')  # lub bez .order_by()
+class RankingViewSet(ReplicaReadsMixin, ExpandableQuerysetMixin, viewsets.ReadOnlyModelViewSet):
+    queryset = Ranking.objects.select_related("student__user")
     serializer_class = RankingSerializer
+    keyset_ordering = ("-points", "id")
 
-class UserViewSet(viewsets.ReadOnlyModelViewSet):
+class UserViewSet(ReplicaReadsMixin, viewsets.ReadOnlyModelViewSet):
     queryset = User.objects.all()
     serializer_class = UserSerializer
+    keyset_ordering = ("-date_joined", "-id")
 
-class StudentProfileViewSet(viewsets.ModelViewSet):
+class StudentProfileViewSet(ExpandableQuerysetMixin, viewsets.ModelViewSet):
     queryset = StudentProfile.objects.all()
     serializer_class = StudentProfileSerializer
+    keyset_ordering = ("id",)
 
-class TeacherProfileViewSet(viewsets.ModelViewSet):
+class TeacherProfileViewSet(ExpandableQuerysetMixin, viewsets.ModelViewSet):
     queryset = TeacherProfile.objects.all()
     serializer_class = TeacherProfileSerializer
+    keyset_ordering = ("id",)
 
-class ParentProfileViewSet(viewsets.ModelViewSet):
+class ParentProfileViewSet(ExpandableQuerysetMixin, viewsets.ModelViewSet):
     queryset = ParentProfile.objects.all()
     serializer_class = ParentProfileSerializer
+    keyset_ordering = ("id",)
 
 class SubmissionUploadView(generics.CreateAPIView):
     queryset = Submission.objects.all()
@@ -161,40 +252,168 @@ class SubmissionUploadView(generics.CreateAPIView):
     permission_classes = [IsAuthenticated]
 
     def create(self, request, *args, **kwargs):
-        student = request.user.studentprofile
-        task_id = request.data.get('task')
-
-        if not task_id:
+        if not hasattr(request.user, "studentprofile"):
+            return Response({"error": "Brak profilu ucznia"}, status=403)
+        if not (request.data.get("task") or request.data.get("task_id")):
             return Response({"error": "Brakuje ID zadania (task_id)"}, status=400)
 
-        # Sprawdź, czy istnieje już submission dla tego ucznia i zadania
-        submission = Submission.objects.filter(student=student, task_id=task_id).first()
+        # utworzenie albo aktualizacja istniejącego submission w jednym zapytaniu
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        return Response(serializer.data, status=status.HTTP_201_CREATED if serializer.created else status.HTTP_200_OK)
+
+class MediaView(APIView):
+    """Task and submission files, for their owners only (see ``core.media``)."""
+
+    permission_classes = [AllowAny]
+
+    def get(self, request, name):
+        user = request.user if request.user.is_authenticated else None
+        if user is None:
+            try:
+                user = media.user_from_token(request.query_params.get("token"), name)
+            except signing.SignatureExpired:
+                return Response({"error": "Link do pliku wygasł"}, status=403)
+        if user is None:
+            return Response({"error": "Brak autoryzacji"}, status=401)
+        if not media.can_access(user, name):
+            return Response(status=403)
+        return media.serve(request, name)
 
-        if submission:
-            # Update istniejącego submission
-            serializer = self.get_serializer(submission, data=request.data, partial=True)
-        else:
-            # Tworzenie nowego submission
-            serializer = self.get_serializer(data=request.data)
 
-        serializer.is_valid(raise_exception=True)
-        
-        if submission:
-            serializer.save()
-            return Response(serializer.data, status=status.HTTP_200_OK)
-        else:
-            serializer.save(student=student)
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
+class ChunkedUploadInitView(APIView):
+    """Start a resumable upload of a submission file (see ``core.uploads``)."""
+
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        student = getattr(request.user, "studentprofile", None)
+        if not student:
+            return Response({"error": "Brak profilu ucznia"}, status=403)
+        task = Task.objects.filter(id=request.data.get("task"), assigned_students=student).first()
+        if not task:
+            return Response({"error": "Brak zadania"}, status=404)
+        filename = os.path.basename(str(request.data.get("filename") or ""))
+        try:
+            size = int(request.data.get("size"))
+        except (TypeError, ValueError):
+            size = 0
+        if not filename or size <= 0:
+            return Response({"error": "Podaj nazwę i rozmiar pliku"}, status=400)
+        if size > uploads.max_size():
+            return Response({"error": "Plik jest za duży"}, status=413)
+
+        with transaction.atomic():
+            # serializes the student's concurrent inits, so the limit holds
+            StudentProfile.objects.select_for_update().filter(pk=student.pk).first()
+            uploads.expired().filter(student=student).delete()
+            if uploads.open_sessions(student).count() >= settings.CHUNKED_UPLOAD_MAX_SESSIONS:
+                return Response({"error": "Za dużo rozpoczętych przesyłań"}, status=429)
+            session = UploadSession.objects.create(
+                student=student,
+                task=task,
+                filename=filename,
+                size=size,
+                sha256=str(request.data.get("sha256") or ""),
+            )
+        return Response(
+            {
+                "upload_id": session.id,
+                "offset": 0,
+                "size": size,
+                "chunk_size": settings.CHUNKED_UPLOAD_CHUNK_SIZE,
+                "expires_at": uploads.expires_at(session),
+            },
+            status=201,
+        )
+
+
+class ChunkedUploadView(APIView):
+    """``GET`` reports the offset to resume from, ``PUT`` appends a raw chunk.
 
-class ParentChildRelationViewSet(viewsets.ModelViewSet):
+    ``PUT`` expects the ``Upload-Offset`` header and optionally
+    ``Upload-Checksum`` (hex SHA-256 of the chunk).
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    def _sessions(self, request):
+        return UploadSession.objects.filter(student__user=request.user)
+
+    def get(self, request, pk):
+        session = self._sessions(request).filter(pk=pk).first()
+        if not session:
+            return Response(status=404)
+        return Response(
+            {
+                "upload_id": session.id,
+                "offset": session.received,
+                "size": session.size,
+                "completed": session.completed_at is not None,
+                "expires_at": None if session.completed_at else uploads.expires_at(session),
+            }
+        )
+
+    def put(self, request, pk):
+        try:
+            offset = int(request.headers.get("Upload-Offset", ""))
+        except ValueError:
+            return Response({"error": "Brak nagłówka Upload-Offset"}, status=400)
+        session = self._sessions(request).filter(pk=pk).first()
+        if not session:
+            return Response(status=404)
+        try:
+            # the body is read before locking, so a slow client doesn't hold the row
+            with uploads.receive(
+                session, request.stream, offset, checksum=request.headers.get("Upload-Checksum")
+            ) as chunk:
+                with transaction.atomic():
+                    session = self._sessions(request).select_for_update().get(pk=pk)
+                    received = uploads.append(session, chunk, offset)
+        except UploadSession.DoesNotExist:
+            return Response(status=404)
+        except uploads.UploadError as exc:
+            return Response({"error": exc.message, "offset": session.received}, status=exc.status)
+        return Response({"offset": received, "size": session.size})
+
+
+class ChunkedUploadFinalizeView(APIView):
+    """Attach a fully uploaded file to the student's submission."""
+
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, pk):
+        session = UploadSession.objects.filter(pk=pk, student__user=request.user).first()
+        if not session:
+            return Response(status=404)
+        try:
+            # the whole file is hashed before locking, so other requests on the session don't wait for it
+            sha256 = uploads.verify(session)
+            with transaction.atomic():
+                session = (
+                    UploadSession.objects.select_for_update()
+                    .select_related("student__user", "task")
+                    .get(pk=session.pk)
+                )
+                submission = uploads.finalize(session, sha256)
+        except UploadSession.DoesNotExist:
+            return Response(status=404)
+        except uploads.UploadError as exc:
+            return Response({"error": exc.message, "offset": session.received}, status=exc.status)
+        return Response(SubmissionSerializer(submission, context={"request": request}).data)
+
+
+class ParentChildRelationViewSet(ExpandableQuerysetMixin, viewsets.ModelViewSet):
     queryset = ParentChildRelation.objects.all()
     serializer_class = ParentChildRelationSerializer
+    keyset_ordering = ("id",)
 
 class MyStudentProfileView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        profile = StudentProfile.objects.filter(user=request.user).first()
+        profile = getattr(request.user, "studentprofile", None)
         if not profile:
             return Response({"detail": "Brak profilu ucznia."}, status=404)
         return Response(StudentProfileSerializer(profile).data)
@@ -215,39 +434,36 @@ class CurrentUserView(APIView):
         return Response(data)
 
 
-class TopRankingView(APIView):
+class TopRankingView(ReplicaReadsMixin, APIView):
     permission_classes = [IsAuthenticated]
+    token_claims_user = True
+    top_size = 10
 
     def get(self, request):
-        rankings = (
-            Ranking.objects.select_related("student__user")
-            .order_by("-points")[:10]
-        )
-        serializer = RankingSerializer(rankings, many=True)
-        return Response(serializer.data)
+        if leaderboard.enabled():
+            return Response(leaderboard.top(self.top_size))
+        return Response(RankedRankingSerializer(Ranking.ranked()[:self.top_size], many=True).data)
 
 
 class TeacherMyStudentsView(APIView):
     permission_classes = [IsAuthenticated]
-    print("test")
+    keyset_ordering = ("user__first_name", "user__last_name", "id")
+
     def get(self, request):
-        print("✅ wszedłem do TeacherMyStudentsView")
         teacher = getattr(request.user, "teacherprofile", None)
-        if not teacher:
-            print("Blad")
-        print("🔎 Authenticated user:", request.user)
-        print("🎓 TeacherProfile:", teacher)
         if not teacher:
             return Response(status=403)
 
-        students = StudentProfile.objects.filter(group__teacher=teacher).select_related("user").order_by("user__first_name", "user__last_name")
-        print("👨‍🏫 Students found:", list(students))
-        serializer = StudentBriefSerializer(students, many=True)
-        return Response(serializer.data)
+        students = StudentProfile.objects.filter(group__teacher=teacher).select_related("user")
+        paginator = KeysetPagination()
+        page = paginator.paginate_queryset(students, request, view=self)
+        serializer = StudentBriefSerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
 
 
 class TeacherStudentSubmissionsView(APIView):
     permission_classes = [IsAuthenticated]
+    keyset_ordering = ("-created_at", "-id")
 
     def get(self, request, pk):
         teacher = getattr(request.user, "teacherprofile", None)
@@ -256,19 +472,161 @@ class TeacherStudentSubmissionsView(APIView):
         student = StudentProfile.objects.filter(id=pk, group__teacher=teacher).first()
         if not student:
             return Response(status=404)
-        submissions = Submission.objects.filter(student=student).select_related("task")
+        submissions = (
+            Submission.objects.filter(student=student)
+            .select_related("task")
+            .annotate(comment_count=Count("comments"))
+        )
+        paginator = KeysetPagination()
+        submissions = paginator.paginate_queryset(submissions, request, view=self)
         data = [
             {
                 "id": pk,
                 "task_name": s.task.name,
-                "file": request.build_absolute_uri(s.file.url) if s.file else None,
+                "file": media.file_url(request, s.file) if s.file else None,
                 "submitted_at": s.submitted_at,
-                "comment_count": s.comments.count(),
+                "comment_count": s.comment_count,
                 "status": s.status,
             }
             for s in submissions
         ]
-        return Response(data)
+        return paginator.get_paginated_response(data)
+
+
+class GroupGradebookView(APIView):
+    """Students × tasks matrix of a teacher's group.
+
+    Each cell holds status, grade, submitted_at and comment_count of the
+    student's submission (or null); built in a constant number of queries.
+    ``?stream=1`` returns NDJSON instead: a header line with the group and
+    tasks, then one line per student, generated while iterating the rows.
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, pk):
+        teacher = getattr(request.user, "teacherprofile", None)
+        if not teacher:
+            return Response(status=403)
+        group = ClassGroup.objects.filter(id=pk, teacher=teacher).first()
+        if not group:
+            return Response(status=404)
+
+        tasks = list(
+            Task.objects.filter(assigned_students__group=group)
+            .distinct()
+            .order_by("created_at", "id")
+            .values("id", "name", "deadline")
+        )
+        students = (
+            StudentProfile.objects.filter(group=group)
+            .order_by("id")
+            .values("id", "user__username", "user__first_name", "user__last_name")
+        )
+        cells = (
+            Submission.objects.filter(student__group=group)
+            .order_by("student_id")
+            .values("student_id", "task_id", "status", "grade", "submitted_at")
+            .annotate(comment_count=Count("comments"))
+        )
+        header = {"group": {"id": group.id, "name": group.name}, "tasks": tasks}
+
+        if request.query_params.get("stream"):
+            lines = itertools.chain(
+                [header],
+                self._rows(tasks, students.iterator(), cells.iterator()),
+            )
+            return StreamingHttpResponse(
+                (json.dumps(line, cls=DjangoJSONEncoder) + "\n" for line in lines),
+                content_type="application/x-ndjson",
+            )
+        return Response({**header, "rows": list(self._rows(tasks, students, cells))})
+
+    def _rows(self, tasks, students, cells):
+        column = {task["id"]: i for i, task in enumerate(tasks)}
+        by_student = itertools.groupby(cells, key=lambda c: c["student_id"])
+        student_id, student_cells = next(by_student, (None, ()))
+        for student in students:
+            row = [None] * len(tasks)
+            while student_id is not None and student_id < student["id"]:
+                student_id, student_cells = next(by_student, (None, ()))
+            if student_id == student["id"]:
+                for cell in student_cells:
+                    i = column.get(cell.pop("task_id"))
+                    if i is not None:
+                        del cell["student_id"]
+                        row[i] = cell
+            full_name = f"{student['user__first_name']} {student['user__last_name']}".strip()
+            yield {
+                "student": {"id": student["id"], "full_name": full_name or student["user__username"]},
+                "cells": row,
+            }
+
+
+class TaskSubmissionsExportView(APIView):
+    """ZIP of every file submitted for one of the teacher's tasks, streamed."""
+
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, pk):
+        teacher = getattr(request.user, "teacherprofile", None)
+        if not teacher:
+            return Response(status=403)
+        task = Task.objects.filter(id=pk, created_by=teacher).first()
+        if not task:
+            return Response(status=404)
+        return exports.submissions_zip_response(
+            Submission.objects.filter(task=task), f"task-{task.id}-submissions.zip"
+        )
+
+
+class GroupSubmissionsExportView(APIView):
+    """ZIP of every file submitted by the students of a teacher's group, streamed."""
+
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, pk):
+        teacher = getattr(request.user, "teacherprofile", None)
+        if not teacher:
+            return Response(status=403)
+        group = ClassGroup.objects.filter(id=pk, teacher=teacher).first()
+        if not group:
+            return Response(status=404)
+        return exports.submissions_zip_response(
+            Submission.objects.filter(student__group=group, task__created_by=teacher),
+            f"group-{group.id}-submissions.zip",
+            with_task=True,
+        )
+
+
+class TaskStatsView(APIView):
+    """Grade statistics of one of the teacher's tasks: average, submission and on-time rates, histogram."""
+
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, pk):
+        teacher = getattr(request.user, "teacherprofile", None)
+        if not teacher:
+            return Response(status=403)
+        task = Task.objects.filter(id=pk, created_by=teacher).first()
+        if not task:
+            return Response(status=404)
+        return Response({"task": {"id": task.id, "name": task.name}, **stats.summary(stats.get(task=task))})
+
+
+class GroupStatsView(APIView):
+    """Grade statistics of one of the teacher's groups, over every task its students were given."""
+
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, pk):
+        teacher = getattr(request.user, "teacherprofile", None)
+        if not teacher:
+            return Response(status=403)
+        group = ClassGroup.objects.filter(id=pk, teacher=teacher).first()
+        if not group:
+            return Response(status=404)
+        return Response({"group": {"id": group.id, "name": group.name}, **stats.summary(stats.get(group=group))})
 
 
 class TeacherAddCommentView(APIView):
@@ -284,15 +642,15 @@ class TeacherAddCommentView(APIView):
         text = request.data.get("text")
         if not text:
             return Response({"error": "Brak komentarza"}, status=400)
-        Comment.objects.create(
+        comment = Comment.objects.create(
             submission=submission,
             author=request.user,
             text=text,
             role="teacher",
         )
-        comments = submission.comments.order_by("created_at")
-        serializer = CommentSerializer(comments, many=True)
-        return Response(serializer.data)
+        data = CommentSerializer(comment).data
+        events.comment_created(comment, data)
+        return Response(data)
 
 
 class TeacherSubmissionCommentsView(APIView):
@@ -305,36 +663,38 @@ class TeacherSubmissionCommentsView(APIView):
         submission = Submission.objects.filter(id=pk, task__created_by=teacher).first()
         if not submission:
             return Response(status=404)
-        comments = submission.comments.order_by("created_at")
-        serializer = CommentSerializer(comments, many=True)
-        return Response(serializer.data)
+        return comment_feed(request, submission)
 
 
 class TeacherTaskCreateView(APIView):
+    """Create a task and assign it to every student of one or more groups.
+
+    Groups are passed as ``group`` (single id) and/or repeated ``groups``.
+    """
+
     permission_classes = [IsAuthenticated]
     parser_classes = [MultiPartParser, FormParser]
 
     def post(self, request):
         teacher = getattr(request.user, "teacherprofile", None)
-        print(request.data)
         if not teacher:
             return Response(status=403)
         serializer = TaskSerializer(data=request.data)
         if not serializer.is_valid():
             return Response(serializer.errors, status=400)
-        group_id = request.data.get("group")
-        print("RECEIVED group_id:", group_id)
-        print("Authenticated user:", request.user)
-        print("Teacher profile:", teacher)
-        print("Available groups:", ClassGroup.objects.all())
-        group = ClassGroup.objects.filter(id=group_id, teacher=teacher).first()
-        if not group:
+        try:
+            group_ids = {int(g) for g in request.data.getlist("groups") + request.data.getlist("group")}
+        except (TypeError, ValueError):
+            return Response({"error": "Nieprawidłowe ID grupy"}, status=400)
+        groups = list(ClassGroup.objects.filter(id__in=group_ids, teacher=teacher))
+        if not groups or len(groups) != len(group_ids):
             return Response({"error": "Brak grupy"}, status=404)
-        task = serializer.save(created_by=teacher)
-        assigned_students = list(group.students.all())
-        task.assigned_students.set(assigned_students)
-        for student in assigned_students:
-            Submission.objects.create(task=task, student=student, status="pending")
+        assigned_students = list(
+            StudentProfile.objects.filter(group__in=groups).select_related("user").order_by("id")
+        )
+        with transaction.atomic():
+            task = serializer.save(created_by=teacher)
+            jobs.enqueue("task.assign", {"task_id": task.id, "student_ids": [s.id for s in assigned_students]})
         names = [s.user.get_full_name() or s.user.username for s in assigned_students]
         return Response({"task_id": task.id, "students": names}, status=201)
 
@@ -364,17 +724,76 @@ class FullUserProfileView(APIView):
 
 class MyGroupsView(APIView):
     permission_classes = [IsAuthenticated]
-    
+    keyset_ordering = ("name", "id")
 
     def get(self, request):
-        print("testujemyGrupy")
         teacher = getattr(request.user, "teacherprofile", None)
         if not teacher:
             return Response(status=403)
 
         groups = ClassGroup.objects.filter(teacher=teacher)
-        serialized = [{"id": g.id, "name": g.name} for g in groups]
-        return Response(serialized)
+        paginator = KeysetPagination()
+        page = paginator.paginate_queryset(groups, request, view=self)
+        serialized = [{"id": g.id, "name": g.name} for g in page]
+        return paginator.get_paginated_response(serialized)
+
+class ParentDashboardView(APIView):
+    """Every child of the calling parent with their tasks, grades, teacher comments and rank."""
+
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        parent = getattr(request.user, "parentprofile", None)
+        if not parent:
+            return Response({"error": "Brak profilu rodzica"}, status=403)
+        return Response(dashboard.get(parent))
+
+
+class EventTicketView(APIView):
+    """A short-lived ticket for opening ``/api/events/?ticket=`` (see ``core.events``).
+
+    501 when the server can't stream events; clients poll the comment feed then.
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        if not events.streaming_available():
+            return Response({"error": "Strumień zdarzeń niedostępny"}, status=501)
+        return Response({"ticket": events.ticket(request.user), "expires_in": settings.EVENTS_TICKET_MAX_AGE})
+
+
+class SearchView(ReplicaReadsMixin, APIView):
+    """Full-text search over the tasks, submissions and comments the caller may see.
+
+    ``?q=`` is the query, ``?type=task,submission,comment`` limits the kinds.
+    Results are ranked by relevance, paged with ``?page=`` and ``?page_size=``,
+    and carry the matching fragments with the terms in ``<mark>``.
+    """
+
+    permission_classes = [IsAuthenticated]
+    page_size = 20
+    max_page_size = 100
+
+    def get(self, request):
+        text = request.query_params.get("q", "")
+        if not search.terms(text):
+            return Response({"error": "Brak zapytania"}, status=400)
+        kinds = set(filter(None, request.query_params.get("type", "").split(",")))
+        if kinds - set(search.KINDS):
+            return Response({"error": "Nieprawidłowy typ"}, status=400)
+        try:
+            page = max(int(request.query_params.get("page", 1)), 1)
+            size = min(max(int(request.query_params.get("page_size", self.page_size)), 1), self.max_page_size)
+        except ValueError:
+            return Response({"error": "Parametry page i page_size muszą być liczbami"}, status=400)
+
+        results, has_next = search.search(request.user, text, kinds, offset=(page - 1) * size, limit=size)
+        next_link = None
+        if has_next:
+            next_link = replace_query_param(request.build_absolute_uri(), "page", page + 1)
+        return Response({"next": next_link, "results": results})
+
 
 class MeView(APIView):
     permission_classes = [IsAuthenticated]
@@ -384,39 +803,67 @@ class MeView(APIView):
         return Response({
             "id": user.id,
             "name": user.get_full_name(),
-            "group_id": user.studentprofile.group.id if hasattr(user, "studentprofile") else None
+            "group_id": user.studentprofile.group_id if hasattr(user, "studentprofile") else None
         })
     
-class GroupRankingView(APIView):
+class GroupRankingView(ReplicaReadsMixin, APIView):
+    """Top of a group's ranking and the caller's position in it.
+
+    ``?around=K`` additionally returns the K entries on each side of the
+    caller as ``neighbourhood``. Everything is served by a single query.
+    """
+
     permission_classes = [IsAuthenticated]
+    token_claims_user = True
+    top_size = 3
+    max_around = 50
 
     def get(self, request, group_id):
-        # 1. Pobierz wszystkich uczniów w danej grupie i ich ranking
-        group_rankings = (
-            Ranking.objects
-            .filter(student__group_id=group_id)
-            .select_related("student__user")
-            .order_by("-points")
+        try:
+            around = self.parse_around(request)
+        except ValueError:
+            return Response({"error": "Parametr around musi być liczbą"}, status=400)
+
+        if leaderboard.enabled():
+            return Response(self.from_standings(request, leaderboard.standings(group_id), around))
+        rows = Ranking.group_standings(
+            group_id, user_id=request.user.id, top=self.top_size, around=around
         )
+        return Response(self.from_rows(request, rows, around))
 
-        # 2. Serializacja TOP 3
-        top_3 = group_rankings[:3]
-        top_3_serialized = RankingSerializer(top_3, many=True).data
-
-        # 3. Znajdź pozycję aktualnego ucznia (jeśli należy do tej grupy)
-        try:
-            student = StudentProfile.objects.get(user=request.user)
-            my_ranking = group_rankings.filter(student=student).first()
-            my_index = list(group_rankings).index(my_ranking) if my_ranking else None
-            my_serialized = RankingSerializer(my_ranking).data if my_ranking else None
-        except StudentProfile.DoesNotExist:
-            my_index = None
-            my_serialized = None
+    @classmethod
+    def parse_around(cls, request):
+        return min(max(int(request.query_params.get("around", 0)), 0), cls.max_around)
 
-        return Response({
-            "top": top_3_serialized,
+    @classmethod
+    def from_rows(cls, request, rows, around):
+        """Response data from ``Ranking.group_standings`` rows."""
+        mine = next((r for r in rows if r.user_id == request.user.id), None)
+        data = {
+            "top": RankedRankingSerializer([r for r in rows if r.row_num <= cls.top_size], many=True).data,
             "my_position": {
-                "rank": my_index + 1 if my_index is not None else None,
-                "data": my_serialized
-            }
-        })
\ No newline at end of file
+                "rank": mine.rank if mine else None,
+                "data": RankedRankingSerializer(mine).data if mine else None,
+            },
+        }
+        if "around" in request.query_params:
+            data["neighbourhood"] = RankedRankingSerializer(
+                [r for r in rows if mine and abs(r.row_num - mine.row_num) <= around], many=True
+            ).data
+        return data
+
+    @classmethod
+    def from_standings(cls, request, standings, around):
+        """Response data from the group's ``leaderboard.Board``."""
+        index = standings.index_of_user(request.user.id)
+        mine = standings.entry(index) if index is not None else None
+        data = {
+            "top": standings.top(cls.top_size),
+            "my_position": {
+                "rank": mine["rank"] if mine else None,
+                "data": mine,
+            },
+        }
+        if "around" in request.query_params:
+            data["neighbourhood"] = standings.around(index, around) if index is not None else []
+        return data
@@ -1,6 +1,8 @@
 import React, { useEffect, useState } from 'react';
 import axios from 'axios';
 const API_URL = process.env.NEXT_PUBLIC_API_URL;
+const POLL_INTERVAL = 5000;
+const RECONNECT_DELAY = 5000;
 
 interface Comment {
     id: number;
@@ -43,19 +45,86 @@ const CommentSection: React.FC<Props> = ({ submissionId }) => {
         }
     }, [submissionId, token]);
 
+    const appendComment = (comment: Comment) =>
+        setComments((prev) => (prev.some((c) => c.id === comment.id) ? prev : [...prev, comment]));
+
+    // new comments are pushed as server-sent events; when the server can't stream
+    // them (501, e.g. not served over ASGI) the comment feed is polled with its ETag
+    useEffect(() => {
+        if (!submissionId || !token) return;
+        const headers = { Authorization: `Bearer ${token}` };
+        let source: EventSource | null = null;
+        let poll: ReturnType<typeof setInterval> | null = null;
+        let lastEventId = '';
+        let etag = '';
+        let closed = false;
+
+        const fetchNew = async () => {
+            try {
+                const res = await axios.get(`${API_URL}api/teacher/submission/${submissionId}/comments/`, {
+                    headers: etag ? { ...headers, 'If-None-Match': etag } : headers,
+                    validateStatus: (status) => status === 200 || status === 304,
+                });
+                if (res.status === 200) {
+                    etag = res.headers['etag'] ?? '';
+                    res.data.forEach(appendComment);
+                }
+            } catch {
+                // try again on the next tick or reconnect
+            }
+        };
+
+        const startPolling = () => {
+            poll = setInterval(fetchNew, POLL_INTERVAL);
+        };
+
+        const connect = async () => {
+            let ticket: string;
+            try {
+                const res = await axios.post(`${API_URL}api/events/ticket/`, null, { headers });
+                ticket = res.data.ticket;
+            } catch {
+                if (!closed) startPolling();
+                return;
+            }
+            if (closed) return;
+            const resume = lastEventId ? `&last_event_id=${lastEventId}` : '';
+            source = new EventSource(`${API_URL}api/events/?submission=${submissionId}&ticket=${ticket}${resume}`);
+            // events published while the stream was down may have expired from the backlog
+            source.onopen = fetchNew;
+            source.addEventListener('comment.created', (event) => {
+                lastEventId = (event as MessageEvent).lastEventId;
+                appendComment(JSON.parse((event as MessageEvent).data).comment);
+            });
+            source.onerror = () => {
+                // tickets expire, so a stream the browser gave up on is reopened with a fresh one
+                if (source?.readyState === EventSource.CLOSED && !closed) {
+                    setTimeout(connect, RECONNECT_DELAY);
+                }
+            };
+        };
+
+        connect();
+        return () => {
+            closed = true;
+            source?.close();
+            if (poll) clearInterval(poll);
+        };
+    }, [submissionId, token]);
+
     const addComment = async () => {
         if (!token || !text) return;
         setPosting(true);
         setError('');
         try {
-            await axios.post(
+            const res = await axios.post(
                 `http://localhost:8000/api/teacher/submission/${submissionId}/add_comment/`,
                 { text },
                 { headers: { Authorization: `Bearer ${token}` } }
             );
             setText('');
             setSuccess('Comment added');
-            fetchComments();
+            appendComment(res.data);
         } catch {
             setError('Error adding comment');
         } finally {
@@ -0,0 +1,26 @@
+import React from 'react';
+
+interface Props {
+    hasMore: boolean;
+    loading: boolean;
+    failed: boolean;
+    onClick: () => void;
+}
+
+const LoadMore: React.FC<Props> = ({ hasMore, loading, failed, onClick }) => {
+    if (!hasMore) return null;
+    return (
+        <div className="mt-4 text-center">
+            {failed && <p className="text-red-500 mb-2">Failed to load more</p>}
+            <button
+                onClick={onClick}
+                disabled={loading}
+                className="bg-gray-200 px-4 py-1 rounded disabled:opacity-50"
+            >
+                {loading ? 'Loading...' : 'Load more'}
+            </button>
+        </div>
+    );
+};
+
+export default LoadMore;
@@ -1,5 +1,5 @@
 import { useEffect, useState } from "react";
-import axios from "axios";
+import { fetchAllPages } from "../lib/api";
 const API_URL = process.env.NEXT_PUBLIC_API_URL;
 
 export default function SelectGroup({ onChange }) {
@@ -8,12 +8,8 @@ export default function SelectGroup({ onChange }) {
     useEffect(() => {
         const token = localStorage.getItem("access_token");
         if (!token) return;
-        axios.get(`${API_URL}/api/teacher/my-groups/`, {
-            headers: {
-                Authorization: `Bearer ${token}`,
-            },
-        }).then((res) => {
-            setGroups(res.data);
+        fetchAllPages(`${API_URL}/api/teacher/my-groups/`, token).then((data) => {
+            setGroups(data);
         });
     }, []);
 
@@ -1,6 +1,7 @@
-import React, { useEffect, useState } from 'react';
+import React from 'react';
 import { Link } from 'react-router-dom';
-import axios from 'axios';
+import { usePagedList } from '../lib/usePagedList';
+import LoadMore from './LoadMore';
 const API_URL = process.env.NEXT_PUBLIC_API_URL;
 
 interface Student {
@@ -10,24 +11,12 @@ interface Student {
 }
 
 const StudentList: React.FC = () => {
-    const [students, setStudents] = useState<Student[]>([]);
-    const [loading, setLoading] = useState(true);
-    const [error, setError] = useState('');
-
-    useEffect(() => {
-        const token = localStorage.getItem('access_token');
-        axios
-            .get(`${API_URL}/api/teacher/my-students/`, {
-                headers: { Authorization: `Bearer ${token}` },
-            })
-            .then((res) => setStudents(res.data))
-            .catch(() => setError('Failed to load students'))
-            .finally(() => setLoading(false));
-
-    }, []);
+    const { items: students, hasMore, loading, loadingMore, error, loadMore } = usePagedList<Student>(
+        `${API_URL}/api/teacher/my-students/`
+    );
 
     if (loading) return <p>Loading...</p>;
-    if (error) return <p className="text-red-500">{error}</p>;
+    if (error && students.length === 0) return <p className="text-red-500">Failed to load students</p>;
 
     return (
         <div>
@@ -59,6 +48,7 @@ const StudentList: React.FC = () => {
                     </tbody>
                 </table>
             </div>
+            <LoadMore hasMore={hasMore} loading={loadingMore} failed={error} onClick={loadMore} />
         </div>
     );
 };
@@ -1,7 +1,9 @@
-import React, { useEffect, useState } from 'react';
+import React, { useState } from 'react';
 import { useParams } from 'react-router-dom';
 import axios from 'axios';
 import CommentSection from './CommentSection';
+import { usePagedList } from '../lib/usePagedList';
+import LoadMore from './LoadMore';
 const API_URL = process.env.NEXT_PUBLIC_API_URL;
 
 interface Submission {
@@ -22,29 +24,19 @@ interface Submission {
 const StudentSubmissions: React.FC = () => {
     const { id } = useParams<{ id: string }>();
     const studentId = id ? parseInt(id) : null;
-    const [submissions, setSubmissions] = useState<Submission[]>([]);
-    const [loading, setLoading] = useState(true);
-    const [error, setError] = useState('');
+    const {
+        items: submissions,
+        setItems: setSubmissions,
+        hasMore,
+        loading,
+        loadingMore,
+        error,
+        loadMore,
+    } = usePagedList<Submission>(studentId ? `${API_URL}/api/submissions/?student=${studentId}&expand=task` : null);
     const [showComments, setShowComments] = useState<Record<number, boolean>>({});
     const [expandedSubId, setExpandedSubId] = useState<number | null>(null);
     const [selectedImage, setSelectedImage] = useState<string | null>(null);
 
-    useEffect(() => {
-        if (!studentId) return;
-        const token = localStorage.getItem('access_token');
-        axios
-            .get(`${API_URL}/api/submissions/?student=${studentId}`, {
-                headers: { Authorization: `Bearer ${token}` },
-            })
-            .then((res) => {
-                console.log("RESPONSE DATA", res.data);
-                setSubmissions(res.data);
-            })
-            .catch(() => setError('Failed to fetch submissions'))
-            .finally(() => setLoading(false));
-    }, [studentId]);
-
-
     const handleApprove = (submissionId: number) => {
         const token = localStorage.getItem('access_token');
 
@@ -88,7 +80,7 @@ const StudentSubmissions: React.FC = () => {
     };
 
     if (loading) return <p>Loading...</p>;
-    if (error) return <p className="text-red-500">{error}</p>;
+    if (error && submissions.length === 0) return <p className="text-red-500">Failed to fetch submissions</p>;
 
     return (
         <div>
@@ -177,6 +169,7 @@ const StudentSubmissions: React.FC = () => {
                     ))}
                 </div>
             )}
+            <LoadMore hasMore={hasMore} loading={loadingMore} failed={error} onClick={loadMore} />
             {selectedImage && (
                 <div className="fixed inset-0 bg-black bg-opacity-80 z-50 flex justify-center items-center" onClick={() => setSelectedImage(null)}>
                     <img src={selectedImage} alt="Full Preview" className="max-h-[90%] max-w-[90%] rounded shadow-lg" />
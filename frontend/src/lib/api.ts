@@ -11,3 +11,34 @@ export async function fetchCurrentUser(token: string) {
     }
     return res.json();
 }
+
+export interface Page<T> {
+    results: T[];
+    next: string | null;
+}
+
+// List endpoints are cursor-paginated ({ next, results }); `next` is the URL of the following page.
+export async function fetchPage<T>(url: string, token: string | null): Promise<Page<T>> {
+    const res = await fetch(url, {
+        headers: {
+            Authorization: `Bearer ${token}`,
+        },
+    });
+    if (!res.ok) {
+        throw new Error(`Failed to fetch ${url}`);
+    }
+    return res.json();
+}
+
+// Follows `next` to the end; only for lists that are small by design (e.g. a teacher's own
+// groups). Lists that grow with the school use usePagedList and load pages on demand.
+export async function fetchAllPages<T>(url: string, token: string | null): Promise<T[]> {
+    const results: T[] = [];
+    let next: string | null = url;
+    while (next) {
+        const page: Page<T> = await fetchPage<T>(next, token);
+        results.push(...page.results);
+        next = page.next;
+    }
+    return results;
+}
@@ -0,0 +1,43 @@
+import { useCallback, useEffect, useState } from 'react';
+import { fetchPage } from './api';
+
+// The first page of a cursor-paginated list; further pages are appended by loadMore.
+export function usePagedList<T>(url: string | null) {
+    const [items, setItems] = useState<T[]>([]);
+    const [next, setNext] = useState<string | null>(null);
+    const [loading, setLoading] = useState(true);
+    const [loadingMore, setLoadingMore] = useState(false);
+    const [error, setError] = useState(false);
+
+    useEffect(() => {
+        if (!url) return;
+        let cancelled = false;
+        setLoading(true);
+        setError(false);
+        fetchPage<T>(url, localStorage.getItem('access_token'))
+            .then((page) => {
+                if (cancelled) return;
+                setItems(page.results);
+                setNext(page.next);
+            })
+            .catch(() => !cancelled && setError(true))
+            .finally(() => !cancelled && setLoading(false));
+        return () => {
+            cancelled = true;
+        };
+    }, [url]);
+
+    const loadMore = useCallback(() => {
+        if (!next || loadingMore) return;
+        setLoadingMore(true);
+        fetchPage<T>(next, localStorage.getItem('access_token'))
+            .then((page) => {
+                setItems((prev) => [...prev, ...page.results]);
+                setNext(page.next);
+            })
+            .catch(() => setError(true))
+            .finally(() => setLoadingMore(false));
+    }, [next, loadingMore]);
+
+    return { items, setItems, hasMore: next !== null, loading, loadingMore, error, loadMore };
+}